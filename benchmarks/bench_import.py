@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+Import-time benchmark and guard of the race_bib_creator package.
+
+In a fresh interpreter, the benchmark measures the time needed to import the
+package, then renders a single bib from a dictionnary with a `BibTemplate`
+(without barcode). It checks that none of the heavy dependencies (pandas,
+pyBarcode, PIL) were loaded by either step.
+
+The result is printed as a JSON line. The exit status is 1 if a heavy module
+was loaded or if the import took longer than `--max-ms`, so that the script can
+be used to guard start-up time against regressions.
+
+Example
+-------
+
+From the root of the repository::
+
+    python benchmarks/bench_import.py --repeat 5 --max-ms 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+HEAVY_MODULES = ('pandas', 'numpy', 'barcode', 'PIL')
+
+_CHILD_CODE = '''
+import json, os, sys, tempfile, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import race_bib_creator
+import_ms = (time.perf_counter() - start) * 1000
+after_import = sorted(name for name in {heavy!r} if name in sys.modules)
+workdir = tempfile.mkdtemp()
+base = os.path.join(workdir, 'template.svg')
+with open(base, 'w') as template:
+    template.write('<svg><text>DNB</text><text>first_name</text></svg>')
+start = time.perf_counter()
+bib_template = race_bib_creator.BibTemplate(base, {{'Number': 'DNB',
+                                                  'Firstname': 'first_name'}})
+bib_template.make_svg_file({{'Number': 12, 'Firstname': 'Ignace'}},
+                           'bib_12.svg', output_rep=workdir)
+render_ms = (time.perf_counter() - start) * 1000
+after_render = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{'import_ms': import_ms, 'render_ms': render_ms,
+                  'heavy_after_import': after_import,
+                  'heavy_after_render': after_render}}))
+'''
+
+
+def measure():
+    """Runs the measure in a fresh interpreter and returns its results."""
+    code = _CHILD_CODE.format(root=ROOT, heavy=HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     universal_newlines=True)
+    return(json.loads(output.strip().splitlines()[-1]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of fresh interpreters (best is kept)')
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='maximal import time allowed')
+    args = parser.parse_args(argv)
+
+    results = [measure() for _ in range(args.repeat)]
+    best = min(results, key=lambda result: result['import_ms'])
+    heavy = sorted(set(best['heavy_after_import']) |
+                   set(best['heavy_after_render']))
+    failed = bool(heavy) or (args.max_ms is not None and
+                             best['import_ms'] > args.max_ms)
+    best['ok'] = not failed
+    print(json.dumps(best))
+    return(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
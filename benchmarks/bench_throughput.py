@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+Throughput benchmark of the race_bib_creator package.
+
+Synthetic participants tables and templates (see `synthetic.py`) are generated
+for every combination of the requested table sizes and template shapes. Each
+combination ("case") is run in a fresh interpreter so that start-up costs and
+peak memory are measured independently. For each case, the benchmark times:
+
+    - `BibFactory` instanciation (reading of the participants table),
+    - `BibTemplate.make_svg_file` and `BibTemplate._make_barcode` on a sample
+      of participants,
+    - `BibFactory.make_bib_files` end to end, with the per-stage measures of
+      its `RunStats` (see `race_bib_creator.run_stats`).
+
+Results are printed as JSON lines (one object per case) and can be appended
+to a file with `--output` so that regressions can be tracked over time.
+
+Example
+-------
+
+From the root of the repository::
+
+    python benchmarks/bench_throughput.py --rows 1000 10000 --no-barcodes
+    python benchmarks/bench_throughput.py --output bench_output.txt
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+DEFAULT_ROWS = [1000, 10000, 100000]
+# (number of fields, markers per field, template size in kB)
+DEFAULT_TEMPLATES = ['4x1x10', '8x2x100', '16x4x500']
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of the process in MB, or None if
+    it cannot be measured on this platform."""
+    try:
+        import resource
+    except ImportError:
+        return(None)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes on macOS and in kB elsewhere
+    if sys.platform == 'darwin':
+        return(peak / 2.0 ** 20)
+    return(peak / 2.0 ** 10)
+
+
+def directory_size(path):
+    """Returns the cumulated size in bytes of the files in `path`."""
+    return(sum(entry.stat().st_size for entry in os.scandir(path)
+               if entry.is_file()))
+
+
+def run_case(case, workdir):
+    """Runs one benchmark case and returns its results as a dict."""
+    import race_bib_creator
+    import synthetic
+
+    n_fields, markers_per_field, size_kb = (int(value) for value in
+                                            case['template'].split('x'))
+    n_rows = case['rows']
+    participants = synthetic.make_participants(
+        n_rows, n_extra_fields=max(0, n_fields - 4), seed=case['seed'])
+    table_path = os.path.join(workdir, 'participants.csv')
+    participants.to_csv(table_path, index=False)
+    field_names = list(participants.columns[1:n_fields + 1])
+    template_path = os.path.join(workdir, 'template.svg')
+    barcode_marker = 'barcode.png' if case['barcodes'] else None
+    fields = synthetic.make_template(template_path, field_names,
+                                     markers_per_field, size_kb,
+                                     barcode_marker=barcode_marker)
+    if case['barcodes']:
+        fields['barcode'] = barcode_marker
+    # no barcode cache: barcode_per_call times the generation of the
+    # barcodes, not hits of the cache warmed by make_svg_file
+    template = race_bib_creator.BibTemplate(
+        template_path, fields, use_barcodes=case['barcodes'],
+        barcode_number_field_name='Number',
+        id_ndigits_for_barcode=len(str(n_rows)), barcode_cache_bytes=0)
+    stages = {}
+
+    start = time.perf_counter()
+    factory = race_bib_creator.BibFactory(participants=table_path,
+                                          field_for_numbering='Number')
+    stages['read'] = time.perf_counter() - start
+
+    sample_rep = os.path.join(workdir, 'sample')
+    os.mkdir(sample_rep)
+    sample = factory.participants.head(case['sample']).to_dict('records')
+    start = time.perf_counter()
+    for row in sample:
+        template.make_svg_file(row, 'bib_{}.svg'.format(row['Number']),
+                               output_rep=sample_rep)
+    stages['make_svg_file_per_call'] = ((time.perf_counter() - start) /
+                                        len(sample))
+    if case['barcodes']:
+        start = time.perf_counter()
+        for row in sample:
+            template._make_barcode(row['Number'], sample_rep)
+        stages['barcode_per_call'] = ((time.perf_counter() - start) /
+                                      len(sample))
+    shutil.rmtree(sample_rep)
+
+    output_rep = os.path.join(workdir, 'output')
+    os.mkdir(output_rep)
+    start = time.perf_counter()
+    stats = factory.make_bib_files(template, output_rep, stats=True).stats
+    elapsed = time.perf_counter() - start
+    stages['make_bib_files'] = elapsed
+
+    return({'case': '{rows}-{template}-{barcodes}'.format(
+                rows=n_rows, template=case['template'],
+                barcodes='barcodes' if case['barcodes'] else 'plain'),
+            'rows': n_rows,
+            'fields': n_fields,
+            'markers': n_fields * markers_per_field,
+            'template_bytes': os.path.getsize(template_path),
+            'barcodes': case['barcodes'],
+            'stages_s': stages,
+            'run_stages': stats.as_dict()['stages'],
+            'elapsed_s': elapsed,
+            'bibs_per_s': n_rows / elapsed,
+            'mb_written': directory_size(output_rep) / 2.0 ** 20,
+            'peak_rss_mb': peak_rss_mb(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help='sizes of the participants tables')
+    parser.add_argument('--templates', nargs='+', default=DEFAULT_TEMPLATES,
+                        help='template shapes as FIELDSxMARKERSxKB')
+    parser.add_argument('--no-barcodes', dest='barcodes',
+                        action='store_false', help='disable barcodes')
+    parser.add_argument('--sample', type=int, default=200,
+                        help='number of calls for the per-call timings')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file the JSON lines are appended to')
+    parser.add_argument('--workdir', help='directory for generated files')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        workdir = tempfile.mkdtemp(prefix='bib_bench_', dir=args.workdir)
+        try:
+            # make_bib_files prints to stdout: keep it for the results only
+            with contextlib.redirect_stdout(sys.stderr):
+                result = run_case(json.loads(args.run_case), workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(json.dumps(result))
+        return(0)
+
+    status = 0
+    for rows in args.rows:
+        for template in args.templates:
+            case = {'rows': rows, 'template': template,
+                    'barcodes': args.barcodes, 'seed': args.seed,
+                    'sample': min(rows, args.sample)}
+            command = [sys.executable, os.path.abspath(__file__),
+                       '--run-case', json.dumps(case)]
+            if args.workdir:
+                command += ['--workdir', args.workdir]
+            process = subprocess.run(command, stdout=subprocess.PIPE,
+                                     universal_newlines=True)
+            if process.returncode != 0:
+                status = 1
+                continue
+            line = process.stdout.strip().splitlines()[-1]
+            print(line)
+            sys.stdout.flush()
+            if args.output:
+                with open(args.output, 'a') as output:
+                    output.write(line + '\n')
+    return(status)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
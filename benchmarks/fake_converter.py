@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+Stand-in svg converter, to try the conversion of the bibs (conversion
+scripts, `ConversionExecutor`) without Inkscape.
+
+It takes the arguments of the conversion commands of `BibTemplate`
+(`{source_svg} {width} {dest_png}`) and writes a blank png file of the
+requested width. It can be made slow, flaky or hung so that the timeouts and
+the retries of `race_bib_creator.ConversionExecutor` can be exercised
+offline. Its messages are written on the standard error, as a converter
+would.
+
+Example
+-------
+
+From the root of the repository::
+
+    python -m race_bib_creator template.svg participants.csv race_1 \\
+        --converter "python benchmarks/fake_converter.py --delay 0.2 \\
+                     --fail-rate 0.1 --hang-rate 0.02 {source_svg} {width} \\
+                     {dest_png}" --convert-jobs 8 --convert-timeout 5
+"""
+import argparse
+import random
+import re
+import struct
+import sys
+import time
+import zlib
+
+
+def blank_png(width, height):
+    """Returns the content of a white png picture."""
+    def chunk(kind, data):
+        return(struct.pack('>I', len(data)) + kind + data +
+               struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    row = b'\x00' + b'\xff' * (3 * width)
+    return(b'\x89PNG\r\n\x1a\n' +
+           chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0,
+                                      0)) +
+           chunk(b'IDAT', zlib.compress(row * height)) +
+           chunk(b'IEND', b''))
+
+
+def main(argv=None):
+    """Converts (or pretends to convert) a svg file. Returns the exit
+    status."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('source', help='svg file')
+    parser.add_argument('width', type=int, help='width of the png in px')
+    parser.add_argument('dest', help='png file')
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help='seconds spent per conversion')
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='probability of a failed conversion')
+    parser.add_argument('--hang-rate', type=float, default=0.0,
+                        help='probability of a conversion that never ends')
+    parser.add_argument('--fail-on', metavar='REGEX',
+                        help='always fail on the svg files matching REGEX')
+    args = parser.parse_args(argv)
+    with open(args.source, 'rb') as source:
+        content = source.read()
+    draw = random.random()
+    if draw < args.hang_rate:
+        sys.stderr.write("fake_converter: hung on {}\n".format(args.source))
+        sys.stderr.flush()
+        while True:
+            time.sleep(60)
+    time.sleep(args.delay)
+    if ((args.fail_on and re.search(args.fail_on, args.source)) or
+            draw < args.hang_rate + args.fail_rate):
+        sys.stderr.write("fake_converter: cannot convert {}\n".format(
+                             args.source))
+        return(1)
+    if b'<svg' not in content:
+        sys.stderr.write("fake_converter: {} is not a svg file\n".format(
+                             args.source))
+        return(2)
+    with open(args.dest, 'wb') as dest:
+        dest.write(blank_png(args.width, max(1, args.width * 7 // 10)))
+    return(0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
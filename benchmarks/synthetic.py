@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module generates synthetic inputs for the benchmarks: participant tables
+of arbitrary length with varied field lengths, and svg bib templates of
+arbitrary size and number of markers.
+
+The generated data is fully determined by the provided seed so that two runs
+of a benchmark work on exactly the same inputs.
+"""
+import random
+import string
+
+import pandas as pd
+
+#: Columns always present in a synthetic participants table.
+BASE_COLUMNS = ['Number', 'Firstname', 'Lastname', 'Team', 'Category']
+
+_LETTERS = string.ascii_letters + "éèàçô' -"
+
+
+def _word(rng, min_len, max_len):
+    """Returns a random word whose length lies in [min_len, max_len]."""
+    length = rng.randint(min_len, max_len)
+    return(''.join(rng.choice(_LETTERS) for _ in range(length)).strip() or 'x')
+
+
+def make_participants(n_rows, n_extra_fields=0, seed=0):
+    """Returns a synthetic participants table.
+
+    :Parameters:
+
+        *n_rows*: int
+            Number of participants in the table.
+        *n_extra_fields*: int, optional
+            Number of additional free text columns (`Extra_0`, `Extra_1`...)
+            added to the base columns.
+        *seed*: int, optional
+            Seed of the random generator.
+
+    :Returns:
+
+        *participants*: pd.DataFrame
+            Table with a unique integer `Number` column starting at 1.
+
+    """
+    rng = random.Random(seed)
+    columns = {'Number': list(range(1, n_rows + 1)),
+               'Firstname': [_word(rng, 2, 20) for _ in range(n_rows)],
+               'Lastname': [_word(rng, 2, 35) for _ in range(n_rows)],
+               'Team': [_word(rng, 0, 60) for _ in range(n_rows)],
+               'Category': [rng.choice(['SEH', 'SEF', 'V1H', 'V1F', 'JUH'])
+                            for _ in range(n_rows)]}
+    for i in range(n_extra_fields):
+        columns['Extra_{}'.format(i)] = [_word(rng, 1, 40)
+                                         for _ in range(n_rows)]
+    return(pd.DataFrame(columns))
+
+
+def make_template(path, field_names, markers_per_field=1, size_kb=10,
+                  barcode_marker=None):
+    """Writes a synthetic svg template and returns its fields dictionnary.
+
+    :Parameters:
+
+        *path*: str
+            Path of the svg file to be written.
+        *field_names*: list of str
+            Names of the fields (participants table columns) used by the
+            template. Each field gets its own marker `MARKER_<field name>`.
+        *markers_per_field*: int, optional
+            Number of occurrences of each marker in the file.
+        *size_kb*: int, optional
+            Approximative size of the file. The file is padded with static
+            elements (as logos and background art would) to reach it.
+        *barcode_marker*: str, optional
+            If given, a linked image using this marker as file name is added
+            to the template, as required by barcode-enabled templates.
+
+    :Returns:
+
+        *fields*: dict
+            Fields dictionnary to be given to `BibTemplate`.
+
+    """
+    fields = {name: 'MARKER_{}'.format(name) for name in field_names}
+    lines = ['<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n',
+             '<svg xmlns="http://www.w3.org/2000/svg" '
+             'xmlns:xlink="http://www.w3.org/1999/xlink" '
+             'width="210mm" height="148mm" viewBox="0 0 744 524">\n']
+    y = 40
+    for _ in range(markers_per_field):
+        for name in field_names:
+            lines.append('  <text x="20" y="{}" style="font-size:24px">'
+                         '{}</text>\n'.format(y, fields[name]))
+            y += 30
+    if barcode_marker is not None:
+        lines.append('  <image x="400" y="380" width="300" height="120" '
+                     'xlink:href="{}" />\n'.format(barcode_marker))
+    size = sum(len(line) for line in lines)
+    i = 0
+    while size < size_kb * 1024:
+        line = ('  <rect x="{0}" y="{1}" width="12" height="12" '
+                'style="fill:#{2:06x};stroke:none" />\n'
+                ).format(i % 744, (i * 7) % 524, (i * 2654435761) % 0xffffff)
+        lines.append(line)
+        size += len(line)
+        i += 1
+    lines.append('</svg>\n')
+    with open(path, 'w', encoding='utf-8') as template:
+        template.writelines(lines)
+    return(fields)
@@ -32,7 +32,7 @@ template_2 = race_bib_creator.BibTemplate(base_file_name=('test_tt_2016\\dossa'
 factory = race_bib_creator.BibFactory(participants="test_tt_2016\\test.xlsx",
                                       field_for_numbering='numero')
 
-# Création des dossards selon le premier template
-factory.make_bib_files(template,'test_tt_2016\\resultats')
-# Création des dossards selon le second template
-factory.make_bib_files(template_2,'test_tt_2016\\resultats_2')
\ No newline at end of file
+# Création des dossards selon les deux templates, en un seul passage sur la
+# liste des participants
+factory.make_bib_files([(template,'test_tt_2016\\resultats'),
+                        (template_2,'test_tt_2016\\resultats_2')])
\ No newline at end of file
@@ -8,7 +8,46 @@ race. It is build around bib templates that are used to define a global bib sha
 
 Given a participant list, these templates can be used to create various person
 -nalized bib designs in a modular and, hopefully, easy way.
+
+The classes of the long-running modes (daemon, HTTP service, work queue,
+scheduler) and of the outline fonts are imported on first access, so that
+importing the package only loads what making bibs needs.
 """
+import importlib
+
+from .bib_factory import BibFactory, RunResult
+from .bib_template import BibTemplate, INKSCAPE_POSIX_COMMAND
+from .run_stats import RunStats, StatsHook
+from .progress import EventQueue, ProgressEvent, ProgressTracker
+from .manifest import merge_shards
+from .error_report import BibError, ErrorReport, read_error_report
+from .routing import TemplateRouter
+from .derived_fields import DerivedField
+from .layered_raster import CommandRasterizer, LayeredRaster
+from .conversion_cache import ConversionCache
+from .conversion_runner import INKSCAPE_BATCH_COMMAND, PosixRunner
+from .conversion_executor import ConversionError, ConversionExecutor
+from .text_fit import TextFit
+from .barcode_sprites import BarcodeSprites
+
+# objects imported on first access, keyed by name: their modules
+_LAZY = {'BibDaemon': 'daemon', 'FileWatcher': 'daemon',
+         'BibService': 'bib_service',
+         'Coordinator': 'work_queue', 'DirectoryWorkQueue': 'work_queue',
+         'run_worker': 'work_queue',
+         'PriorityScheduler': 'scheduler',
+         'OutlineFont': 'text_outlines', 'get_font': 'text_outlines'}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+                                 __name__, name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return(value)
+
 
-from .bib_factory import BibFactory
-from .bib_template import BibTemplate
\ No newline at end of file
+def __dir__():
+    return(sorted(set(globals()) | set(_LAZY)))
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+Runs the command line interface: `python -m race_bib_creator --help`.
+"""
+import sys
+
+from .cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
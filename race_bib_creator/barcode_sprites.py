@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `BarcodeSprites` class: a sprite sheet of vector
+barcodes, used when bibs are combined into one document (proof sheets or
+imposed print sheets, see `BibFactory.make_proof_sheet`).
+
+Each bib made as a separate file links its own barcode picture (png file). In
+a combined document, the barcodes are rather drawn once, as `<symbol>`
+definitions of a single `<defs>` element of the document (the sprite sheet),
+and each bib references its barcode with a `<use>` element. A template gives
+such bibs once its barcode picture is replaced by a reference to the sprite
+sheet (see `BibTemplate.with_barcode_sprites` and `sprite_references`).
+
+The bars of the barcodes are built from fragments also defined once: for
+code39 barcodes, each character (including the start/stop character shared
+by all the barcodes) is a path, referenced by the barcodes using it. Other
+encodings are drawn as one path per barcode. The barcodes encode the same
+strings as the png barcodes (with the code39 check character) and have the
+same default sizes, in mm: a template laid out for the png barcodes can be
+used as is.
+
+Example
+-------
+
+>>> sprites = race_bib_creator.BarcodeSprites()
+>>> sprited = template.with_barcode_sprites(sprites)
+>>> bibs = [sprited.render(row) for row in participants]
+>>> defs = sprites.defs()
+
+Class and functions definitions
+-------------------------------
+"""
+import re
+from xml.parsers import expat
+
+from .compiled_template import escape
+
+_ID_CHARACTERS = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def _number(value):
+    """Returns the text of a length in mm, rounded to 1/1000 of mm."""
+    return('{:.3f}'.format(value).rstrip('0').rstrip('.'))
+
+
+def symbol_id(name):
+    """Returns the identifier of the symbol of a barcode named `name`: the
+    characters which cannot be used in an XML identifier are replaced by
+    their code points."""
+    name = _ID_CHARACTERS.sub(
+        lambda match: '_{:x}'.format(ord(match.group())), name)
+    if not name[:1].isalpha() and name[:1] != '_':
+        name = '_' + name
+    return(name)
+
+
+class BarcodeSprites():
+    """Sprite sheet of the barcodes of a combined document.
+
+    :Attributes:
+
+        **module_width**: float
+            Width of the narrowest bar, in mm.
+        **module_height**: float
+            Height of the bars, in mm.
+        **quiet_zone**: float
+            Margin left and right of the bars, in mm.
+        **margin**: float
+            Margin above the bars and below the text, in mm.
+        **font_size**: float
+            Font size of the text under the bars, in pt.
+        **text_distance**: float
+            Distance from the bars to the text, in mm.
+        **write_text**: bool
+            Whether the encoded string is written under the bars.
+        **symbols**: dict
+            Barcodes of the sheet, keyed by symbols identifiers, in the
+            order they were added: `(encoding, code, modules)` tuples, where
+            `code` is the encoded string (check character included) and
+            `modules` the pattern of the bars ('1' for a black module).
+
+    """
+    def __init__(self, module_width=0.2, module_height=15.0, quiet_zone=2.54,
+                 margin=1.0, font_size=10, text_distance=5.0,
+                 write_text=True):
+        """
+        :Parameters:
+
+            See the attributes. The defaults are the sizes of the code39
+            png barcodes.
+
+        """
+        self.module_width = module_width
+        self.module_height = module_height
+        self.quiet_zone = quiet_zone
+        self.margin = margin
+        self.font_size = font_size
+        self.text_distance = text_distance
+        self.write_text = write_text
+        self.symbols = {}
+
+    def add(self, encoding, barcode_string, name=None):
+        """Adds a barcode to the sheet (once) and returns the identifier of
+        its symbol.
+
+        :Parameters:
+
+            *encoding*: str
+                Encoding of the barcode (see pyBarcode).
+            *barcode_string*: str
+                String encoded by the barcode.
+            *name*: str, optional
+                Name from which the identifier of the symbol is made.
+                Default is the encoding and the string.
+
+        """
+        identifier = symbol_id(name or '{}_{}'.format(encoding,
+                                                      barcode_string))
+        if identifier not in self.symbols:
+            import barcode
+            instance = barcode.get(encoding, barcode_string)
+            self.symbols[identifier] = (encoding, instance.get_fullcode(),
+                                        instance.build()[0])
+        return(identifier)
+
+    def _bars(self, modules, x=0.0):
+        """Returns the path data of the bars of a pattern of modules."""
+        parts = []
+        for match in re.finditer('1+', modules):
+            parts.append('M{} {}h{}v{}h-{}z'.format(
+                _number(x + match.start() * self.module_width),
+                _number(self.margin),
+                _number(len(match.group()) * self.module_width),
+                _number(self.module_height),
+                _number(len(match.group()) * self.module_width)))
+        return(''.join(parts))
+
+    def _size(self, modules):
+        """Returns the width and the height of the picture of a barcode, in
+        mm."""
+        height = 2 * self.margin + self.module_height
+        if self.write_text:
+            height += self.text_distance + self.font_size * 25.4 / 72 / 2
+        return((2 * self.quiet_zone + len(modules) * self.module_width,
+                height))
+
+    def defs(self):
+        """Returns the `<defs>` element of the sprite sheet: the fragments of
+        the bars and the symbols of the barcodes."""
+        fragments = {}
+        symbols = []
+        for identifier, (encoding, code, modules) in self.symbols.items():
+            width, height = self._size(modules)
+            parts = ['<symbol id="{}" viewBox="0 0 {} {}">'.format(
+                         identifier, _number(width), _number(height)),
+                     '<rect width="{}" height="{}" style="fill:#ffffff" '
+                     '/>'.format(_number(width), _number(height))]
+            if encoding.lower() in ('code39', 'code_39'):
+                from barcode.charsets import code39
+                x = self.quiet_zone
+                for character in '*' + code + '*':
+                    fragment = 'code39-{:02x}'.format(ord(character))
+                    pattern = (code39.EDGE if character == '*' else
+                               code39.MAP[character][1])
+                    if fragment not in fragments:
+                        fragments[fragment] = self._bars(pattern)
+                    parts.append('<use xlink:href="#{}" x="{}" />'.format(
+                                     fragment, _number(x)))
+                    step = len(pattern) + len(code39.MIDDLE)
+                    x += step * self.module_width
+            else:
+                parts.append('<path d="{}" />'.format(
+                                 self._bars(modules, self.quiet_zone)))
+            if self.write_text:
+                parts.append(
+                    '<text x="{}" y="{}" style="font-size:{}px;'
+                    'font-family:monospace;text-anchor:middle;'
+                    'fill:#000000">{}</text>'.format(
+                        _number(width / 2), _number(
+                            self.margin + self.module_height +
+                            self.text_distance),
+                        _number(self.font_size * 25.4 / 72),
+                        escape(code, 'text')))
+            parts.append('</symbol>')
+            symbols.append(''.join(parts))
+        lines = ['<defs>']
+        lines.extend('<path id="{}" style="fill:#000000" d="{}" />'.format(
+                         fragment, path)
+                     for fragment, path in sorted(fragments.items()))
+        lines.extend(symbols)
+        lines.append('</defs>')
+        return('\n'.join(lines))
+
+
+def _marked_elements(data, marker):
+    """Returns the `(start, end, name, attributes)` tuples of the elements of
+    a xml document (bytes) which attributes hold a marker, in document
+    order."""
+    parser = expat.ParserCreate('utf-8')
+    elements = []
+    current = []
+    marker = marker.encode('utf-8')
+
+    def start_element(name, attributes):
+        current.append((parser.CurrentByteIndex, attributes))
+
+    def end_element(name):
+        start, attributes = current.pop()
+        position = parser.CurrentByteIndex
+        if data[position - 2:position] == b'/>':
+            end = position
+        else:
+            end = data.index(b'>', position) + 1
+        tag = data[start:data.index(b'>', start) + 1]
+        if marker in tag:
+            elements.append((start, end, name, attributes))
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.Parse(data, True)
+    return(sorted(elements))
+
+
+def sprite_references(content, marker):
+    """Replaces the elements of a svg content linking the barcode picture
+    (`<image>` elements which attributes hold its marker) by `<use>`
+    elements with the same position, size, transform and style, referencing
+    the symbol which identifier replaces the marker (see module
+    documentation).
+
+    :Parameters:
+
+        *content*: str
+            Content of the base file.
+        *marker*: str
+            Marker of the barcode field.
+
+    Raises a ValueError if the marker is held by another kind of element.
+
+    """
+    data = content.encode('utf-8')
+    parts = []
+    position = 0
+    for start, end, name, attributes in _marked_elements(data, marker):
+        if name.rpartition(':')[2] != 'image':
+            raise ValueError("The barcode marker {!r} is held by a {} "
+                             "element".format(marker, name))
+        link = 'xlink:href' if 'xlink:href' in attributes else 'href'
+        use = ['<use {}="#{}"'.format(link, marker)]
+        for attribute in ('id', 'x', 'y', 'width', 'height', 'transform',
+                          'style', 'class'):
+            if attribute in attributes:
+                use.append(' {}="{}"'.format(
+                    attribute, escape(attributes[attribute], 'attribute')))
+        use.append(' />')
+        parts.append(data[position:start].decode('utf-8'))
+        parts.append(''.join(use))
+        position = end
+    parts.append(data[position:].decode('utf-8'))
+    return(''.join(parts))
@@ -46,8 +46,34 @@ other without.
 Class definition
 ----------------
 """
-import pandas as pd
 import os
+import re
+import time
+import unicodedata
+import warnings
+import zlib
+
+from .barcode_sprites import BarcodeSprites
+from .conversion_cache import ConversionCache
+from .conversion_executor import (ConversionError, ConversionExecutor,
+                                  ConversionJob)
+from .conversion_runner import PosixRunner
+from .error_report import BibError, ErrorReport
+from .journal import Journal, is_intact, row_digest
+from .layered_raster import LayeredRaster
+from .lru_cache import LRUCache
+from .manifest import file_digest, part_name, shard_suffix, write_manifest
+from .progress import NULL_PROGRESS, ProgressTracker
+from .routing import TemplateRouter
+from .run_stats import NULL_STATS, RunStats
+from .svg_units import parse_length
+
+#: Final formats of the bibs that can be requested to the factory.
+OUTPUT_FORMATS = ('svg', 'svgz', 'png', 'pdf')
+#: Formats that are obtained through a conversion script.
+CONVERSION_FORMATS = ('png', 'pdf')
+#: Default size limit of the barcode cache of a run (see `BibFactory`).
+RUN_BARCODE_CACHE_BYTES = 16 * 2 ** 20
 
 class BibFactory():
     """
@@ -73,6 +99,8 @@ class BibFactory():
         **_output_file_prefix**: str, optional
             Prefix for the name of the output bib files that will be produced by
             the factory. This prefix will be complemented with the bib number.
+        **_barcode_cache_bytes**: int
+            Size limit of the barcode cache shared by the templates of a run.
 
 
     :Methods:
@@ -80,30 +108,357 @@ class BibFactory():
     """
     def __init__(self, participants, bib_template=None,
                  field_for_numbering=None, output_rep=None,
-                 output_file_prefix="dossard_"):
+                 output_file_prefix="dossard_", name_fields=None,
+                 frozen_fields=None,
+                 barcode_cache_bytes=RUN_BARCODE_CACHE_BYTES):
         """Create an instance of bib factory for a given participant lists. To
         be used with various bib templates.
 
+        :Parameters:
+
+            *participants*: str, pd.DataFrame or list of dict
+                Path toward the participants table (Excel file, or csv file if
+                the name ends with `.csv`) or the table itself. The table can
+                also be given as a list of dictionnaries (one per participant)
+                in which case pandas is not needed at all.
+            *name_fields*: list of str, optional
+                Fields (e.g. `['Firstname', 'Lastname']`) indexed to look
+                participants up by name, see `find_by_name`.
+            *frozen_fields*: dict, optional
+                Values of the fields that are the same for all the
+                participants (race name, date...), keyed by fields names.
+                They are substituted once in the templates used by the
+                factory (see `BibTemplate.freeze`) and the participants
+                table does not need their columns.
+            *barcode_cache_bytes*: int, optional
+                Size limit of the barcode cache of a run made with several
+                templates using barcodes: the barcode of a participant is
+                generated once for all of them. The cache is dropped at the
+                end of the run and the templates' own caches are unchanged.
+                Default is `RUN_BARCODE_CACHE_BYTES`, 0 disables it.
+
         """
         self._bib_template = bib_template
-        self.participants = pd.read_excel(participants)
+        start = time.perf_counter()
+        self._read_bytes = 0
+        self._participants = None
+        self._records = None
+        if isinstance(participants, str):
+            # pandas is only imported when a table has to be read
+            import pandas as pd
+            self._read_bytes = os.path.getsize(participants)
+            if participants.lower().endswith('.csv'):
+                self._participants = pd.read_csv(participants)
+            else:
+                self._participants = pd.read_excel(participants)
+        elif isinstance(participants, (list, tuple)):
+            self._records = [dict(row) for row in participants]
+        else:
+            self._participants = participants
+        self._read_time = time.perf_counter() - start
         self._output_rep = output_rep or os.getcwd()
         self._field_for_numbering = field_for_numbering
         self._output_file_prefix = output_file_prefix
+        self._name_fields = list(name_fields or [])
+        self._index = None
+        self._name_index = None
+        self._frozen_fields = dict(frozen_fields or {})
+        self._frozen_templates = {}
+        self._barcode_cache_bytes = barcode_cache_bytes
+        self._prepared = {}
+        self._rasters = {}
+
+    @property
+    def participants(self):
+        """Table (pd.DataFrame) of the participants. Built on first access if
+        the participants were given as a list of dictionnaries."""
+        if self._participants is None:
+            import pandas as pd
+            self._participants = pd.DataFrame(self._records)
+        return(self._participants)
+
+    @participants.setter
+    def participants(self, participants):
+        self._participants = participants
+        self._records = None
+        self._index = None
+        self._name_index = None
+        self._prepared = {}
+
+    def _get_records(self):
+        """Returns the participants as a list of dictionnaries (one per
+        participant, keys are the columns names), computed once."""
+        if self._records is None:
+            self._records = self._participants.to_dict('records')
+        return(self._records)
+
+    def _get_numbers(self):
+        """Returns the list of the bib numbers of the participants, in the
+        order of the table."""
+        if self._field_for_numbering is not None:
+            return([row[self._field_for_numbering]
+                    for row in self._get_records()])
+        if self._participants is not None:
+            return([index + 1 for index in self._participants.index])
+        return(list(range(1, len(self._records) + 1)))
+
+    def _freeze(self, bib_template):
+        """Returns the template specialized with the frozen fields of the
+        factory (the template itself if there is none), built once per
+        template."""
+        if not self._frozen_fields:
+            return(bib_template)
+        frozen = self._frozen_templates.get(id(bib_template))
+        if frozen is None or frozen[0] is not bib_template:
+            frozen = (bib_template, bib_template.freeze(self._frozen_fields))
+            self._frozen_templates[id(bib_template)] = frozen
+        return(frozen[1])
+
+    def _prepare(self, bib_template):
+        """Returns the texts of the fields of a template for all the
+        participants (see `BibTemplate.prepare`). Prepared once per template
+        and version of its base file."""
+        stamp = bib_template.compile().stamp
+        prepared = self._prepared.get(id(bib_template))
+        if (prepared is None or prepared[0] is not bib_template or
+                prepared[1] != stamp):
+            prepared = (bib_template, stamp,
+                        bib_template.prepare(self._get_records(),
+                                             self._participants))
+            self._prepared[id(bib_template)] = prepared
+        return(prepared[2])
+
+    def _raster(self, bib_template, px_width, rasterizer):
+        """Returns the `LayeredRaster` of a template, kept from a run to
+        another so that its static layer is only rasterised again when the
+        base file changes."""
+        key = (id(bib_template), px_width, id(rasterizer))
+        cached = self._rasters.get(key)
+        if (cached is None or cached[0] is not bib_template or
+                cached[1] is not rasterizer):
+            cached = (bib_template, rasterizer,
+                      LayeredRaster(bib_template, px_width, rasterizer))
+            self._rasters[key] = cached
+        return(cached[2])
+
+    def _texts_row(self, bib_template, position):
+        """Returns the texts of the fields of a template for the
+        participant at a position of the table."""
+        return({field: texts[position] for field, texts in
+                self._prepare(bib_template).items()})
+
+    def _get_index(self):
+        """Returns the index of the participants: a dictionnary which keys are
+        the bib numbers (as str) and values are `(position, number, row)`
+        tuples. Built on first use."""
+        if self._index is None:
+            index = {}
+            for position, (number, row) in enumerate(
+                    zip(self._get_numbers(), self._get_records())):
+                key = str(number)
+                if key in index:
+                    warnings.warn("Bib number {} is used by several "
+                                  "participants, only the first one is "
+                                  "indexed".format(number))
+                    continue
+                index[key] = (position, number, row)
+            self._index = index
+        return(self._index)
+
+    def find(self, number):
+        """Returns the row (dictionnary) of the participant with a given bib
+        number, or None if there is none. `number` can be given as a str."""
+        item = self._get_index().get(str(number))
+        return(None if item is None else item[2])
+
+    def find_by_name(self, name):
+        """Returns the bib numbers of the participants which name (values of
+        the `name_fields` joined by spaces) is `name`, ignoring case, accents
+        and extra spaces."""
+        assert self._name_fields, ("name_fields must be given to the factory "
+        "to look participants up by name")
+        if self._name_index is None:
+            name_index = {}
+            for number, row in zip(self._get_numbers(), self._get_records()):
+                key = _name_key(' '.join(str(row.get(field, ''))
+                                         for field in self._name_fields))
+                name_index.setdefault(key, []).append(number)
+            self._name_index = name_index
+        return(list(self._name_index.get(_name_key(name), [])))
+
+    def make_bib(self, number, bib_template=None, output_rep=None,
+                 output_format='svg', incremental=False, stats=None):
+        """Creates the bib of one participant, found in the index of the bib
+        numbers. Uses the compiled template and the barcode cache of the
+        template, shared with `make_bib_files`. No script or manifest is
+        written.
+
+        :Parameters:
+
+            *number*: object
+                Bib number (can be given as a str).
+            *bib_template*: BibTemplate or TemplateRouter, optional
+                Template of the bib. With a router, the template and the
+                default output repository of the participant's route are
+                used.
+            *output_format*: str, optional
+                'svg' (default) or 'svgz'. Other formats are obtained by
+                converting the svg file, see
+                `BibTemplate.make_conversion_command`.
+
+            See `make_bib_files` for the other parameters.
+
+        :Returns:
+
+            *bib*: str
+                Path of the bib file.
+
+        """
+        if bib_template is None:
+            bib_template = self._bib_template
+        assert bib_template is not None, "No bib template is available"
+        assert output_format in ('svg', 'svgz'), ("output_format must be "
+        "'svg' or 'svgz'")
+        item = self._get_index().get(str(number))
+        if item is None:
+            raise KeyError("No participant has the bib number "
+                           "{}".format(number))
+        position, number, row = item
+        default_rep = self._output_rep
+        if isinstance(bib_template, TemplateRouter):
+            bib_template, default_rep = bib_template.route(row,
+                                                           self._output_rep)
+        output_name = self._output_file_prefix + str(number)
+        bib_template = self._freeze(bib_template)
+        return(bib_template.make_svg_file(
+            dict(row), output_name + '.' + output_format,
+            output_rep=output_rep or default_rep, stats=stats,
+            incremental=incremental,
+            texts=self._texts_row(bib_template, position)))
+
+    def make_proof_sheet(self, path, bib_template=None, numbers=None,
+                         columns=2, gap=5.0, barcode_sprites=True):
+        """Creates a proof sheet: one svg file showing the bibs of several
+        participants side by side, in a grid of `columns` columns, to be
+        checked or printed at once. No bib file is written.
+
+        With `barcode_sprites`, the barcodes of the bibs are drawn once in a
+        sprite sheet at the top of the file and referenced by the bibs,
+        instead of a png file per bib (see module `barcode_sprites`), so
+        that a sheet of many bibs stays small and quick to open.
+
+        The bibs are copied as they are: the identifiers of the elements of
+        the template are repeated from a bib to another.
+
+        :Parameters:
+
+            *path*: str
+                Path of the proof sheet file.
+            *bib_template*: BibTemplate or TemplateRouter, optional
+                Template of the bibs (see `make_bib`).
+            *numbers*: iterable, optional
+                Bib numbers of the participants shown. Default is all the
+                participants, in the order of the table.
+            *columns*: int, optional
+                Number of bibs per row of the sheet.
+            *gap*: float, optional
+                Space around the bibs, in mm.
+            *barcode_sprites*: bool or BarcodeSprites, optional
+                Whether the barcodes are drawn in a sprite sheet (True, or
+                the `BarcodeSprites` giving their sizes) or linked as png
+                files, created next to the proof sheet (False).
+
+        :Returns:
+
+            *path*: str
+                Path of the proof sheet file.
+
+        """
+        if bib_template is None:
+            bib_template = self._bib_template
+        assert bib_template is not None, "No bib template is available"
+        assert columns > 0, "columns must be a positive integer"
+        if barcode_sprites is True:
+            barcode_sprites = BarcodeSprites()
+        output_rep = os.path.dirname(os.path.abspath(path))
+        templates = {}
+        cells = []
+        for position, number, row in self._select(numbers=numbers):
+            template = bib_template
+            if isinstance(template, TemplateRouter):
+                template = template.route(row, self._output_rep)[0]
+            template = self._freeze(template)
+            rendering = templates.get(id(template))
+            if rendering is None:
+                rendering = template
+                if barcode_sprites:
+                    rendering = template.with_barcode_sprites(
+                        barcode_sprites)
+                templates[id(template)] = rendering
+            content = rendering.render(
+                dict(row), output_rep=output_rep,
+                texts=self._texts_row(template, position))
+            cells.append(_sheet_cell(content))
+        gap = gap * 96 / 25.4
+        width = max([cell[1] for cell in cells] or [0]) + gap
+        height = max([cell[2] for cell in cells] or [0]) + gap
+        rows = (len(cells) + columns - 1) // columns
+        sheet_width = gap + width * min(columns, len(cells))
+        sheet_height = gap + height * rows
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<svg xmlns="http://www.w3.org/2000/svg" '
+                 'xmlns:xlink="http://www.w3.org/1999/xlink" width="{}mm" '
+                 'height="{}mm" viewBox="0 0 {} {}">'.format(
+                     _round(sheet_width * 25.4 / 96),
+                     _round(sheet_height * 25.4 / 96),
+                     _round(sheet_width), _round(sheet_height))]
+        if barcode_sprites:
+            lines.append(barcode_sprites.defs())
+        for index, (bib, _, _) in enumerate(cells):
+            lines.append('<g transform="translate({},{})">'.format(
+                _round(gap + width * (index % columns)),
+                _round(gap + height * (index // columns))))
+            lines.append(bib)
+            lines.append('</g>')
+        lines.append('</svg>\n')
+        with open(path, 'w', encoding='utf-8') as sheet:
+            sheet.write('\n'.join(lines))
+        return(path)
 
     def make_bib_files(self,bib_template=None, output_rep=None,
                        script_name=None, output_file_prefix=None,
-                       make_convert_script=True, png_px_width=2000):
+                       make_convert_script=True, png_px_width=2000,
+                       stats=None, progress=None, output_format='png',
+                       jobs=1, incremental=False, shard=None,
+                       shard_by='number', make_manifest=None,
+                       manifest_name='manifest.json', numbers=None,
+                       resume=False, journal_name='bibs.journal',
+                       errors=None, layered=False, rasterizer=None,
+                       conversion_cache=False,
+                       conversion_cache_name='conversions.json',
+                       script_format='bat', batch_size=20, convert=None,
+                       cancel=None):
         """Creates a svg file containing the bib for each participant.
-        Returns the output repository.
+        Returns a `RunResult` giving the output repository, the measures
+        and the failures of the run.
 
         :Parameters:
 
-            *bib_template*: BibTemplate, optional
+            *bib_template*: BibTemplate or list of tuples, optional
                 The bib template to be used for bib creation and attached to
                 the factory.
                 If no template is provided, the template attached to the
                 factory is used if one is available. Else, the method fails.
+                A list of `(bib_template, output_rep)` targets can also be
+                given (without `output_rep`) to make several designs in one
+                pass over the participants: each participant is rendered
+                with all the templates in a row (its barcode is generated
+                once if the templates use the shared barcode cache, see
+                `BibTemplate`). Each output repository gets its own
+                conversion script, manifest and journal.
+                A `TemplateRouter` can also be given to make each participant
+                with the template of the value of a column (see module
+                `routing`).
             *output_rep*: str, optional
                 Path toward the repository where the bib files will be stored.
             *output_file_prefix*: str, optional
@@ -123,61 +478,811 @@ class BibFactory():
                 documentation. Default value is 2000. This may produce
                 big-sized files but ensures barcodes are well printed enough if
                 directly printed on the bib.
+            *stats*: RunStats or bool, optional
+                Enables the instrumentation of the run. If a `RunStats` object
+                is given, the measures of the run are added to it (and sent to
+                its hooks). If True, a new `RunStats` object is used. See
+                module `run_stats`.
+            *progress*: callable, list of callables or ProgressTracker, optional
+                Listener(s) to which a `ProgressEvent` is sent at the start
+                and at the end of the run and each time a bib is completed or
+                fails. See module `progress`.
+            *output_format*: str, optional
+                Final format of the bibs, one of `OUTPUT_FORMATS`. With 'svg'
+                and 'svgz' (compressed svg), the bib files are the final
+                result and no conversion script is written. With 'png' (the
+                default) and 'pdf', the conversion script produces files in
+                this format from the svg bib files.
+            *jobs*: int, optional
+                Number of worker processes used to create the bibs. Default is
+                1: the bibs are created in the calling process.
+            *incremental*: bool, optional
+                If True, bib files which content did not change are not
+                rewritten, existing barcode files are kept and the conversion
+                script only contains the bibs that changed or which converted
+                file is missing. Barcode files must be deleted if the barcode
+                settings of the template changed.
+            *shard*: tuple, optional
+                `(i, n)` pair: only the bibs of the i-th shard out of n are
+                created. The names of the conversion script and of the
+                manifest get a `.shard-<i>-of-<n>` suffix so that the outputs
+                of all the shards can be gathered in one repository and merged
+                with `manifest.merge_shards`.
+            *shard_by*: str, optional
+                'number' (default) or 'hash'. See `_select`.
+            *make_manifest*: bool, optional
+                Whether a manifest of the run is written in the output
+                repository. Default is True for sharded runs, False else. See
+                module `manifest`.
+            *manifest_name*: str, optional
+                Name of the manifest file. Default is `manifest.json`.
+            *numbers*: iterable, optional
+                If given, only the bibs of these numbers are created.
+            *resume*: bool, optional
+                If True, the completed bibs are journaled in the output
+                repository and the bibs journaled by a previous (interrupted)
+                run are not created again, provided their row, the template
+                and their files did not change. The journal entries of the
+                bibs left out of the run (`numbers`, `shard`) are kept for
+                the next runs. See module `journal`.
+            *journal_name*: str, optional
+                Name of the journal file. Default is `bibs.journal`.
+            *errors*: ErrorReport or bool, optional
+                Enables the isolation of failures. By default, the first bib
+                that fails aborts the run. If an `ErrorReport` is given, the
+                failures are recorded in it and the other bibs are created.
+                If True, a new `ErrorReport` is used. See module
+                `error_report`.
+            *layered*: bool, optional
+                If True (with the 'png' format only), the png bibs are made
+                by the factory instead of a conversion script: the static
+                layer of the template is rasterised once and the dynamic
+                layer of each bib is composited onto it. See module
+                `layered_raster`.
+            *rasterizer*: object, optional
+                Rasterizer used by the layered mode. By default, the
+                conversion command of the template is used.
+            *conversion_cache*: bool, optional
+                If True, the conversion script only contains the bibs which
+                converted file is missing or was not produced from the same
+                svg content with the same options, according to a cache of
+                the digests of the svg files kept in the output repository.
+                See module `conversion_cache`.
+            *conversion_cache_name*: str, optional
+                Name of the conversion cache file. Default is
+                `conversions.json`.
+            *script_format*: str, optional
+                'bat' (default): the conversion script is a Windows batch
+                file with one command per bib. 'sh': the conversion script
+                is a POSIX shell script (`make_pngs.sh`) converting the bibs
+                in batches, several batches in parallel, and resumable. See
+                module `conversion_runner`.
+            *batch_size*: int, optional
+                Number of bibs converted by a batch of a 'sh' script.
+                Default is 20.
+            *convert*: ConversionExecutor or bool, optional
+                If given, the conversion commands of the bibs are run by this
+                executor at the end of the run instead of being written in a
+                conversion script. If True, a `ConversionExecutor` with the
+                default settings is used. See module `conversion_executor`.
+            *cancel*: threading.Event, optional
+                If given, the run stops before the next bib once the event is
+                set (e.g. by another thread). The bibs made so far are
+                converted and written in the script, manifest and journal
+                as usual, and the result is marked as cancelled.
 
             The parameters provided to this method are used to set the values
             of the associated (private) attributes.
 
         :Returns:
 
-            *output_rep*: str
-                Output repository where the resulting fils are stored.
+            *result*: RunResult
+                Outcome of the run: its output repository (list of the
+                output repositories of the targets if a list of targets was
+                given), the number of bibs created and failed, the
+                `RunStats` of the run if the instrumentation was enabled and
+                its `ErrorReport` if the isolation of failures was enabled.
+
+                The method used to return the output repository itself.
+                The result can still be given where a path is expected
+                (`os.fspath`, `os.listdir`, `os.path.join`...) when the run
+                has a single output repository; other uses of the old return
+                value (string operations, comparisons) should read its
+                `output_rep` attribute.
 
         .. see-also:
 
             Module: :py:mod: `bib_template`
         """
-        if bib_template is None:
-            bib_template = self._bib_template
+        if progress is None:
+            tracker = NULL_PROGRESS
+        elif isinstance(progress, ProgressTracker):
+            tracker = progress
         else:
-            self._bib_template = bib_template
-        if output_file_prefix is not None:
-            self._output_file_prefix = output_file_prefix
-        if output_rep is not None:
-            self._output_rep = output_rep
-        if make_convert_script:
-            script_name = script_name or "make_pngs.bat"
-            script = open(self._output_rep+'\\'+script_name,"w")
+            tracker = ProgressTracker(progress, 0)
+        router = None
+        targets = []
+        number = None
         try:
-            for index,row in self.participants.iterrows():
-                if self._field_for_numbering is None:
-                    number = index + 1
+            if isinstance(bib_template, (list, tuple)):
+                assert output_rep is None, ("output_rep must not be given "
+                "with a list of (bib_template, output_rep) targets")
+                targets = [_Target(self._freeze(template), rep)
+                           for template, rep in bib_template]
+            else:
+                if bib_template is None:
+                    bib_template = self._bib_template
                 else:
-                    number = row[self._field_for_numbering]
-                output_name = self._output_file_prefix + str(number) + '.svg'
-                self._bib_template.make_svg_file(row, output_name,
-                                                 output_rep=self._output_rep)
-                if make_convert_script:
-                    command = self._bib_template.make_conversion_command()
-                    script.write(command)
-        except AttributeError:
+                    self._bib_template = bib_template
+                if output_rep is not None:
+                    self._output_rep = output_rep
+                if isinstance(bib_template, TemplateRouter):
+                    router = bib_template
+                    targets = [_Target(self._freeze(template), rep)
+                               for template, rep in
+                               router.targets(self._output_rep)]
+                    for target in targets:
+                        os.makedirs(target.output_rep, exist_ok=True)
+                else:
+                    targets = [_Target(self._freeze(bib_template),
+                                       self._output_rep)]
+            barcode_templates = [target.bib_template for target in targets
+                                 if target.bib_template._use_barcodes]
+            if len(barcode_templates) > 1 and self._barcode_cache_bytes:
+                # shared by the templates of the run, in the worker processes
+                # too as they are given the templates together
+                run_barcodes = LRUCache(self._barcode_cache_bytes)
+                for template in barcode_templates:
+                    template._run_barcode_cache = run_barcodes
+            if output_file_prefix is not None:
+                self._output_file_prefix = output_file_prefix
+            assert output_format in OUTPUT_FORMATS, ("output_format must be "
+            "one of {}".format(OUTPUT_FORMATS))
+            if stats is True:
+                stats = RunStats()
+            elif not stats:
+                stats = None
+            run_stats = stats or NULL_STATS
+            if errors is True:
+                errors = ErrorReport()
+            elif errors is False:
+                errors = None
+            run_start = time.perf_counter()
+            run_stats.record('read', self._read_time, self._read_bytes)
+            assert not layered or output_format == 'png', ("The layered mode "
+            "only makes png bibs")
+            assert script_format in ('bat', 'sh'), ("script_format must be "
+            "'bat' or 'sh'")
+            extension = '.svgz' if output_format == 'svgz' else '.svg'
+            if layered:
+                extension = '.png'
+            items = [(position, number,
+                      self._output_file_prefix + str(number) + extension, row)
+                     for position, number, row in self._select(shard,
+                                                               shard_by,
+                                                               numbers)]
+            # (item, target index) pairs of the bibs to make, in the order in
+            # which they are made
+            unrouted = []
+            if router is None:
+                units = [(item, index) for item in items
+                         for index in range(len(targets))]
+            else:
+                indexes = {target: index for index, target in
+                           enumerate(router.targets(self._output_rep))}
+                units = []
+                for item in items:
+                    try:
+                        target = router.route(item[3], self._output_rep)
+                    except KeyError as error:
+                        if errors is None:
+                            number = item[1]
+                            raise
+                        unrouted.append(BibError.from_exception(
+                            item[0], item[1], item[3], 'validate', error))
+                        continue
+                    units.append((item, indexes[target]))
+                # template by template, so that the chunks handed to workers
+                # only hold one template
+                units.sort(key=lambda unit: unit[1])
+            total = len(units) + len(unrouted)
+            tracker.start(total)
+            if layered:
+                for target in targets:
+                    target.raster = self._raster(target.bib_template,
+                                                 png_px_width, rasterizer)
+                    # rasterised before the bibs are handed to workers
+                    target.raster.background(target.output_rep)
+            if make_manifest is None:
+                make_manifest = shard is not None
+            suffix = shard_suffix(shard) if shard is not None else ''
+            make_convert_script = (make_convert_script and not layered and
+                                   output_format in CONVERSION_FORMATS)
+            if convert is True:
+                convert = ConversionExecutor()
+            elif convert is False:
+                convert = None
+            conversion_jobs = []
             if make_convert_script:
-                script.close()
-                print("closed")
+                script_name = script_name or part_name(
+                    "make_{}s.{}".format(output_format, script_format),
+                    suffix)
+                conversion_options = {'format': output_format,
+                                      'px_width': png_px_width}
+            for target in targets:
+                if make_convert_script and convert is None:
+                    path = os.path.join(target.output_rep, script_name)
+                    if script_format == 'sh':
+                        target.script = PosixRunner(path, target.bib_template,
+                                                    output_format,
+                                                    png_px_width, batch_size)
+                    else:
+                        target.script = open(path, "w")
+                if make_convert_script and conversion_cache:
+                    target.conversions = ConversionCache(
+                        target.output_rep,
+                        part_name(conversion_cache_name, suffix)).load()
+                if resume:
+                    maker = target.raster or target.bib_template
+                    target.journal = Journal(
+                        os.path.join(target.output_rep,
+                                     part_name(journal_name, suffix)),
+                        maker.fingerprint())
+                    journaled = target.journal.load()
+                    target.resumed = self._resumable(
+                        items, journaled, target.output_rep)
+                    selected = set(item[0] for item in items)
+                    kept = [entry for position, entry in
+                            sorted(journaled.items())
+                            if position not in selected]
+                    target.journal.open(kept +
+                                        list(target.resumed.values()))
+            failures = len(unrouted)
+            collect = errors is not None
+            for error in unrouted:
+                errors.add(error)
+                tracker.bib_failed(error.number, error)
+            # consecutive bibs of a participant are rendered at once
+            to_render = []
+            for item, index in units:
+                if item[0] in targets[index].resumed:
+                    continue
+                if to_render and to_render[-1][0] == item[0]:
+                    to_render[-1] = item + (to_render[-1][4] + (index,),)
+                else:
+                    to_render.append(item + ((index,),))
+            # the fields are converted, derived and escaped for the whole
+            # table at once
+            start = run_stats.clock()
+            renders = [(target.bib_template, target.output_rep,
+                        self._prepare(target.bib_template), target.raster)
+                       for target in targets]
+            run_stats.record('validate', run_stats.clock() - start)
+            cancelled = False
+            if jobs > 1:
+                rendered = self._render_in_pool(renders, to_render, jobs,
+                                                incremental, stats, collect)
+            else:
+                rendered = _render_items(renders, to_render, incremental,
+                                         stats, collect)
+            source = rendered
+            if any(target.resumed for target in targets):
+                rendered = _with_resumed(units, targets, rendered)
+            for index, result, queue_depth in rendered:
+                if cancel is not None and cancel.is_set():
+                    cancelled = True
+                    break
+                target = targets[index]
+                number = result.number
+                if isinstance(result, BibError):
+                    failures += 1
+                    result.target = target.output_rep
+                    errors.add(result)
+                    tracker.bib_failed(number, result, queue_depth)
+                    continue
+                if make_convert_script:
+                    start = run_stats.clock()
+                    dest = (os.path.splitext(result.bib)[0] + '.' +
+                            output_format)
+                    if target.conversions is not None:
+                        needed = not target.conversions.is_current(
+                            dest, result.digest, conversion_options)
+                    else:
+                        needed = result.changed or not os.path.exists(dest)
+                    if needed:
+                        try:
+                            if convert is None and script_format == 'sh':
+                                result.command = target.script.add(
+                                    result.bib, dest)
+                            else:
+                                result.command = (target.bib_template.
+                                    make_conversion_command(
+                                        source=result.bib, dest=dest,
+                                        px_width=png_px_width,
+                                        output_format=output_format,
+                                        posix=(convert is not None and
+                                               os.name == 'posix')))
+                        except Exception as error:
+                            if not collect:
+                                raise
+                            failures += 1
+                            error = BibError.from_exception(
+                                result.position, number,
+                                self._get_records()[result.position],
+                                'convert', error)
+                            error.target = target.output_rep
+                            errors.add(error)
+                            tracker.bib_failed(number, error, queue_depth)
+                            continue
+                        if convert is not None:
+                            conversion_jobs.append(ConversionJob(
+                                result.command, dest, (index, result)))
+                        elif script_format == 'bat':
+                            target.script.write(result.command)
+                        if target.conversions is not None:
+                            target.conversions.expect(dest, result.digest,
+                                                      conversion_options,
+                                                      result.bib)
+                        if convert is None:
+                            run_stats.record('convert',
+                                             run_stats.clock() - start,
+                                             len(result.command))
+                if make_manifest:
+                    target.entries.append(result.manifest_entry())
+                if (target.journal is not None and
+                        result.position not in target.resumed):
+                    target.journal.append(self._journal_entry(
+                        result, target.output_rep))
+                tracker.bib_done(number, queue_depth)
+            number = None
+            if cancelled:
+                # stops the worker processes
+                rendered.close()
+                source.close()
+            for target in targets:
+                if target.journal is not None:
+                    target.journal.close()
+                    target.journal = None
+            if conversion_jobs:
+                failures += self._convert(convert, conversion_jobs, targets,
+                                          errors, run_stats)
+            for target in targets:
+                if target.script is not None:
+                    target.script.close()
+                    target.script = None
+                if make_manifest:
+                    write_manifest(os.path.join(target.output_rep,
+                                                part_name(manifest_name,
+                                                          suffix)),
+                                   target.entries, output_format, shard)
+        except Exception as error:
+            # number of the bib which failed, if the failure is a bib's one
+            tracker.bib_failed(getattr(error, 'bib_number', number), error)
+            for target in targets:
+                if target.script is not None:
+                    target.script.close()
             raise
-        if make_convert_script:
-            script.close()
-            print("closed")
-        return(self._output_rep)
-
-#    def
-
-
-if __name__ == '__main__':
-    from dossard_template import BibTemplate
-    template =  BibTemplate('dossard_patern_barcode.svg',{'numero':'DNB',
-                                                          'barcode':'ean13.png',
-                                                          'cat':"&lt;cat&gt;",
-                                                          'prenom':"Ignace"},
-                               use_barcodes=True)
-    factory = BibFactory(participants="test.xlsx",field_for_numbering='numero')
-    factory.make_bib_files(template,'test_out')
\ No newline at end of file
+        finally:
+            for target in targets:
+                target.bib_template._run_barcode_cache = None
+                if target.journal is not None:
+                    target.journal.close()
+                if target.conversions is not None:
+                    target.conversions.write()
+            tracker.end()
+        if len(targets) == 1:
+            result = targets[0].output_rep
+        else:
+            result = [target.output_rep for target in targets]
+        if errors is not None:
+            errors.output_rep = result
+        bibs = tracker.completed if cancelled else total - failures
+        if stats is not None:
+            stats.bibs += bibs
+            stats.elapsed += time.perf_counter() - run_start
+            stats.output_rep = result
+            stats.end_run()
+        return(RunResult(result, bibs, failures, stats, errors, cancelled))
+
+    def _convert(self, executor, conversion_jobs, targets, errors=None,
+                 stats=None):
+        """Runs the conversion jobs of a run (see `make_bib_files`) and
+        returns the number of bibs which conversion failed. Failed bibs are
+        recorded in `errors` and left out of the manifest entries of their
+        target. Without error report, a `ConversionError` is raised once all
+        the jobs are run."""
+        stats = stats or NULL_STATS
+        failed = {}
+        first_error = None
+        for job in executor.run(conversion_jobs):
+            index, result = job.key
+            target = targets[index]
+            if job.ok:
+                stats.record('convert', job.elapsed,
+                             os.path.getsize(job.dest))
+                if target.conversions is not None:
+                    target.conversions.confirm(job.dest)
+                continue
+            failed.setdefault(index, set()).add(result.position)
+            error = ConversionError(job)
+            if errors is None:
+                error.bib_number = result.number
+                first_error = first_error or error
+                continue
+            errors.add(BibError(result.position, result.number,
+                                self._get_records()[result.position],
+                                'convert', type(error).__name__, str(error),
+                                target=target.output_rep))
+        for index, positions in failed.items():
+            targets[index].entries = [entry for entry in
+                                      targets[index].entries
+                                      if entry['position'] not in positions]
+        for target in targets:
+            if target.conversions is not None:
+                target.conversions.write()
+        if first_error is not None:
+            raise first_error
+        return(sum(len(positions) for positions in failed.values()))
+
+    def _resumable(self, items, journaled, output_rep):
+        """Returns the journal entries of the items that do not have to be
+        created again in `output_rep`, in a dictionnary which keys are
+        positions."""
+        resumed = {}
+        for position, number, output_name, row in items:
+            entry = journaled.get(position)
+            if (entry is not None and entry['bib'] == output_name and
+                    entry['row'] == row_digest(row) and
+                    is_intact(entry, output_rep)):
+                resumed[position] = entry
+        return(resumed)
+
+    def _journal_entry(self, result, output_rep):
+        """Returns the journal entry of a bib created in `output_rep`."""
+        entry = result.manifest_entry()
+        entry['changed'] = result.changed
+        entry['row'] = row_digest(self._get_records()[result.position])
+        entry['barcode_sha256'] = None
+        if result.barcode is not None:
+            entry['barcode_sha256'] = file_digest(
+                os.path.join(output_rep, result.barcode))
+        return(entry)
+
+    def _select(self, shard=None, shard_by='number', numbers=None):
+        """Returns the list of the (position, number, row) tuples of the
+        participants to be processed, in the order of the table.
+
+        :Parameters:
+
+            *shard*: tuple, optional
+                `(i, n)` pair: only the participants of the i-th shard out of
+                n (0 <= i < n) are returned.
+            *shard_by*: str, optional
+                How participants are assigned to shards. With 'number', a
+                participant belongs to the shard `number % n` if its bib
+                number is an integer, to the shard `position % n` (position in
+                the table) else. With 'hash', it belongs to the shard
+                `crc32(str(number)) % n`, which spreads any kind of numbers
+                evenly. Both are stable across machines and Python versions.
+            *numbers*: iterable, optional
+                If given, only the participants with these bib numbers are
+                returned. They are found in the index of the bib numbers.
+
+        """
+        if numbers is not None:
+            index = self._get_index()
+            selected = sorted((index[key] for key in
+                               set(str(number) for number in numbers)
+                               if key in index), key=lambda item: item[0])
+        else:
+            selected = [(position, number, row) for position, (number, row)
+                        in enumerate(zip(self._get_numbers(),
+                                         self._get_records()))]
+        if shard is None:
+            return(selected)
+        index, count = shard
+        assert 0 <= index < count, "shard must be a (i, n) pair with 0<=i<n"
+        assert shard_by in ('number', 'hash'), ("shard_by must be 'number' "
+        "or 'hash'")
+        return([item for item in selected
+                if _shard_key(item[0], item[1], shard_by) % count == index])
+
+    def _render_in_pool(self, renders, items, jobs, incremental, stats,
+                        collect=False):
+        """Renders the bibs in a pool of `jobs` worker processes and yields
+        the results in the order of `items` (see `_render_items`)."""
+        chunk_size = max(1, min(64, len(items) // (jobs * 4)))
+        chunks = []
+        for item in items:
+            # a chunk only holds bibs of the same targets
+            if (not chunks or len(chunks[-1]) == chunk_size or
+                    chunks[-1][-1][4] != item[4]):
+                chunks.append([])
+            chunks[-1].append(item)
+        # imported on first use: most runs are made by a single process
+        import multiprocessing
+        pool = multiprocessing.Pool(jobs, initializer=_init_worker,
+                                    initargs=(renders, incremental,
+                                              stats is not None, collect))
+        try:
+            left = sum(len(item[4]) for item in items)
+            for results, chunk_stats in pool.imap(_render_chunk, chunks):
+                if chunk_stats is not None:
+                    stats.merge(chunk_stats)
+                for index, result in results:
+                    left -= 1
+                    yield(index, result, left)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+class BibResult():
+    """Outcome of the creation of one bib.
+
+    :Attributes:
+
+        **position**: int
+            Position of the participant in the participants table.
+        **number**: object
+            Bib number.
+        **bib**: str
+            Path of the bib file.
+        **changed**: bool
+            Whether the content of the bib file changed.
+        **barcode**: str or None
+            Name of the barcode file used by the bib.
+        **digest**: str
+            sha256 digest of the bib file.
+        **command**: str or None
+            Conversion command of the bib, if one was written in the
+            conversion script.
+
+    """
+    __slots__ = ('position', 'number', 'bib', 'changed', 'barcode', 'digest',
+                 'command')
+
+    def __init__(self, position, number, bib, changed, barcode, digest):
+        self.position = position
+        self.number = number
+        self.bib = bib
+        self.changed = changed
+        self.barcode = barcode
+        self.digest = digest
+        self.command = None
+
+    def manifest_entry(self):
+        """Returns the manifest entry of the bib. See module `manifest`."""
+        number = self.number
+        if hasattr(number, 'item'):
+            # numpy scalar
+            number = number.item()
+        return({'position': self.position, 'number': number,
+                'bib': os.path.basename(self.bib), 'barcode': self.barcode,
+                'sha256': self.digest, 'command': self.command})
+
+
+class RunResult():
+    """Outcome of a run of `BibFactory.make_bib_files`.
+
+    :Attributes:
+
+        **output_rep**: str or list of str
+            Output repository of the bibs (list of the output repositories
+            of the targets if several templates were used).
+        **bibs**: int
+            Number of bibs created (resumed bibs included).
+        **failures**: int
+            Number of bibs that could not be created.
+        **stats**: RunStats or None
+            Measures of the run, if the instrumentation was enabled.
+        **errors**: ErrorReport or None
+            Failures of the run, if the isolation of failures was enabled.
+        **cancelled**: bool
+            Whether the run was stopped before its last bib (see the
+            `cancel` parameter of `make_bib_files`).
+
+    """
+    def __init__(self, output_rep, bibs=0, failures=0, stats=None,
+                 errors=None, cancelled=False):
+        self.output_rep = output_rep
+        self.bibs = bibs
+        self.failures = failures
+        self.stats = stats
+        self.errors = errors
+        self.cancelled = cancelled
+
+    @property
+    def ok(self):
+        """Whether all the bibs of the run were created."""
+        return(self.failures == 0 and not self.cancelled)
+
+    def __fspath__(self):
+        """Returns the output repository, so that the result can be used as
+        a path like the output repository formerly returned by
+        `BibFactory.make_bib_files`."""
+        if not isinstance(self.output_rep, str):
+            raise TypeError("A run with several targets has no single output"
+                            " repository")
+        return(self.output_rep)
+
+    def __repr__(self):
+        return('RunResult({!r}, bibs={}, failures={}{})'.format(
+                   self.output_rep, self.bibs, self.failures,
+                   ', cancelled=True' if self.cancelled else ''))
+
+
+class _Target():
+    """Outputs of one template during a run of `BibFactory.make_bib_files`.
+
+    :Attributes:
+
+        **bib_template**: BibTemplate
+            Template of the bibs.
+        **output_rep**: str
+            Output repository of the bibs.
+        **script**: file or PosixRunner
+            Conversion script, if one is written.
+        **entries**: list of dict
+            Manifest entries of the bibs.
+        **journal**: Journal
+            Journal of the run, if it is resumable.
+        **resumed**: dict
+            Journal entries of the bibs completed by a previous run, keyed
+            by position.
+        **raster**: LayeredRaster
+            Maker of the png bibs in layered mode.
+        **conversions**: ConversionCache
+            Conversion cache of the output repository, if one is used.
+
+    """
+    def __init__(self, bib_template, output_rep):
+        self.bib_template = bib_template
+        self.output_rep = output_rep
+        self.script = None
+        self.entries = []
+        self.journal = None
+        self.resumed = {}
+        self.raster = None
+        self.conversions = None
+
+
+def _with_resumed(units, targets, rendered):
+    """Yields the results of `rendered` with those of the resumed bibs
+    inserted at their place in `units`, the list of the `(item, index)`
+    pairs of the run (see `_render_items`)."""
+    for (position, number, output_name, row), index in units:
+        target = targets[index]
+        entry = target.resumed.get(position)
+        if entry is None:
+            yield(next(rendered))
+        else:
+            yield(index,
+                  BibResult(position, number,
+                            os.path.join(target.output_rep, output_name),
+                            entry['changed'], entry['barcode'],
+                            entry['sha256']), 0)
+
+
+def _round(value):
+    """Returns the text of a number rounded to 1/1000."""
+    return('{:.3f}'.format(value).rstrip('0').rstrip('.'))
+
+
+def _sheet_cell(content):
+    """Returns the root element of a bib (its content without the xml
+    declaration and what precedes the root) and its width and height in px,
+    for a proof sheet. The size is given by the `width` and `height` of the
+    root, or else by its `viewBox`."""
+    match = re.search(r'<svg[\s>]', content)
+    if match is None:
+        raise ValueError("The bib has no svg root element")
+    bib = content[match.start():].rstrip()
+    tag = bib[:bib.index('>')]
+    attributes = {name: value for name, _, value in
+                  re.findall(r'([\w:.-]+)\s*=\s*(["\'])(.*?)\2', tag)}
+    view_box = attributes.get('viewBox', '').replace(',', ' ').split()
+    size = []
+    for name, index in (('width', 2), ('height', 3)):
+        value = attributes.get(name, '').strip()
+        if value and not value.endswith('%'):
+            size.append(parse_length(value))
+        elif len(view_box) == 4:
+            size.append(float(view_box[index]))
+        else:
+            raise ValueError("The size of the bib is not given by its svg "
+                             "root element")
+    return((bib, size[0], size[1]))
+
+
+def _name_key(name):
+    """Returns the normalized form of a name used by the name index."""
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return(' '.join(name.casefold().split()))
+
+
+def _shard_key(position, number, shard_by):
+    """Returns the integer used to assign a participant to a shard."""
+    if shard_by == 'hash':
+        return(zlib.crc32(str(number).encode('utf-8')))
+    try:
+        return(int(number))
+    except (TypeError, ValueError):
+        return(position)
+
+
+def _render_items(renders, items, incremental=False, stats=None,
+                  collect=False):
+    """Renders bibs in the calling process and yields, for each of them, the
+    index of its target, its `BibResult` and the number of bibs left to be
+    processed by workers (always 0 here).
+
+    :Parameters:
+
+        *renders*: list
+            List of the `(bib_template, output_rep, texts, raster)`
+            targets, `texts` being the texts of the fields of the template
+            for all the participants (see `BibTemplate.prepare`) and
+            `raster` the `LayeredRaster` making png bibs in layered mode
+            (None else).
+        *items*: list
+            List of `(position, number, output_name, row, indexes)` tuples,
+            `indexes` being the indexes of the targets of the participant.
+            All the targets of a participant are rendered in a row, from the
+            same record, so that its barcode is generated once (see
+            `BibTemplate._make_barcode`).
+        *collect*: bool, optional
+            If True, the exceptions raised by a bib are not propagated: a
+            `BibError` is yielded instead of its `BibResult`.
+
+    """
+    for position, number, output_name, row, indexes in items:
+        for index in indexes:
+            bib_template, output_rep, texts, raster = renders[index]
+            bib_texts = {field: column[position]
+                         for field, column in texts.items()}
+            maker = bib_template
+            make_file = bib_template.make_svg_file
+            if raster is not None:
+                maker = raster
+                make_file = raster.make_png_file
+            try:
+                # the template adds the barcode field to the values it is
+                # given
+                bib = make_file(dict(row), output_name, output_rep=output_rep,
+                                stats=stats, incremental=incremental,
+                                texts=bib_texts)
+            except Exception as error:
+                if not collect:
+                    # number of the failed bib, for the progress listeners
+                    error.bib_number = number
+                    raise
+                yield(index, BibError.from_exception(position, number, row,
+                                                     maker._stage, error), 0)
+                continue
+            yield(index, BibResult(position, number, bib,
+                                   maker._output_file_changed,
+                                   maker._output_barcode_file,
+                                   maker._output_file_digest), 0)
+
+
+_worker_state = None
+
+
+def _init_worker(renders, incremental, with_stats, collect=False):
+    """Initializer of the worker processes: stores the objects shared by all
+    the chunks of a run."""
+    global _worker_state
+    _worker_state = (renders, incremental, with_stats, collect)
+
+
+def _render_chunk(items):
+    """Worker process entry point: renders a chunk of bibs and returns their
+    `(index, BibResult)` pairs with the measures of the chunk."""
+    renders, incremental, with_stats, collect = _worker_state
+    stats = RunStats() if with_stats else None
+    results = [(index, result) for index, result, _ in
+               _render_items(renders, items, incremental, stats, collect)]
+    return(results, stats)
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains a small HTTP service creating bibs on demand, for the
+reprint of lost bibs on race morning. It only relies on the standard library.
+
+The service answers to:
+
+    - `GET /bib/<number>.svg`: svg bib of a participant,
+    - `GET /bib/<number>.png`: png bib, converted with the conversion command
+      of the template (see `BibTemplate.make_conversion_command`),
+    - `GET /bib/<name>`: any other file of the output repository, such as
+      the barcode pictures linked by the svg bibs,
+    - `GET /stats`: queue wait times of the scheduler (json), when one is
+      used.
+
+The participant is looked up in the index of the bib numbers of its factory
+(see `BibFactory.find`) and the bib is rendered in memory from the compiled
+template (see `BibTemplate.compile`). Results are kept in a `LRUCache` bounded
+in bytes. A cached bib is used as long as the base file of the template and
+the row of the participant are unchanged. When the participants were given as
+a file, it is read again when it is modified.
+
+When a `PriorityScheduler` is given (e.g. shared with the `BibDaemon` making
+the bibs of the race), the bibs are rendered by its workers as reprint jobs,
+which run before its late entry and bulk jobs (see module `scheduler`).
+
+Example
+-------
+
+>>> service = race_bib_creator.BibService('race_1/participants_1.xlsx',
+...                                       template, 'race_1',
+...                                       field_for_numbering='Number')
+>>> service.serve(port=8000)
+
+Then `http://localhost:8000/bib/12.png` gives the bib number 12.
+
+Class definitions
+-----------------
+"""
+import json
+import os
+import tempfile
+import threading
+
+from .bib_factory import BibFactory
+from .bib_template import _encode
+from .conversion_executor import ConversionError, ConversionExecutor
+from .conversion_executor import ConversionJob
+from .journal import row_digest
+from .layered_raster import LayeredRaster
+from .lru_cache import LRUCache
+
+#: Content types of the formats served.
+CONTENT_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png',
+                 'pdf': 'application/pdf'}
+
+
+class BibService():
+    """Creates the bibs of participants on demand.
+
+    :Attributes:
+
+        **bib_template**: BibTemplate
+            Template of the bibs.
+        **output_rep**: str
+            Repository of the barcode files and of the pictures linked by the
+            template.
+        **cache**: LRUCache
+            Cache of the served bibs.
+        **png_px_width**: int
+            Width of the png bibs.
+        **raster**: LayeredRaster
+            Maker of the png bibs in layered mode (None else).
+        **scheduler**: PriorityScheduler
+            Scheduler rendering the bibs (None: rendered by the threads of
+            the requests).
+
+    """
+    def __init__(self, participants, bib_template, output_rep,
+                 field_for_numbering=None, png_px_width=2000,
+                 cache_bytes=64 * 2 ** 20, conversion_timeout=30.0,
+                 layered=False, rasterizer=None, scheduler=None):
+        """
+        :Parameters:
+
+            *participants*: str or BibFactory
+                Path of the participants file (read again when modified), or
+                factory of the participants.
+            *bib_template*: BibTemplate
+                Template of the bibs.
+            *output_rep*: str
+                Repository where barcode files are created.
+            *field_for_numbering*: str, optional
+                See `BibFactory`. Only used if `participants` is a path.
+            *png_px_width*: int, optional
+                Width of the png bibs.
+            *cache_bytes*: int, optional
+                Size limit of the cache.
+            *conversion_timeout*: float, optional
+                Seconds after which a png conversion is abandoned, and the
+                converter killed (see `ConversionExecutor`).
+            *layered*: bool, optional
+                If True, png bibs are made by compositing their dynamic
+                layer onto the static layer of the template, rasterised
+                once (see module `layered_raster`).
+            *rasterizer*: object, optional
+                Rasterizer used by the layered mode. By default, the
+                conversion command of the template is used.
+            *scheduler*: PriorityScheduler, optional
+                Scheduler rendering the bibs as reprint jobs.
+
+        """
+        self.bib_template = bib_template
+        self.output_rep = output_rep
+        self.png_px_width = png_px_width
+        self.conversion_timeout = conversion_timeout
+        self._executor = ConversionExecutor(jobs=1,
+                                            timeout=conversion_timeout,
+                                            retries=0)
+        self.cache = LRUCache(cache_bytes)
+        self.raster = None
+        self.scheduler = scheduler
+        if layered:
+            self.raster = LayeredRaster(bib_template, png_px_width,
+                                        rasterizer)
+        self._field_for_numbering = field_for_numbering
+        self._lock = threading.Lock()
+        self._path = None
+        self._stamp = None
+        if isinstance(participants, str):
+            self._path = participants
+            participants = BibFactory(participants,
+                                      field_for_numbering=field_for_numbering)
+        self._set_factory(participants)
+
+    def _set_factory(self, factory):
+        """Uses a new factory, which index of the bib numbers is built at
+        once."""
+        factory._get_index()
+        self.factory = factory
+        if self._path is not None:
+            status = os.stat(self._path)
+            self._stamp = (status.st_mtime_ns, status.st_size)
+
+    def _reload(self):
+        """Reads the participants file again if it was modified."""
+        if self._path is None:
+            return
+        status = os.stat(self._path)
+        if (status.st_mtime_ns, status.st_size) != self._stamp:
+            self._set_factory(BibFactory(
+                self._path, field_for_numbering=self._field_for_numbering))
+
+    def get(self, number, output_format='svg'):
+        """Returns the bib of a participant in a format, as bytes. Returns
+        None if there is no participant with this number.
+
+        :Parameters:
+
+            *number*: str
+                Bib number.
+            *output_format*: str, optional
+                'svg' (default), 'png' or 'pdf'.
+
+        """
+        with self._lock:
+            self._reload()
+            item = self.factory._get_index().get(str(number))
+            if item is None:
+                return(None)
+            position, _, row = item
+            version = (self.bib_template.compile().stamp, row_digest(row))
+            factory = self.factory
+        key = (str(number), output_format)
+        data = self.cache.get(key, version)
+        if data is None:
+            if self.scheduler is None:
+                data = self._render(factory, position, row, output_format)
+            else:
+                data = self.scheduler.submit('reprint', self._render, factory,
+                                             position, row,
+                                             output_format).result()
+            self.cache.put(key, version, data)
+        return(data)
+
+    def _render(self, factory, position, row, output_format):
+        """Renders the bib of a row of a factory in a format."""
+        with self._lock:
+            # the template (and its layers) are not thread safe, svg
+            # conversions are. The texts of the fields are prepared for the
+            # whole table on first use.
+            texts = factory._texts_row(self.bib_template, position)
+            if output_format == 'png' and self.raster is not None:
+                return(self.raster.render_png(dict(row),
+                                              output_rep=self.output_rep,
+                                              incremental=True, texts=texts))
+            content = self.bib_template.render(
+                dict(row), output_rep=self.output_rep, incremental=True,
+                texts=texts)
+        data = _encode(content)
+        if output_format == 'svg':
+            return(data)
+        # the svg file is written next to the pictures it links
+        source = tempfile.NamedTemporaryFile(dir=self.output_rep,
+                                             prefix='.service-',
+                                             suffix='.svg', delete=False)
+        dest = os.path.splitext(source.name)[0] + '.' + output_format
+        try:
+            with source:
+                source.write(data)
+            command = self.bib_template.make_conversion_command(
+                source=source.name, dest=dest, px_width=self.png_px_width,
+                output_format=output_format, posix=os.name == 'posix')
+            job = self._executor.run_job(ConversionJob(command, dest))
+            if not job.ok:
+                raise ConversionError(job)
+            with open(dest, 'rb') as converted:
+                return(converted.read())
+        finally:
+            for path in (source.name, dest):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def get_file(self, name):
+        """Returns the content of a file of the output repository (barcode
+        picture...), or None if there is no such file."""
+        if name != os.path.basename(name) or name.startswith('.'):
+            return(None)
+        path = os.path.join(self.output_rep, name)
+        if not os.path.isfile(path):
+            return(None)
+        with open(path, 'rb') as stream:
+            return(stream.read())
+
+    def make_server(self, host='127.0.0.1', port=8000):
+        """Returns a threading `http.server` serving the bibs. Use its
+        `serve_forever` method to start it."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                service._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return(ThreadingHTTPServer((host, port), Handler))
+
+    def serve(self, host='127.0.0.1', port=8000):
+        """Serves the bibs until interrupted."""
+        server = self.make_server(host, port)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+
+    def _handle(self, request):
+        """Answers a GET request."""
+        path = request.path.split('?')[0]
+        prefix, _, name = path.partition('/bib/')
+        status, data, content_type = 404, b'not found\n', 'text/plain'
+        if path == '/stats' and self.scheduler is not None:
+            status, content_type = 200, 'application/json'
+            data = json.dumps(self.scheduler.wait_stats(), indent=1,
+                              sort_keys=True).encode('utf-8')
+        elif not prefix and name:
+            number, _, output_format = name.rpartition('.')
+            try:
+                if output_format in CONTENT_TYPES:
+                    bib = self.get(number, output_format)
+                    if bib is not None:
+                        status, data = 200, bib
+                        content_type = CONTENT_TYPES[output_format]
+                if status == 404:
+                    picture = self.get_file(name)
+                    if picture is not None:
+                        status, data = 200, picture
+                        content_type = CONTENT_TYPES.get(
+                            output_format, 'application/octet-stream')
+            except Exception as error:
+                status = 500
+                data = '{}: {}\n'.format(type(error).__name__,
+                                         error).encode('utf-8')
+                content_type = 'text/plain'
+        request.send_response(status)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
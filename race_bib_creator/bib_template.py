@@ -49,9 +49,9 @@ races as below.
 
 This template is then used with two different participant lists to create bibs
 for two races.
-The table below represents the participants of race 1. For now, "frozen fields
-have not been enabled yet in factories (this is a TODO). Therefore, the races
-names and date are treated as generic fields in this example.
+The table below represents the participants of race 1. In this example, the
+races names and date are treated as generic fields, repeated on every row (see
+below for frozen fields).
 
 .. csv-table::
     :file: illustrations/participants_1.csv
@@ -98,13 +98,80 @@ and not inserted in the svg files to be easily replaced).
 
     Example of result for the first participant of race 1.
 
+The race name and date are the same for all the participants of a race. They
+can be given once as *frozen fields*, to the template or to the factory, rather
+than repeated in the participants table. Frozen fields are substituted once,
+when the template is compiled (see `BibTemplate.compile`), so that only the
+fields that vary from a participant to another are replaced for each bib.
+
+>>> factory = race_bib_creator.BibFactory(participants="race_1\\participants_1.xlsx",
+                                      field_for_numbering='Number',
+                                      frozen_fields={'Race': 'Race 1',
+                                                     'Date': '2017-01-16'})
+>>> factory.make_bib_files(template,'race_1')
+
+Fields displayed in another form than in the participants table (upper-cased
+surname, short name, age category...) can be given as *derived fields*,
+computed for the whole table before the bibs are made (see module
+`derived_fields`) rather than added to the table.
+
 Class definition
 ----------------
 """
 import os
+import copy
+import gzip
+import hashlib
+import io
+import locale
 import math
+import shlex
 import warnings
 
+from .compiled_template import CompiledTemplate
+from .derived_fields import evaluate, evaluate_row, formatted
+from .lru_cache import LRUCache
+from .run_stats import NULL_STATS
+
+_barcode_modules = None
+
+#: Cache of the barcode pictures shared by the templates of a process which
+#: use it (see `shared_barcode_cache`). Its `clear` method releases its memory.
+BARCODE_CACHE = LRUCache(16 * 2 ** 20)
+
+#: Default conversion commands of the templates in POSIX shells (conversion
+#: scripts for `script_format='sh'`): Inkscape 1.x found on the PATH.
+INKSCAPE_POSIX_COMMAND = ('inkscape --export-type=png --export-width={width} '
+                          '--export-filename={dest_png} {source_svg}\n')
+INKSCAPE_POSIX_PDF_COMMAND = ('inkscape --export-type=pdf '
+                              '--export-filename={dest_pdf} {source_svg}\n')
+
+
+def _get_barcode_modules():
+    """Returns the pyBarcode module and its `ImageWriter` class. They (and
+    PIL) are imported on first use only, once per process."""
+    global _barcode_modules
+    if _barcode_modules is None:
+        import barcode
+        from barcode.writer import ImageWriter
+        _barcode_modules = (barcode, ImageWriter)
+    return(_barcode_modules)
+
+def _encode(content, compress=False):
+    """Returns the bytes of a bib file, encoded as a file opened in text mode
+    would have done, and compressed with gzip (with a fixed time stamp so that
+    identical contents give identical files) if `compress` is True."""
+    if os.linesep != '\n':
+        content = content.replace('\n', os.linesep)
+    data = content.encode(locale.getpreferredencoding(False))
+    if compress:
+        buffer = io.BytesIO()
+        with gzip.GzipFile(filename='', mode='wb', fileobj=buffer,
+                           mtime=0) as compressed:
+            compressed.write(data)
+        data = buffer.getvalue()
+    return(data)
+
 class BibTemplate():
     """A template for personnalized runner id (bib) creation.
 
@@ -139,16 +206,60 @@ class BibTemplate():
 
             "C:\Program Files\Inkscape\inkscape.exe" -z -f {source_svg} -w {width} -j -e {dest_png}\n
 
+        **_pdf_conversion_command**: str
+            Command used to call Inkscape for pdf production.
         **_output_file_path**: str
             Attribute used to store (temporarily) the output file path so
             that it can be used for command creation.
+        **_output_file_changed**: bool
+            Whether the last call to `make_svg_file` changed the content of
+            the output file (always True unless `incremental` is used).
+        **_output_file_digest**: str
+            sha256 digest of the last output file.
+        **_output_barcode_file**: str
+            Name of the barcode file used by the last output file, if any.
+        **_compiled**: CompiledTemplate
+            Compiled base file, see `compile`.
+        **_frozen_fields**: dict
+            Values of the fields substituted when the template is compiled.
+        **_derived_fields**: dict
+            `DerivedField` objects of the fields computed from the columns of
+            the participants table.
+        **_escape_values**: bool
+            Whether the values of the fields are escaped for XML.
+        **_layer**: str
+            Layer of the base file used by the template, None for the whole
+            file (see `layer`).
+        **_barcode_cache**: LRUCache
+            Contents of the barcode pictures, keyed by encoding and barcode
+            string (`BARCODE_CACHE` if `shared_barcode_cache` is True).
+        **_run_barcode_cache**: LRUCache
+            Cache of the barcode pictures shared with the other templates of
+            the current run of a `BibFactory`, None out of a run.
+        **_stage**: str
+            Stage (see module `run_stats`) reached by the last call to
+            `make_svg_file`. Tells where a failing call failed.
+        **_outline_fonts**: dict
+            Paths of the font files of the fields drawn as paths, keyed by
+            fields names (see module `text_outlines`).
+        **_text_fits**: dict
+            `TextFit` objects of the fields fitted in a box, keyed by fields
+            names (see module `text_fit`).
+        **_barcode_sprites**: BarcodeSprites
+            Sprite sheet in which the barcodes are drawn instead of png
+            files, None for png files (see `with_barcode_sprites`).
 
     """
     def __init__(self,base_file_name, fields, conversion_command=None,
                  use_barcodes=False, barcode_string_template="00{}",
                  barcode_encoding="code39", barcode_field_name = "barcode",
                  barcode_number_field_name="numero",
-                 id_ndigits_for_barcode=5, barcode_prefix_name="barcode_"):
+                 id_ndigits_for_barcode=5, barcode_prefix_name="barcode_",
+                 pdf_conversion_command=None, barcode_cache_bytes=0,
+                 frozen_fields=None, derived_fields=None,
+                 escape_values=None, batch_conversion_command=None,
+                 outline_fonts=None, text_fits=None,
+                 shared_barcode_cache=False):
         """Returns a BibTemplate instance for runner id generation.
 
         :Parameters:
@@ -168,6 +279,9 @@ class BibTemplate():
                 -nality is very basi and only Inkscape can be used for that so a
                 string to be formated as in the code hereunder is expected. This is
                 to be improved.
+                By default, Inkscape is called at its Windows location, or on
+                the PATH for the commands run by a POSIX shell (see
+                `make_conversion_command`).
             *use_barcodes*: bool, optional
                 Specifies whether barcodes are used in this template or not.
             *barcode_string_template*: str, optional
@@ -191,6 +305,58 @@ class BibTemplate():
                 length with zero completion).
             *barcode_prefix_name*: str, optional
                 Prefix for the name of the barcode files that may be generated.
+            *pdf_conversion_command*: str, optional
+                Same as `conversion_command` for the conversion of svg files to
+                pdf files. The path of the pdf file is given by the
+                `{dest_pdf}` argument.
+            *barcode_cache_bytes*: int, optional
+                Size limit of the in-memory cache of the barcode pictures.
+                A barcode found in the cache is written again without being
+                generated, e.g. when a bib is made again. Default is 0 (no
+                cache).
+            *frozen_fields*: dict, optional
+                Values of fields that are the same for all the bibs (race
+                name, date...), keyed by fields names. Their markers are
+                replaced once, when the template is compiled, and the values
+                of these fields given for each bib are ignored.
+            *derived_fields*: dict
+                Fields computed from the columns of the participants table,
+                keyed by fields names: `DerivedField` objects, or patterns
+                such as `'{Firstname} {Lastname}'`. Their markers are given
+                in `fields`. See module `derived_fields`.
+            *escape_values*: bool, optional
+                Whether the values of the fields are escaped for XML (see
+                module `compiled_template`). Default is True if the base
+                file is a svg or xml file, False else.
+            *batch_conversion_command*: str, optional
+                Template command converting several svg files in one call,
+                used by the POSIX conversion runner (see module
+                `conversion_runner`). `{sources}` is replaced by the svg
+                files, `{width}` by the width in px and `{format}` by the
+                output format. The converted files must be written next to
+                the svg files, with the same names, as Inkscape 1.x does
+                with `INKSCAPE_BATCH_COMMAND`. By default, the files of a
+                batch are converted one at a time with `conversion_command`
+                (or `pdf_conversion_command`).
+            *outline_fonts*: dict, optional
+                Font files (TrueType or OpenType) keyed by fields names. The
+                texts of these fields are drawn as paths made of the
+                outlines of the glyphs of their font, so that the bibs do
+                not depend on the fonts installed where they are converted
+                or printed. Their markers must be held by text elements.
+                See module `text_outlines`.
+            *text_fits*: dict, optional
+                `TextFit` objects keyed by fields names. The texts of these
+                fields which are wider than the box of their `TextFit` are
+                narrowed (smaller font size or tighter letter spacing) to fit
+                in it. See module `text_fit`.
+            *shared_barcode_cache*: bool, optional
+                If True, the template uses `BARCODE_CACHE` (and
+                `barcode_cache_bytes` is ignored): the barcode of a
+                participant is generated once for all the templates of the
+                process which share it, e.g. several designs rendered in one
+                run, and for later runs. Its memory is only released by
+                `BARCODE_CACHE.clear()`. Default is False.
 
         :Example:
 
@@ -221,6 +387,13 @@ class BibTemplate():
         inkscape_dft_cmd = ('"C:\Program Files\Inkscape\inkscape.exe" '
             '-z -f {source_svg} -w {width} -j -e {dest_png}\n')
         self._conversion_command = conversion_command or inkscape_dft_cmd
+        self._default_conversion = not conversion_command
+        inkscape_dft_pdf_cmd = ('"C:\Program Files\Inkscape\inkscape.exe" '
+            '-z -f {source_svg} -A {dest_pdf}\n')
+        self._pdf_conversion_command = (pdf_conversion_command or
+                                        inkscape_dft_pdf_cmd)
+        self._default_pdf_conversion = not pdf_conversion_command
+        self._batch_conversion_command = batch_conversion_command
         # whether to use a barcode or not
         self._use_barcodes = use_barcodes
         # field where the barcode number is given
@@ -238,9 +411,215 @@ class BibTemplate():
         # for command creation
         self._barcode_prefix_name = barcode_prefix_name
         self._output_file_path = None
+        self._output_file_changed = False
+        self._output_file_digest = None
+        self._output_barcode_file = None
+        self._stage = None
+        self._compiled = None
+        self._frozen_fields = dict(frozen_fields or {})
+        self._layer = None
+        self._derived_fields = {}
+        for field, derived in (derived_fields or {}).items():
+            if isinstance(derived, str):
+                derived = formatted(derived)
+            self._derived_fields[field] = derived
+        if escape_values is None:
+            escape_values = os.path.splitext(base_file_name)[1].lower() in (
+                '.svg', '.xml')
+        self._escape_values = escape_values
+        self._outline_fonts = dict(outline_fonts or {})
+        self._text_fits = dict(text_fits or {})
+        self._barcode_sprites = None
+        if shared_barcode_cache:
+            self._barcode_cache = BARCODE_CACHE
+        else:
+            self._barcode_cache = LRUCache(barcode_cache_bytes)
+        self._run_barcode_cache = None
+
+    def freeze(self, frozen_fields):
+        """Returns a copy of the template with additional frozen fields (see
+        `__init__`). The copy shares the barcode cache of the template.
+
+        :Parameters:
+
+            *frozen_fields*: dict
+                Values of the frozen fields, keyed by fields names.
+
+        """
+        template = copy.copy(self)
+        template._frozen_fields = dict(self._frozen_fields)
+        template._frozen_fields.update(frozen_fields)
+        template._compiled = None
+        return(template)
+
+    def compile(self, force=False):
+        """Returns the `CompiledTemplate` of the base file. It is compiled on
+        first call and compiled again when the base file is modified (or
+        if `force` is True).
+
+        :Returns:
+
+            *compiled*: CompiledTemplate
+
+        """
+        status = os.stat(self._base_file)
+        stamp = (status.st_mtime_ns, status.st_size)
+        compiled = self._compiled
+        if force or compiled is None or compiled.stamp != stamp:
+            with open(self._base_file,'r') as template:
+                content = template.read()
+            if self._layer is not None:
+                content = self._layer_content(content)
+            if self._barcode_sprites is not None and self._use_barcodes:
+                from .barcode_sprites import sprite_references
+                content = sprite_references(
+                    content, self._fields[self._barcode_field_name])
+            formatters = {}
+            if self._outline_fonts or self._text_fits:
+                from .text_outlines import outline_texts
+                content, formatters = outline_texts(content, self._fields,
+                                                    self._outline_fonts,
+                                                    fits=self._text_fits)
+            compiled = CompiledTemplate(content, self._fields, stamp,
+                                        frozen=self._frozen_fields,
+                                        escape_values=self._escape_values,
+                                        formatters=formatters)
+            self._compiled = compiled
+        return(compiled)
+
+    def layer(self, name):
+        """Returns a copy of the template which base file is reduced to one
+        of its layers, 'static' or 'dynamic' (see module `layered_raster`).
+        The copy shares the barcode cache of the template."""
+        assert name in ('static', 'dynamic'), ("The layer must be 'static' "
+        "or 'dynamic'")
+        template = copy.copy(self)
+        template._layer = name
+        template._compiled = None
+        return(template)
+
+    def with_barcode_sprites(self, sprites):
+        """Returns a copy of the template for bibs combined into one
+        document: its barcode picture is replaced by a `<use>` element
+        referencing the symbol of the barcode of each bib in a sprite sheet,
+        instead of a png file (see module `barcode_sprites`). The copy
+        shares the barcode cache of the template.
+
+        :Parameters:
+
+            *sprites*: BarcodeSprites
+                Sprite sheet of the document, to which the barcodes of the
+                bibs rendered with the copy are added.
+
+        """
+        template = copy.copy(self)
+        template._barcode_sprites = sprites
+        template._compiled = None
+        return(template)
+
+    def _layer_content(self, content):
+        """Returns the layer of a base file content."""
+        from .layered_raster import split_layers
+        markers = [marker for field, marker in self._fields.items()
+                   if field not in self._frozen_fields]
+        static, dynamic = split_layers(content, markers)
+        return(static if self._layer == 'static' else dynamic)
+
+    def derive(self, table):
+        """Evaluates the derived fields used by the template (not frozen
+        and which marker is in the base file) for a whole participants
+        table.
+
+        :Parameters:
+
+            *table*: pd.DataFrame
+                Participants table.
+
+        :Returns:
+
+            *values*: dict
+                Lists of the texts of the fields (in the order of the
+                table), keyed by fields names.
+
+        """
+        return(evaluate(self._used_derived_fields(), table))
+
+    def prepare(self, records, table=None):
+        """Returns the texts of the fields used by the template for all the
+        participants, ready to be inserted in the bibs: the derived fields
+        are evaluated (see `derive`) and the values are converted to str
+        and escaped column by column, each distinct value of a column once
+        (see `CompiledTemplate.texts`).
+
+        :Parameters:
+
+            *records*: list of dict
+                Rows of the participants.
+            *table*: pd.DataFrame, optional
+                Table of the same participants, used to evaluate the derived
+                fields. Built from `records` if needed and not given.
+
+        :Returns:
+
+            *texts*: dict
+                Lists of the texts of the fields (in the order of the
+                participants), keyed by fields names. The fields missing
+                from some rows are left out. The text of a derived field
+                which could not be evaluated for a participant is the
+                exception raised, raised again when its bib is made.
+
+        """
+        compiled = self.compile()
+        texts = {}
+        for field in compiled.fields:
+            if field in self._derived_fields or (
+                    self._use_barcodes and field == self._barcode_field_name):
+                # the barcode field is given by the barcode file of each bib
+                continue
+            if all(field in row for row in records):
+                texts[field] = compiled.texts(field, [row[field]
+                                                      for row in records])
+        if self._used_derived_fields():
+            if table is None:
+                import pandas as pd
+                table = pd.DataFrame(records)
+            for field, values in self.derive(table).items():
+                failed = {position: value for position, value
+                          in enumerate(values)
+                          if isinstance(value, Exception)}
+                texts[field] = compiled.texts(
+                    field, ['' if position in failed else value
+                            for position, value in enumerate(values)])
+                for position, error in failed.items():
+                    texts[field][position] = error
+        return(texts)
+
+    def _used_derived_fields(self):
+        """Returns the derived fields which marker is in the compiled base
+        file."""
+        fields = self.compile().fields
+        return({field: derived for field, derived in
+                self._derived_fields.items() if field in fields})
+
+    def __getstate__(self):
+        # worker processes compile their own copy and use their own shared
+        # barcode cache. They are given the prepared texts of the derived
+        # fields, which functions may not be picklable.
+        state = self.__dict__.copy()
+        state['_compiled'] = None
+        state['_derived_fields'] = {}
+        if self._barcode_cache is BARCODE_CACHE:
+            state['_barcode_cache'] = None
+        return(state)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._barcode_cache is None:
+            self._barcode_cache = BARCODE_CACHE
 
     def make_svg_file(self, fields_values, output_name, output_rep=None,
-                      barcode_id=None):
+                      barcode_id=None, stats=None, incremental=False,
+                      texts=None):
         """Replaces the provided fields markers by provided fields values and
         returns output file name.
 
@@ -257,6 +636,24 @@ class BibTemplate():
                 path toward the repository in which the output file must be created.
             *barcode_id*: int, optional
                 Number to be passed to the barcode creator if no field provides it.
+            *stats*: RunStats, optional
+                Object in which the durations of the validate, barcode, render
+                and write stages are recorded. See module `run_stats`.
+            *incremental*: bool, optional
+                If True, the output file is not rewritten if its content is
+                unchanged and an existing barcode file is kept as is.
+            *texts*: dict, optional
+                Texts of fields of the bib ready to be inserted (converted
+                to str and escaped), keyed by fields names, as prepared by
+                `prepare` for the whole table. They take precedence over
+                `fields_values`. By default, the derived fields are
+                evaluated from `fields_values`.
+
+            If `output_name` ends with `.svgz`, the output file is compressed
+            with gzip.
+
+            Raises a ValueError if barcodes are used and neither the barcode
+            number field nor `barcode_id` gives the number of the barcode.
 
         :Returns:
 
@@ -267,11 +664,9 @@ class BibTemplate():
 
         :Info:
 
-            The way this task is done is currently very rough and inefficient
-            (see source code): the markers are looked for and replaced if found
-            in all the lines of the file for each new bib...
-            Using acleaner method, e.g. using a dedicated templating package
-            should be (and is) considered as improvement to this code.
+            The markers are replaced in the compiled base file (see
+            `compile`): the base file is only read and searched for markers
+            again when it is modified.
 
         .. warning::
              For now, if pictures are referenced in the svg basefile, they
@@ -282,53 +677,148 @@ class BibTemplate():
         """
         if output_rep is None:
             output_rep = os.getcwd()
-        # Barcode file creation if needed
-        if self._use_barcodes:
-            try:
-                number = fields_values[self._barcode_number_field_name]
-            except AttributeError:
-                if barcode_id is not None:
-                    number = barcode_id
-                else:
-                    print("There is no {} field to be used for the barcode in"
-                          " the provided "
-                          "inputs".format(self._barcode_number_field_name))
-                    return()
-            barcode_file = self._make_barcode(number,output_rep)
-            fields_values[self._barcode_field_name] = barcode_file
-        #selecting provided field values that will be used
-        fields_to_use = []
-        for field in fields_values.keys():
-            if self._fields.get(field) is not None:
-                fields_to_use.append(field)
-        # Opening the template file (svg file or other text parsable file)
-        # TODO: cette partie est degueu. Utiliser une gestion de template exi
-        # -stant (ex. jinja2 mais pas de support de Python 3.5 pour l'instant)
-        with open(self._base_file,'r') as template:
-            line = template.readline()
-            # Opening output file
-            bib = output_rep + '\\' + output_name
-            with open(bib,'w') as output:
-                while line:
-                    for field in fields_to_use:
-                        line = line.replace(self._fields[field],
-                                            str(fields_values[field]))
-                    output.write(line)
-                    line = template.readline()
-                # Reading template file and replacing fields
-                # Closing output file
-                output.close()
-            # Closing the template file
-            template.close()
+        stats = stats or NULL_STATS
+        content = self.render(fields_values, output_rep=output_rep,
+                              barcode_id=barcode_id, stats=stats,
+                              incremental=incremental, texts=texts)
+        # Writing the output file
+        self._stage = 'write'
+        start = stats.clock()
+        bib = os.path.join(output_rep, output_name)
+        data = _encode(content, compress=output_name.endswith('.svgz'))
+        self._output_file_digest = hashlib.sha256(data).hexdigest()
+        self._output_file_changed = True
+        if incremental and os.path.exists(bib):
+            with open(bib, 'rb') as previous:
+                self._output_file_changed = previous.read() != data
+        if self._output_file_changed:
+            with open(bib,'wb') as output:
+                output.write(data)
+            stats.record('write', stats.clock() - start, len(data))
         self._output_file_path = bib
         #/!\ For now, if pictures are referenced in the svg basefile, they
         # must be present in the output repository because they will also
         # be referenced in the results files.
         return(bib)
 
-    def make_conversion_command(self,source=None,dest=None,px_width=1000):
-        """Returns the conversion command from svg to png by Inkscape. See
-        Inkscape documentation.
+    def render(self, fields_values, output_rep=None, barcode_id=None,
+               stats=None, incremental=False, texts=None):
+        """Returns the content of a bib, without writing it. The barcode file
+        of the bib is created in `output_rep` if barcodes are used. See
+        `make_svg_file` for the parameters.
+
+        :Returns:
+
+            *content*: str
+                Content of the bib.
+
+        """
+        if output_rep is None:
+            output_rep = os.getcwd()
+        stats = stats or NULL_STATS
+        start = stats.clock()
+        self._stage = 'validate'
+        if self._use_barcodes:
+            number = fields_values.get(self._barcode_number_field_name)
+            if number is None or number != number:
+                # missing field or missing value (NaN) in the table
+                number = barcode_id
+            if number is None:
+                raise ValueError("There is no {} field to be used for the "
+                                 "barcode in the provided inputs".format(
+                                     self._barcode_number_field_name))
+        self._output_barcode_file = None
+        #selecting provided field values that will be used: fields which
+        # marker is found in the template and which are not frozen
+        compiled = self.compile()
+        fields_to_use = []
+        for field in fields_values.keys():
+            if field in compiled.fields:
+                fields_to_use.append(field)
+        if texts is None:
+            texts = {}
+            if self._derived_fields:
+                # derived fields not evaluated beforehand by a factory
+                texts = {field: compiled.escape(field, text) for field, text
+                         in evaluate_row(self._used_derived_fields(),
+                                         fields_values).items()}
+        for text in texts.values():
+            if isinstance(text, Exception):
+                # derived field which evaluation failed for this participant
+                raise text
+        stats.record('validate', stats.clock() - start)
+        # Barcode file creation if needed
+        if self._use_barcodes:
+            self._stage = 'barcode'
+            start = stats.clock()
+            nbytes = 0
+            if self._barcode_sprites is not None:
+                barcode_file = self._barcode_sprites.add(
+                    self._barcode_encoding, self._barcode_string(number),
+                    name=self._barcode_prefix_name +
+                    self._barcode_string(number))
+            else:
+                barcode_file = self._make_barcode(number,output_rep,
+                                                  incremental=incremental)
+                self._output_barcode_file = barcode_file
+                if stats.enabled:
+                    nbytes = os.path.getsize(os.path.join(output_rep,
+                                                          barcode_file))
+            stats.record('barcode', stats.clock() - start, nbytes)
+            fields_values[self._barcode_field_name] = barcode_file
+            if (self._barcode_field_name in compiled.fields and
+                    self._barcode_field_name not in fields_to_use):
+                fields_to_use.append(self._barcode_field_name)
+        # Filling the compiled template (svg file or other text parsable
+        # file)
+        self._stage = 'render'
+        start = stats.clock()
+        values = dict(texts)
+        for field in fields_to_use:
+            if field not in values:
+                values[field] = compiled.escape(field,
+                                                str(fields_values[field]))
+        content = compiled.render(values)
+        stats.record('render', stats.clock() - start)
+        return(content)
+
+    def fingerprint(self):
+        """Returns a digest identifying the output of the template: it changes
+        whenever the base file or the settings used to fill it change.
+
+        :Returns:
+
+            *fingerprint*: str
+                sha256 hexadecimal digest.
+
+        """
+        digest = hashlib.sha256()
+        with open(self._base_file, 'rb') as template:
+            digest.update(template.read())
+        settings = (sorted(self._fields.items()),
+                    sorted((field, str(value)) for field, value in
+                           self._frozen_fields.items()),
+                    sorted((field, repr(derived)) for field, derived in
+                           self._derived_fields.items()),
+                    self._escape_values,
+                    self._use_barcodes,
+                    self._barcode_number_field_name,
+                    self._barcode_field_name, self._barcode_string_template,
+                    self._barcode_encoding, self._id_ndigits_for_barcode,
+                    self._barcode_prefix_name)
+        if self._outline_fonts:
+            settings += (sorted(self._outline_fonts.items()),)
+        if self._text_fits:
+            settings += (sorted((field, repr(fit)) for field, fit in
+                                self._text_fits.items()),)
+        digest.update(repr(settings).encode('utf-8'))
+        return(digest.hexdigest())
+
+    def make_conversion_command(self,source=None,dest=None,px_width=1000,
+                                output_format='png', absolute=True,
+                                posix=False):
+        """Returns the conversion command from svg to png (or pdf) by
+        Inkscape. See Inkscape documentation.
 
 
        :Parameters:
@@ -339,6 +829,16 @@ class BibTemplate():
                 path toward location of the expected result png file.
             *px_width*: int, optional
                 Width of the resulting png picture in px.
+            *output_format*: str, optional
+                'png' (default) or 'pdf'.
+            *absolute*: bool, optional
+                If True (default), the paths are made absolute. Else, they
+                are used as given (e.g. relative to the output repository).
+            *posix*: bool, optional
+                If True, the command is run by a POSIX shell: when no
+                conversion command was given to the template, Inkscape is
+                called on the PATH (`INKSCAPE_POSIX_COMMAND`) instead of its
+                Windows location. Default is False.
 
        :Returns:
 
@@ -349,15 +849,65 @@ class BibTemplate():
         """
         assert isinstance(px_width,int), "The number of px must be an integer."
         source = source or self._output_file_path
-        source = os.path.abspath(source)
-        dest = dest or self._output_file_path[:-3]+'png'
-        dest = os.path.abspath(dest)
-        command = self._conversion_command.format(**{'source_svg':source,
-                                                   'width':px_width,
-                                                   'dest_png':dest})
+        dest = dest or (os.path.splitext(self._output_file_path)[0] + '.' +
+                        output_format)
+        if absolute:
+            source = os.path.abspath(source)
+            dest = os.path.abspath(dest)
+        if output_format == 'pdf':
+            command_template = self._pdf_conversion_command
+            if posix and self._default_pdf_conversion:
+                command_template = INKSCAPE_POSIX_PDF_COMMAND
+        else:
+            command_template = self._conversion_command
+            if posix and self._default_conversion:
+                command_template = INKSCAPE_POSIX_COMMAND
+        command = command_template.format(**{'source_svg':source,
+                                             'width':px_width,
+                                             'dest_png':dest,
+                                             'dest_pdf':dest})
         return(command)
 
-    def _make_barcode(self, number, output_rep):
+    def make_batch_conversion_command(self, sources, px_width=1000,
+                                      output_format='png'):
+        """Returns the command converting several svg files in one call
+        (see `batch_conversion_command`), for a POSIX shell, or None if the
+        template has no batch conversion command.
+
+        :Parameters:
+
+            *sources*: list of str
+                Paths of the svg files, used as given.
+            *px_width*: int, optional
+                Width of the resulting png pictures in px.
+            *output_format*: str, optional
+                'png' (default) or 'pdf'.
+
+        """
+        if self._batch_conversion_command is None:
+            return(None)
+        return(self._batch_conversion_command.format(
+            sources=' '.join(shlex.quote(source) for source in sources),
+            width=px_width, format=output_format).strip())
+
+    def _barcode_string(self, number):
+        """Returns the string encoded by the barcode of a participant (see
+        `_make_barcode`)."""
+        #create the string to be encoded
+        # TODO: retravailler pour rendre plus général
+        number_ndigits = int(math.log10(number)) + 1
+        # Give a warnong if the number is too long
+        if number_ndigits > self._id_ndigits_for_barcode:
+            warnings.warn("Not enough digits attributed to IDs given "
+                          "participants numbers: {} has {} digits but {} are"
+                          " expected at most".format(number,number_ndigits,
+                          self._id_ndigits_for_barcode))
+        barcode_string_complement =  "0" * (self._id_ndigits_for_barcode -
+                                            number_ndigits) + str(number)
+        return(self._barcode_string_template.format(
+                   barcode_string_complement))
+
+    def _make_barcode(self, number, output_rep, incremental=False):
         """Creates a barcode picture and returns the file name.
 
 
@@ -369,6 +919,9 @@ class BibTemplate():
             *output_rep*: str
                 Path toward the repository in which the output barcode file
                 must be produced.
+            *incremental*: bool, optional
+                If True and the barcode file already exists, it is not
+                produced again.
 
         :Info:
 
@@ -381,28 +934,33 @@ class BibTemplate():
             scanning the barcodes.
 
         """
-        import barcode
-        from barcode.writer import ImageWriter
-        #create the string to be encoded
-        # TODO: retravailler pour rendre plus général
-        number_ndigits = int(math.log10(number)) + 1
-        # Give a warnong if the number is too long
-        if number_ndigits > self._id_ndigits_for_barcode:
-            warnings.warn("Not enough digits attributed to IDs given "
-                          "participants numbers: {} has {} digits but {} are"
-                          " expected at most".format(number,number_ndigits,
-                          self._id_ndigits_for_barcode))
-        barcode_string_complement =  "0" * (self._id_ndigits_for_barcode -
-                                            number_ndigits) + str(number)
-        barcode_string = self._barcode_string_template.format(
-                            barcode_string_complement)
+        barcode_string = self._barcode_string(number)
         #create the barcode png picture
         barcode_png = str.join("",[self._barcode_prefix_name, barcode_string])
-        barcode_instance = barcode.get(self._barcode_encoding,
-                                       barcode_string,
-                                       writer=ImageWriter())
-        barcode_file_path = output_rep + '\\' + barcode_png
-        barcode_instance.save(barcode_file_path)
+        if incremental and os.path.exists(os.path.join(output_rep,
+                                                       barcode_png + '.png')):
+            return(barcode_png+'.png')
+        key = (self._barcode_encoding, barcode_string)
+        data = self._barcode_cache.get(key, None)
+        run_cache = self._run_barcode_cache
+        if data is None and run_cache is not None:
+            data = run_cache.get(key, None)
+            if data is not None:
+                self._barcode_cache.put(key, None, data)
+        if data is None:
+            barcode, ImageWriter = _get_barcode_modules()
+            barcode_instance = barcode.get(self._barcode_encoding,
+                                           barcode_string,
+                                           writer=ImageWriter())
+            buffer = io.BytesIO()
+            barcode_instance.write(buffer)
+            data = buffer.getvalue()
+            self._barcode_cache.put(key, None, data)
+            if run_cache is not None:
+                run_cache.put(key, None, data)
+        barcode_file_path = os.path.join(output_rep, barcode_png + '.png')
+        with open(barcode_file_path, 'wb') as picture:
+            picture.write(data)
         return(barcode_png+'.png')
 
 
@@ -0,0 +1,542 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the command line interface of the package. It creates a
+`BibTemplate` and a `BibFactory` from its arguments, makes the bibs and prints
+a throughput summary so that bib production can be scripted, timed and run by
+a batch scheduler.
+
+Example
+-------
+
+The bibs of the generic example can be produced with::
+
+    python -m race_bib_creator bib_template_example.svg race_1/participants_1.xlsx race_1 \\
+        --field Number=DNB --field Category="&lt;cat&gt;" \\
+        --field Firstname=first_name --field Date=event_date \\
+        --field Race=event_name --numbering Number \\
+        --barcode barcode=barcode.png --barcode-number-field Number \\
+        --barcode-prefix barcode_file --jobs 4 --format png
+
+Use `python -m race_bib_creator --help` for the list of the options. The
+outputs of sharded runs (`--shard I/N`) gathered in one repository are merged
+with::
+
+    python -m race_bib_creator merge race_1
+
+With `--watch`, the command keeps running and makes again the affected bibs
+each time the template or the participants file is saved (see module
+`daemon`).
+
+With `--serve PORT`, the bibs are served on demand over HTTP (see module
+`bib_service`). With both `--serve` and `--watch`, the served bibs and the
+updates share a `PriorityScheduler`: reprints run before the updates (see
+module `scheduler`).
+
+With `--proof-sheet FILE`, the bibs are written side by side in one svg file
+to be proofread, instead of a file per bib (see
+`BibFactory.make_proof_sheet`).
+
+With `--queue DIR`, one process started with `--role coordinator` publishes
+the bibs in a shared work queue and any number of processes started with
+`--role worker` create them (see module `work_queue`).
+"""
+import argparse
+import json
+import sys
+import threading
+
+from .bib_factory import BibFactory, OUTPUT_FORMATS
+from .bib_service import BibService
+from .bib_template import BibTemplate
+from .conversion_executor import ConversionExecutor
+from .daemon import BibDaemon
+from .derived_fields import from_expression
+from .error_report import ErrorReport, read_error_report
+from .manifest import merge_shards
+from .progress import ProgressTracker
+from .routing import TemplateRouter
+from .scheduler import PriorityScheduler
+from .text_fit import FIT_MODES, TextFit
+from .work_queue import Coordinator, DirectoryWorkQueue, run_worker
+
+
+def _key_value(text):
+    """Parses a `KEY=VALUE` command line argument."""
+    key, sep, value = text.partition('=')
+    if not sep or not key:
+        raise argparse.ArgumentTypeError("expected KEY=VALUE, got "
+                                         "{!r}".format(text))
+    return((key, value))
+
+
+def _fit(text):
+    """Parses a `FIELD=WIDTH[,FONT]` command line argument."""
+    field, value = _key_value(text)
+    width, _, font = value.partition(',')
+    try:
+        width = float(width)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected FIELD=WIDTH[,FONT], got "
+                                         "{!r}".format(text))
+    if width <= 0:
+        raise argparse.ArgumentTypeError("the width must be positive")
+    return((field, width, font or None))
+
+
+def _shard(text):
+    """Parses a `I/N` shard command line argument."""
+    try:
+        index, count = (int(value) for value in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected I/N, got "
+                                         "{!r}".format(text))
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError("shard index must be in [0, N)")
+    return((index, count))
+
+
+def _print_progress(event):
+    """Progress listener writing a status line on the standard error."""
+    eta = '?' if event.eta is None else '{:.0f}s'.format(event.eta)
+    sys.stderr.write('\r{}/{} bibs, {:.1f} bibs/s, ETA {}, {} failed   '
+                     .format(event.completed, event.total, event.rate, eta,
+                             event.failures))
+    if event.kind == 'end':
+        sys.stderr.write('\n')
+    sys.stderr.flush()
+
+
+def make_parser():
+    """Returns the argument parser of the command line interface."""
+    parser = argparse.ArgumentParser(
+        prog='race-bib',
+        description="Creates personnalized race bibs from a svg template and "
+                    "a participants table.")
+    parser.add_argument('template', help='svg file used as bib template')
+    parser.add_argument('participants',
+                        help='participants table (Excel or csv file)')
+    parser.add_argument('output', help='repository where bibs are written')
+    parser.add_argument('--field', type=_key_value, action='append',
+                        default=[], metavar='FIELD=MARKER',
+                        help='column of the participants table and marker of '
+                             'the template replaced by its values '
+                             '(repeatable)')
+    parser.add_argument('--frozen', type=_key_value, action='append',
+                        default=[], metavar='FIELD=VALUE',
+                        help='value of a field common to all the bibs (race '
+                             'name, date...), substituted once in the '
+                             'template (repeatable)')
+    parser.add_argument('--derived', type=_key_value, action='append',
+                        default=[], metavar='FIELD=EXPRESSION',
+                        help='field computed from the columns of the table: '
+                             'upper(COLUMN), short_name(FIRST,LAST), '
+                             'truncate(COLUMN,LENGTH) or a pattern such as '
+                             '"{Firstname} {Lastname}"; its marker is given '
+                             'with --field (repeatable)')
+    parser.add_argument('--outline', type=_key_value, action='append',
+                        default=[], metavar='FIELD=FONT',
+                        help='draws the text of a field as paths made of the '
+                             'glyphs of a font file (TrueType or OpenType), '
+                             'so that the bibs do not depend on the '
+                             'installed fonts (repeatable)')
+    parser.add_argument('--fit', type=_fit, action='append',
+                        default=[], metavar='FIELD=WIDTH[,FONT]',
+                        help='narrows the texts of a field wider than a box '
+                             'of WIDTH user units, measured with a font file '
+                             '(not needed if the field is outlined) '
+                             '(repeatable)')
+    parser.add_argument('--fit-mode', choices=FIT_MODES, default='size',
+                        help='narrows the texts by reducing their font size '
+                             'or their letter spacing (default: size)')
+    parser.add_argument('--numbering', metavar='FIELD',
+                        help='column giving the bib numbers (default: '
+                             'position in the table)')
+    parser.add_argument('--prefix', default='dossard_',
+                        help='prefix of the bib file names')
+    parser.add_argument('--barcode', type=_key_value, metavar='FIELD=MARKER',
+                        help='enables barcodes: name of the barcode field and '
+                             'file name used as marker in the template')
+    parser.add_argument('--barcode-number-field', default='numero',
+                        metavar='FIELD',
+                        help='column giving the number encoded in barcodes')
+    parser.add_argument('--barcode-encoding', default='code39')
+    parser.add_argument('--barcode-template', default='00{}')
+    parser.add_argument('--barcode-digits', type=int, default=5)
+    parser.add_argument('--barcode-prefix', default='barcode_')
+    parser.add_argument('--converter', metavar='COMMAND',
+                        help='conversion command template, see BibTemplate')
+    parser.add_argument('--batch-converter', metavar='COMMAND',
+                        help='command converting several files at once, '
+                             'used by --script sh, see BibTemplate')
+    parser.add_argument('--png-width', type=int, default=2000)
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='png',
+                        dest='output_format',
+                        help='final format of the bibs (default: png)')
+    parser.add_argument('--script', choices=('bat', 'sh'), default='bat',
+                        dest='script_format',
+                        help='conversion script: Windows batch file or '
+                             'POSIX shell script converting in parallel '
+                             'batches (default: bat)')
+    parser.add_argument('--batch-size', type=int, default=20,
+                        help='number of bibs per batch of a sh conversion '
+                             'script (default: 20)')
+    parser.add_argument('--convert-jobs', type=int, metavar='N',
+                        help='run the conversion commands, N at a time, '
+                             'instead of writing a conversion script (see '
+                             'module conversion_executor)')
+    parser.add_argument('--convert-timeout', type=float, default=120.0,
+                        metavar='SECONDS',
+                        help='time after which a conversion is killed '
+                             '(default: 120)')
+    parser.add_argument('--convert-retries', type=int, default=2,
+                        help='number of retries of a failed conversion '
+                             '(default: 2)')
+    parser.add_argument('--layered', action='store_true',
+                        help='make the png bibs directly, rasterising the '
+                             'static layer of the template once (see module '
+                             'layered_raster)')
+    parser.add_argument('--route-by', metavar='COLUMN',
+                        help='column which value selects the template of '
+                             'each participant (see --route)')
+    parser.add_argument('--route', type=_key_value, action='append',
+                        default=[], metavar='VALUE=TEMPLATE',
+                        help='svg template of the participants with this '
+                             'value, their bibs are written in OUTPUT/VALUE '
+                             '(repeatable, the positional template is used '
+                             'for the other values)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of worker processes (default: 1)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only rewrite and convert bibs that changed')
+    parser.add_argument('--conversion-cache', action='store_true',
+                        help='only convert the bibs which svg content or '
+                             'conversion options changed since their last '
+                             'conversion (see module conversion_cache)')
+    parser.add_argument('--resume', action='store_true',
+                        help='journal completed bibs and skip the bibs '
+                             'completed by a previous interrupted run')
+    parser.add_argument('--keep-going', action='store_true',
+                        help='create the other bibs when a bib fails and '
+                             'report the failures at the end')
+    parser.add_argument('--error-report', metavar='FILE',
+                        help='json file where the failures are written '
+                             '(implies --keep-going)')
+    parser.add_argument('--retry', metavar='FILE',
+                        help='only create the bibs that failed according to '
+                             'an error report')
+    parser.add_argument('--shard', type=_shard, metavar='I/N',
+                        help='only create the bibs of shard I out of N')
+    parser.add_argument('--shard-by', choices=('number', 'hash'),
+                        default='number',
+                        help='assignment of the participants to the shards')
+    parser.add_argument('--manifest', action='store_true', default=None,
+                        help='write a manifest of the run (always done for '
+                             'sharded runs)')
+    parser.add_argument('--queue', metavar='DIR',
+                        help='shared work queue directory: distributes the '
+                             'bibs between a coordinator and workers')
+    parser.add_argument('--role', choices=('coordinator', 'worker'),
+                        default='worker', help='role in the work queue')
+    parser.add_argument('--chunk-size', type=int, default=100,
+                        help='number of bibs per work queue chunk')
+    parser.add_argument('--lease-timeout', type=float, default=300.0,
+                        help='seconds after which the chunk of a silent '
+                             'worker is published again')
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help='number of times a chunk is processed before it '
+                             'is left out as failed (default: 3)')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and make again the affected bibs '
+                             'each time the template or the participants '
+                             'file is saved')
+    parser.add_argument('--serve', metavar='[HOST:]PORT',
+                        help='serve the bibs on demand over HTTP instead of '
+                             'making them (GET /bib/<number>.svg|png)')
+    parser.add_argument('--cache-mb', type=float, default=64.0,
+                        help='size of the cache of the served bibs')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='worker threads rendering the bibs when --serve '
+                             'and --watch are combined, one of them being '
+                             'reserved to reprints and late entries '
+                             '(default: 2)')
+    parser.add_argument('--proof-sheet', metavar='FILE',
+                        help='write the bibs in one svg proof sheet instead '
+                             'of making the bib files, their barcodes being '
+                             'drawn once in a sprite sheet (see module '
+                             'barcode_sprites)')
+    parser.add_argument('--proof-columns', type=int, default=2,
+                        help='number of bibs per row of the proof sheet '
+                             '(default: 2)')
+    parser.add_argument('--progress', action='store_true',
+                        help='show progress on the standard error')
+    parser.add_argument('--stats-json', metavar='FILE',
+                        help='file where the run measures are written')
+    return(parser)
+
+
+def make_merge_parser():
+    """Returns the argument parser of the `merge` command."""
+    parser = argparse.ArgumentParser(
+        prog='race-bib merge',
+        description="Merges the manifests and conversion scripts of the "
+                    "shards gathered in a repository.")
+    parser.add_argument('output', help='repository containing the shards')
+    parser.add_argument('--manifest-name', default='manifest.json')
+    parser.add_argument('--script-name')
+    return(parser)
+
+
+def make_template(args):
+    """Returns the `BibTemplate` described by parsed arguments."""
+    fields = dict(args.field)
+    barcode_field = 'barcode'
+    if args.barcode is not None:
+        barcode_field, marker = args.barcode
+        fields[barcode_field] = marker
+    conversion_command = None
+    pdf_conversion_command = None
+    if args.converter:
+        conversion_command = args.converter + '\n'
+        pdf_conversion_command = args.converter + '\n'
+    return(BibTemplate(args.template, fields,
+                       conversion_command=conversion_command,
+                       pdf_conversion_command=pdf_conversion_command,
+                       batch_conversion_command=args.batch_converter,
+                       use_barcodes=args.barcode is not None,
+                       barcode_string_template=args.barcode_template,
+                       barcode_encoding=args.barcode_encoding,
+                       barcode_field_name=barcode_field,
+                       barcode_number_field_name=args.barcode_number_field,
+                       id_ndigits_for_barcode=args.barcode_digits,
+                       barcode_prefix_name=args.barcode_prefix,
+                       frozen_fields=dict(args.frozen),
+                       derived_fields={field: from_expression(expression)
+                                       for field, expression in args.derived},
+                       outline_fonts=dict(args.outline),
+                       text_fits=make_text_fits(args)))
+
+
+def make_text_fits(args):
+    """Returns the `TextFit` objects described by parsed arguments, keyed
+    by fields names."""
+    return({field: TextFit(width, font, mode=args.fit_mode)
+            for field, width, font in args.fit})
+
+
+def make_router(args):
+    """Returns the `TemplateRouter` described by parsed arguments, or None if
+    no routing was requested. The templates of the routes share the settings
+    of the positional template."""
+    if args.route_by is None:
+        return(None)
+    routes = {}
+    for value, path in args.route:
+        routes[value] = make_template(argparse.Namespace(
+            **dict(vars(args), template=path)))
+    return(TemplateRouter(args.route_by, routes,
+                          default=make_template(args)))
+
+
+def make_factory(args):
+    """Returns the `BibFactory` described by parsed arguments."""
+    return(BibFactory(args.participants, field_for_numbering=args.numbering,
+                      output_rep=args.output, output_file_prefix=args.prefix))
+
+
+def make_executor(args):
+    """Returns the `ConversionExecutor` described by parsed arguments, or
+    None if the conversions are left to a script."""
+    if not args.convert_jobs:
+        return(None)
+    return(ConversionExecutor(jobs=args.convert_jobs,
+                              timeout=args.convert_timeout,
+                              retries=args.convert_retries))
+
+
+def _print_update(bib_template, output_rep, numbers, elapsed):
+    """`BibDaemon` listener printing the bibs made at each update."""
+    count = 'all' if numbers is None else len(numbers)
+    print("{} bibs updated in {} ({:.2f} s)".format(count, output_rep,
+                                                     elapsed))
+    sys.stdout.flush()
+
+
+def _written_bytes(stats, converted):
+    """Returns the number of bytes of the files written by a run: bibs,
+    barcodes and, if `converted` is True, the files converted by a
+    `ConversionExecutor`. The 'convert' stage otherwise measures the
+    commands of the conversion script, or the png bibs of the layered mode
+    already measured by the 'write' stage."""
+    written = stats.stages['write'].bytes + stats.stages['barcode'].bytes
+    if converted:
+        written += stats.stages['convert'].bytes
+    return(written)
+
+
+def _report_errors(errors, path=None):
+    """Prints a summary of the failures of a run and writes them in a json
+    file if `path` is given. Returns the exit status."""
+    for error in errors:
+        sys.stderr.write("bib {}: {} failed: {}: {}\n".format(
+            error.number, error.stage, error.exception, error.message))
+    if path:
+        errors.write(path)
+    if len(errors):
+        print("{} bibs failed".format(len(errors)))
+        return(1)
+    return(0)
+
+
+def main(argv=None):
+    """Entry point of the command line interface. Returns the exit status.
+
+    `race-bib merge OUTPUT` merges the outputs of sharded runs (see
+    `manifest.merge_shards`), any other call creates bibs.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == 'merge':
+        args = make_merge_parser().parse_args(argv[1:])
+        entries = merge_shards(args.output, manifest_name=args.manifest_name,
+                               script_name=args.script_name)
+        print("{} bibs merged in {}".format(len(entries), args.output))
+        return(0)
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if args.layered and args.output_format != 'png':
+        parser.error("--layered only makes png bibs")
+    if args.route and args.route_by is None:
+        parser.error("--route needs --route-by")
+    if args.route_by is not None and (args.watch or args.serve):
+        parser.error("--route-by cannot be combined with --watch or --serve")
+    if args.watch and args.serve and args.workers < 2:
+        parser.error("--workers must be at least 2 with --serve and --watch "
+                     "(one of them is reserved to reprints and late entries)")
+    template = make_template(args)
+    factory = make_factory(args)
+    errors = None
+    if args.keep_going or args.error_report:
+        errors = ErrorReport()
+    numbers = None
+    if args.retry:
+        numbers = read_error_report(args.retry).numbers()
+    scheduler = None
+    if args.serve and args.watch:
+        scheduler = PriorityScheduler(workers=args.workers)
+    daemon = None
+    if args.watch:
+        convert = make_executor(args)
+        if scheduler is not None and convert is None:
+            # the jobs of a scheduler cannot share a conversion script
+            convert = True
+        daemon = BibDaemon(args.participants, [(template, args.output)],
+                           field_for_numbering=args.numbering,
+                           output_file_prefix=args.prefix,
+                           on_render=_print_update,
+                           png_px_width=args.png_width,
+                           output_format=args.output_format, jobs=args.jobs,
+                           errors=errors, layered=args.layered,
+                           convert=convert, scheduler=scheduler)
+    if args.serve:
+        host, _, port = args.serve.rpartition(':')
+        service = BibService(args.participants, template, args.output,
+                             field_for_numbering=args.numbering,
+                             png_px_width=args.png_width,
+                             cache_bytes=int(args.cache_mb * 2 ** 20),
+                             layered=args.layered, scheduler=scheduler)
+        if daemon is not None:
+            threading.Thread(target=daemon.run, daemon=True).start()
+        print("Serving bibs on http://{}:{}/bib/".format(host or '127.0.0.1',
+                                                        port))
+        sys.stdout.flush()
+        try:
+            service.serve(host or '127.0.0.1', int(port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if daemon is not None:
+                daemon.stop()
+                daemon.close()
+                scheduler.shutdown(cancel=True)
+        return(0)
+    if daemon is not None:
+        try:
+            daemon.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            daemon.close()
+        return(0)
+    if args.queue is not None:
+        queue = DirectoryWorkQueue(args.queue,
+                                   lease_timeout=args.lease_timeout,
+                                   max_attempts=args.max_attempts)
+        if args.role == 'coordinator':
+            coordinator = Coordinator(factory, queue,
+                                      chunk_size=args.chunk_size)
+            coordinator.publish()
+            entries = coordinator.wait(args.output)
+            print("{} bibs merged in {}".format(len(entries), args.output))
+            failed = queue.failed_chunks()
+            for chunk, error in failed.items():
+                print("{} failed: {}".format(chunk, error))
+            if failed:
+                return(1)
+        else:
+            chunks = run_worker(factory, template, queue, args.output,
+                                png_px_width=args.png_width,
+                                output_format=args.output_format,
+                                jobs=args.jobs, incremental=args.incremental,
+                                resume=args.resume, errors=errors,
+                                layered=args.layered,
+                                script_format=args.script_format,
+                                batch_size=args.batch_size,
+                                convert=make_executor(args))
+            print("{} chunks processed".format(len(chunks)))
+            if errors is not None:
+                return(_report_errors(errors, args.error_report))
+        return(0)
+    router = make_router(args)
+    if router is not None:
+        template = router
+    if args.proof_sheet:
+        path = factory.make_proof_sheet(args.proof_sheet, template,
+                                        numbers=numbers,
+                                        columns=args.proof_columns)
+        print("Proof sheet written to {}".format(path))
+        return(0)
+    progress = None
+    if args.progress:
+        progress = ProgressTracker(_print_progress, 0, min_interval=0.5)
+    convert = make_executor(args)
+    result = factory.make_bib_files(template, png_px_width=args.png_width,
+                                    stats=True, progress=progress,
+                                    output_format=args.output_format,
+                                    jobs=args.jobs,
+                                    incremental=args.incremental,
+                                    resume=args.resume,
+                                    shard=args.shard,
+                                    shard_by=args.shard_by,
+                                    make_manifest=args.manifest,
+                                    numbers=numbers, errors=errors,
+                                    layered=args.layered,
+                                    conversion_cache=args.conversion_cache,
+                                    script_format=args.script_format,
+                                    batch_size=args.batch_size,
+                                    convert=convert)
+    stats = result.stats
+    written = _written_bytes(stats, convert is not None and not args.layered)
+    output_rep = result.output_rep
+    if isinstance(output_rep, list):
+        output_rep = ', '.join(output_rep)
+    print("{} bibs in {:.2f} s ({:.1f} bibs/s), {:.1f} MB written to "
+          "{}".format(result.bibs, stats.elapsed, stats.bibs_per_second,
+                      written / 2.0 ** 20, output_rep))
+    if args.stats_json:
+        with open(args.stats_json, 'w') as output:
+            json.dump(stats.as_dict(), output, indent=2)
+    if result.errors is not None:
+        return(_report_errors(result.errors, args.error_report))
+    return(0)
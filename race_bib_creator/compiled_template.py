@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `CompiledTemplate` class: the base file of a
+`BibTemplate` split once into static segments and marker slots.
+
+Without it, the base file of a template was read again and each marker looked
+for in each of its lines for every bib. A compiled template finds the markers
+once, so that rendering a bib only joins the static segments with the values
+of the fields. `BibTemplate.compile` keeps the compiled template of its base
+file and compiles it again when the base file is modified.
+
+The values of the fields are escaped for XML (`&`, `<`, `>`, and quotes in
+attributes) so that a runner named "Smith & Jones" gives a valid svg file. The
+context of each marker (text node, attribute value, comment...) is found once,
+when the template is compiled, and `CompiledTemplate.texts` escapes each
+distinct value of a column once: the factory escapes the whole participants
+table before the bibs are rendered (see `BibTemplate.prepare`).
+
+Example
+-------
+
+>>> compiled = template.compile()
+>>> compiled.fields
+>>> content = compiled.render({'Number': '12', 'Firstname': 'Ignace'})
+
+Class definition
+----------------
+"""
+import re
+
+#: Escaping of the values of the fields, according to their context:
+#: characters replaced, in order.
+ESCAPES = {'text': (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;')),
+           'attribute': (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'),
+                         ('"', '&quot;'), ("'", '&apos;'))}
+
+# tokens changing the XML context, and transitions between contexts
+_TOKENS = re.compile(r'<!--|-->|<!\[CDATA\[|\]\]>|[<>"\']')
+_TRANSITIONS = {('text', '<!--'): 'comment', ('text', '<![CDATA['): 'cdata',
+                ('text', '<'): 'tag', ('tag', '>'): 'text',
+                ('tag', '"'): 'double', ('tag', "'"): 'single',
+                ('double', '"'): 'tag', ('single', "'"): 'tag',
+                ('comment', '-->'): 'text', ('cdata', ']]>'): 'text'}
+# escaping of the markers found in each context (None: not escaped)
+_CONTEXT_ESCAPES = {'text': 'text', 'tag': 'attribute', 'double': 'attribute',
+                    'single': 'attribute', 'comment': None, 'cdata': None}
+
+
+def escape(text, context='text'):
+    """Returns a text escaped for an XML context: 'text' (text node),
+    'attribute' (attribute value) or None (not escaped)."""
+    if context is None:
+        return(text)
+    for character, entity in ESCAPES[context]:
+        if character in text:
+            text = text.replace(character, entity)
+    return(text)
+
+
+def _advance(context, text):
+    """Returns the XML context at the end of `text`, starting in
+    `context`."""
+    for token in _TOKENS.findall(text):
+        context = _TRANSITIONS.get((context, token), context)
+    return(context)
+
+
+class CompiledTemplate():
+    """Base file content split in static segments and marker slots.
+
+    Markers are looked for in a single pass, the longest markers first when
+    several markers start at the same place. The text of a field's value is
+    never searched for markers. The markers of frozen fields are replaced by
+    their (escaped) values in the static segments, so that they have no slot.
+
+    :Attributes:
+
+        **segments**: list of str
+            Static parts of the content, one more than there are slots.
+        **slots**: list of str
+            Name of the field of each slot.
+        **markers**: dict
+            Markers of the fields, as given to `BibTemplate`.
+        **fields**: frozenset
+            Names of the fields which marker was found in the content.
+        **stamp**: tuple
+            Modification time and size of the base file when it was
+            compiled (None if compiled from a string).
+        **escapes**: dict
+            Escaping of the values of each field: 'attribute' if one of its
+            markers is in a tag, 'text' if one is in a text node, None if
+            they are only in comments or CDATA sections, or if the values
+            are not escaped.
+        **formatters**: dict
+            Functions giving the text inserted for a value (str) of a field
+            instead of its escaped text (e.g. the path data of an outlined
+            text, see module `text_outlines`), keyed by fields names.
+
+    """
+    def __init__(self, content, markers, stamp=None, frozen=None,
+                 escape_values=False, formatters=None):
+        """
+        :Parameters:
+
+            *content*: str
+                Content of the base file.
+            *markers*: dict
+                Fields names and their markers. Fields which marker is None
+                are ignored.
+            *frozen*: dict, optional
+                Values of the frozen fields, keyed by fields names.
+            *escape_values*: bool, optional
+                Whether the values of the fields are escaped for XML.
+            *formatters*: dict, optional
+                See the attributes.
+
+        """
+        self.markers = {field: marker for field, marker in markers.items()
+                        if marker}
+        self.stamp = stamp
+        self.formatters = dict(formatters or {})
+        frozen = frozen or {}
+        self.segments = []
+        self.slots = []
+        self.escapes = {}
+        by_marker = {}
+        for field, marker in self.markers.items():
+            # first field wins if several fields share a marker
+            by_marker.setdefault(marker, field)
+        if by_marker:
+            pattern = re.compile('|'.join(
+                re.escape(marker) for marker in sorted(by_marker, key=len,
+                                                       reverse=True)))
+            position = 0
+            segment = []
+            context = 'text'
+            for match in pattern.finditer(content):
+                field = by_marker[match.group()]
+                segment.append(content[position:match.start()])
+                if escape_values:
+                    context = _advance(context, segment[-1])
+                position = match.end()
+                escaping = _CONTEXT_ESCAPES[context] if escape_values else None
+                if field in frozen:
+                    text = str(frozen[field])
+                    formatter = self.formatters.get(field)
+                    segment.append(escape(text, escaping) if formatter is None
+                                   else formatter(text))
+                    continue
+                if escaping == 'attribute' or field not in self.escapes:
+                    self.escapes[field] = escaping
+                elif self.escapes[field] is None:
+                    self.escapes[field] = escaping
+                self.segments.append(''.join(segment))
+                self.slots.append(field)
+                segment = []
+            segment.append(content[position:])
+            self.segments.append(''.join(segment))
+        else:
+            self.segments.append(content)
+        self.fields = frozenset(self.slots)
+
+    def escape(self, field, text):
+        """Returns the text of a value of a field escaped for the context
+        of its markers, or given by its formatter."""
+        formatter = self.formatters.get(field)
+        if formatter is not None:
+            return(formatter(text))
+        return(escape(text, self.escapes.get(field)))
+
+    def texts(self, field, values):
+        """Returns the escaped texts (see `escape`) of a column of values
+        of a field, as a list. Each distinct value is converted to str and
+        escaped once. A formatter with a `column` method is given the
+        distinct texts of the column at once."""
+        column = getattr(self.formatters.get(field), 'column', None)
+        if column is not None:
+            texts = [str(value) for value in values]
+            distinct = list(dict.fromkeys(texts))
+            formatted = dict(zip(distinct, column(distinct)))
+            return([formatted[text] for text in texts])
+        cache = {}
+        texts = []
+        for value in values:
+            # 1, 1.0 and True are equal but do not give the same text
+            key = (value.__class__, value)
+            try:
+                text = cache[key]
+            except KeyError:
+                text = cache[key] = self.escape(field, str(value))
+            except TypeError:
+                # unhashable value
+                text = self.escape(field, str(value))
+            texts.append(text)
+        return(texts)
+
+    def render(self, values):
+        """Returns the content with the markers replaced by the values of
+        their fields. The marker of a field missing from `values` is left
+        unchanged.
+
+        :Parameters:
+
+            *values*: dict
+                Text (str) of the fields values, escaped (see `escape`),
+                keyed by fields names.
+
+        """
+        segments = self.segments
+        parts = [segments[0]]
+        for index, field in enumerate(self.slots):
+            value = values.get(field)
+            parts.append(self.markers[field] if value is None else value)
+            parts.append(segments[index + 1])
+        return(''.join(parts))
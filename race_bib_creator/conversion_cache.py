@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `ConversionCache` class used by
+`BibFactory.make_bib_files` to leave out of the conversion script the bibs
+which converted file (png or pdf) is up to date (`conversion_cache=True`).
+
+The cache is a json file of the output repository. For each converted file,
+it records the sha256 digest of its source svg file and the rasterisation
+options (format and width in px). When the conversion script is written, a
+bib is left out if its converted file was produced from a svg file with the
+same digest and the same options, whatever the modification times of the
+files. Moving or copying the output repository to another computer does not
+invalidate the cache: files are identified by their names in the output
+repository and by the digests of their contents.
+
+Conversions are run by the script, after the run of the factory. A converted
+file is thus first recorded as *expected*, with the size and the modification
+time of the file it replaces (if any) and of its source svg file. On the next
+run, an expected file is *confirmed* if it was written since, is not empty
+and is not older than the svg file it was expected from: its own digest is
+recorded and it is considered up to date as long as its content does not
+change. An expected file that was not written (script not run, failed
+conversion) or that was left by an older conversion is converted again. The
+files converted by the factory itself (see module `conversion_executor`) are
+confirmed at once.
+
+The pictures linked by the bibs (logos...) are not part of the digests: the
+cache file must be deleted when they are modified. The barcode files are
+named after the barcode strings and thus follow the svg files.
+
+Example
+-------
+
+>>> factory.make_bib_files(template, 'race_1', conversion_cache=True)
+>>> # make_pngs.bat is run, then the participants table is updated
+>>> factory.make_bib_files(template, 'race_1', conversion_cache=True)
+>>> # make_pngs.bat now only converts the bibs that changed
+
+Class definition
+----------------
+"""
+import json
+import os
+
+from .manifest import file_digest
+
+#: Version of the conversion cache format.
+CONVERSION_CACHE_VERSION = 2
+
+
+def _file_stamp(path):
+    """Returns the `[size, modification time in ns]` of a file, or None if
+    it does not exist."""
+    try:
+        status = os.stat(path)
+    except FileNotFoundError:
+        return(None)
+    return([status.st_size, status.st_mtime_ns])
+
+
+class ConversionCache():
+    """Digests of the svg files from which the converted files of an output
+    repository were produced.
+
+    :Attributes:
+
+        **output_rep**: str
+            Output repository of the bibs.
+        **path**: str
+            Path of the cache file.
+        **entries**: dict
+            Entries of the converted files, keyed by their names in the
+            output repository. Each entry is a dictionnary with the digest of
+            the source svg file (`source_sha256`), the options of the
+            conversion (`options`), the digest of the converted file
+            (`sha256`, None while the conversion is expected), its stamp
+            before the conversion (`previous`) and the stamp of the source
+            svg file when the conversion was expected (`source`).
+
+    """
+    def __init__(self, output_rep, name='conversions.json'):
+        """
+        :Parameters:
+
+            *output_rep*: str
+                Output repository of the bibs.
+            *name*: str, optional
+                Name of the cache file in the output repository.
+
+        """
+        self.output_rep = output_rep
+        self.path = os.path.join(output_rep, name)
+        self.entries = {}
+
+    def load(self):
+        """Reads the cache file. A missing or unreadable file, or a file of
+        another version, gives an empty cache."""
+        self.entries = {}
+        try:
+            with open(self.path) as stream:
+                content = json.load(stream)
+        except (OSError, ValueError):
+            return(self)
+        if content.get('version') == CONVERSION_CACHE_VERSION:
+            self.entries = content.get('entries', {})
+        return(self)
+
+    def write(self):
+        """Writes the cache file. The previous file is replaced at once so
+        that an interrupted write does not corrupt it."""
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as stream:
+            json.dump({'version': CONVERSION_CACHE_VERSION,
+                       'entries': self.entries}, stream, indent=1,
+                      sort_keys=True)
+            stream.write('\n')
+        os.replace(temporary, self.path)
+
+    def is_current(self, dest, source_digest, options):
+        """Returns True if a converted file is up to date.
+
+        :Parameters:
+
+            *dest*: str
+                Path of the converted file (only its name is used).
+            *source_digest*: str
+                sha256 digest of the svg file it is converted from.
+            *options*: dict
+                Options of the conversion (json compatible).
+
+        """
+        name = os.path.basename(dest)
+        entry = self.entries.get(name)
+        if (entry is None or entry['source_sha256'] != source_digest or
+                entry['options'] != options):
+            return(False)
+        path = os.path.join(self.output_rep, name)
+        if entry['sha256'] is None:
+            stamp = _file_stamp(path)
+            if (stamp is None or stamp == entry['previous'] or
+                    stamp[0] == 0 or (entry['source'] is not None and
+                                      stamp[1] < entry['source'][1])):
+                # the conversion did not run, failed or is older than the
+                # svg file
+                return(False)
+            entry['sha256'] = file_digest(path)
+            entry['previous'] = None
+            return(True)
+        return(os.path.exists(path) and file_digest(path) == entry['sha256'])
+
+    def confirm(self, dest):
+        """Records that an expected converted file was produced (e.g. by a
+        `ConversionExecutor`)."""
+        name = os.path.basename(dest)
+        entry = self.entries[name]
+        entry['sha256'] = file_digest(os.path.join(self.output_rep, name))
+        entry['previous'] = None
+
+    def expect(self, dest, source_digest, options, source):
+        """Records that a converted file is to be produced by the conversion
+        script from the svg file `source` (see `is_current` for the other
+        parameters)."""
+        name = os.path.basename(dest)
+        self.entries[name] = {
+            'source_sha256': source_digest, 'options': options, 'sha256': None,
+            'previous': _file_stamp(os.path.join(self.output_rep, name)),
+            'source': _file_stamp(os.path.join(self.output_rep,
+                                               os.path.basename(source)))}
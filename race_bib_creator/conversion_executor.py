@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `ConversionExecutor` class, used by
+`BibFactory.make_bib_files` to run the conversion commands of the bibs (see
+`BibTemplate.make_conversion_command`) itself instead of writing them in a
+conversion script (`convert` parameter).
+
+The commands are run as subprocesses, at most `jobs` at a time. A command
+which runs longer than `timeout` seconds is killed, with the processes it
+started (Inkscape started through a shell...: its process group on POSIX
+systems, its process tree with `taskkill` on Windows), so that a hung
+converter does not stall the run. A failed command (non-zero exit status, timeout, or no
+converted file) is retried up to `retries` times, after a delay doubling at
+each attempt (`backoff`). The standard error of each command is captured.
+
+The bibs which conversion finally failed are recorded in the error report of
+the run (stage 'convert', see module `error_report`) with the end of the
+standard error of their last attempt, and are left out of the manifest. When
+no error report is used, a `ConversionError` is raised once all the commands
+have been run.
+
+`benchmarks/fake_converter.py` is a stand-in converter (slow, failing or hung
+on demand) to try the executor without Inkscape.
+
+Example
+-------
+
+>>> executor = race_bib_creator.ConversionExecutor(jobs=4, timeout=60,
+...                                                 retries=2)
+>>> result = factory.make_bib_files(template, 'race_1', convert=executor,
+...                                 errors=True)
+>>> for error in result.errors:
+...     print(error.number, error.message)
+
+Class definitions
+-----------------
+"""
+import os
+import signal
+import subprocess
+import time
+
+#: Number of characters of the standard error kept in the error messages.
+STDERR_TAIL = 2000
+
+
+class ConversionError(RuntimeError):
+    """Failure of a conversion command, after all its attempts.
+
+    :Attributes:
+
+        **job**: ConversionJob
+            Failed job.
+
+    """
+    def __init__(self, job):
+        RuntimeError.__init__(self, job.message())
+        self.job = job
+
+
+class ConversionJob():
+    """Conversion command of one bib and the outcome of its attempts.
+
+    :Attributes:
+
+        **command**: str
+            Conversion command, run by the shell.
+        **dest**: str
+            Path of the converted file.
+        **key**: object
+            Identifier of the bib, given back with the result (e.g. the
+            `(target, result)` pair of the factory).
+        **attempts**: int
+            Number of attempts made.
+        **returncode**: int or None
+            Exit status of the last attempt (None if it timed out).
+        **timed_out**: bool
+            Whether the last attempt was killed after the timeout.
+        **stderr**: str
+            Standard error of the last attempt.
+        **elapsed**: float
+            Duration of all the attempts, delays excluded, in seconds.
+
+    """
+    __slots__ = ('command', 'dest', 'key', 'attempts', 'returncode',
+                 'timed_out', 'stderr', 'elapsed')
+
+    def __init__(self, command, dest, key=None):
+        self.command = command.strip()
+        self.dest = dest
+        self.key = key
+        self.attempts = 0
+        self.returncode = None
+        self.timed_out = False
+        self.stderr = ''
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        """Whether the last attempt succeeded: exit status 0 and a
+        converted file."""
+        return(self.returncode == 0 and not self.timed_out and
+               os.path.exists(self.dest))
+
+    def message(self):
+        """Returns the description of the failure of the job."""
+        if self.timed_out:
+            reason = "timed out"
+        elif self.returncode != 0:
+            reason = "exit status {}".format(self.returncode)
+        else:
+            reason = "no file {}".format(os.path.basename(self.dest))
+        message = "Conversion failed ({}, {} attempt{})".format(
+            reason, self.attempts, 's' if self.attempts > 1 else '')
+        stderr = self.stderr.strip()
+        if stderr:
+            message += ': ' + stderr[-STDERR_TAIL:]
+        return(message)
+
+
+class ConversionExecutor():
+    """Runs conversion commands as bounded subprocesses.
+
+    :Attributes:
+
+        **jobs**: int
+            Maximal number of commands run at the same time.
+        **timeout**: float or None
+            Seconds after which a command is killed (None: no limit).
+        **retries**: int
+            Number of times a failed command is run again.
+        **backoff**: float
+            Delay before the first retry of a command, in seconds. It is
+            doubled at each retry, up to `max_backoff`.
+        **max_backoff**: float
+            Maximal delay before a retry, in seconds.
+
+    """
+    def __init__(self, jobs=4, timeout=120.0, retries=2, backoff=1.0,
+                 max_backoff=30.0):
+        assert jobs > 0, "jobs must be a positive integer"
+        assert retries >= 0, "retries must be a positive integer or 0"
+        self.jobs = jobs
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _attempt(self, job):
+        """Runs the command of a job once."""
+        job.attempts += 1
+        if os.path.exists(job.dest):
+            # a file left by a previous conversion does not make a success
+            os.remove(job.dest)
+        posix = os.name == 'posix'
+        options = {'start_new_session': True} if posix else {
+            'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+        start = time.perf_counter()
+        process = subprocess.Popen(job.command, shell=True,
+                                   stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.PIPE, **options)
+        try:
+            _, stderr = process.communicate(timeout=self.timeout)
+            job.timed_out = False
+        except subprocess.TimeoutExpired:
+            # the shell and the converter it started
+            if posix:
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                subprocess.call(['taskkill', '/T', '/F', '/PID',
+                                 str(process.pid)],
+                                stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL)
+                process.kill()
+            _, stderr = process.communicate()
+            job.timed_out = True
+        job.elapsed += time.perf_counter() - start
+        job.returncode = process.returncode
+        job.stderr = stderr.decode('utf-8', 'replace')
+
+    def run_job(self, job):
+        """Runs a job until it succeeds or has no attempt left. Returns the
+        job."""
+        delay = self.backoff
+        self._attempt(job)
+        while not job.ok and job.attempts <= self.retries:
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+            self._attempt(job)
+        return(job)
+
+    def run(self, jobs):
+        """Runs conversion jobs, at most `jobs` at a time, and yields them
+        as they are completed (see `ConversionJob.ok`)."""
+        # imported on first use, with the logging module it loads
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(self.jobs) as pool:
+            futures = [pool.submit(self.run_job, job) for job in jobs]
+            for future in concurrent.futures.as_completed(futures):
+                yield(future.result())
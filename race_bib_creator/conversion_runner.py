@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `PosixRunner` class: the conversion script written
+by `BibFactory.make_bib_files` for Linux and other POSIX systems
+(`script_format='sh'`), instead of the Windows `make_pngs.bat`.
+
+The bibs to convert are grouped in batches of `batch_size` files. If the
+template has a batch conversion command (see `BibTemplate`,
+`batch_conversion_command`), each batch is converted by a single call of the
+converter, which saves the start-up time of Inkscape for all the other files.
+Else, the files of a batch are converted one at a time with the conversion
+command of the template. The files are given by their names relative to the
+output repository, so that the script can be run from anywhere and keeps
+working when the output repository is moved. When the template was given no
+conversion command, the script calls Inkscape on the PATH
+(`INKSCAPE_POSIX_COMMAND`) rather than at its Windows location.
+
+The script runs several batches in parallel (`xargs -P`, available on Linux
+and BSD systems), as many as given by its first argument, by default the
+number of processors::
+
+    sh race_1/make_pngs.sh 8
+
+Each completed batch is appended to a completion log next to the script
+(`make_pngs.done`). When the script is run again after an interruption, the
+batches of the log are skipped. The log is deleted when the factory writes a
+new script.
+
+Example
+-------
+
+>>> template = race_bib_creator.BibTemplate(
+...     'bib_template_example.svg', {'Number': 'DNB'},
+...     batch_conversion_command=INKSCAPE_BATCH_COMMAND)
+>>> factory.make_bib_files(template, 'race_1', script_format='sh',
+...                        batch_size=50)
+
+Class definition
+----------------
+"""
+import os
+import shlex
+import stat
+
+#: Batch conversion command of Inkscape 1.x (see `BibTemplate`).
+INKSCAPE_BATCH_COMMAND = ('inkscape --export-type={format} '
+                          '--export-width={width} {sources}')
+
+_HEADER = """#!/bin/sh
+# Conversion of {count} bibs to {format} in {batches} batches, written by
+# race_bib_creator.
+# Usage: sh {script} [JOBS]
+# JOBS batches are converted in parallel (default: number of processors).
+# Completed batches are appended to {log}. When the script is run
+# again, they are skipped.
+cd "$(dirname "$0")" || exit 1
+SCRIPT=$(basename "$0")
+LOG={log}
+if [ "$1" = --batch ]; then
+    if [ -f "$LOG" ] && grep -qxF "$2" "$LOG"; then
+        exit 0
+    fi
+    case "$2" in
+"""
+_FOOTER = """    esac || exit 1
+    echo "$2" >> "$LOG"
+    exit 0
+fi
+[ {batches} -gt 0 ] || exit 0
+JOBS=${{1:-$(getconf _NPROCESSORS_ONLN 2>/dev/null || echo 1)}}
+BATCH=1
+while [ "$BATCH" -le {batches} ]; do
+    echo "$BATCH"
+    BATCH=$((BATCH + 1))
+done | xargs -n 1 -P "$JOBS" sh "./$SCRIPT" --batch
+"""
+
+
+def log_name(script_name):
+    """Returns the name of the completion log of a script."""
+    return(os.path.splitext(script_name)[0] + '.done')
+
+
+class PosixRunner():
+    """POSIX shell conversion script, written in batches (see the module
+    documentation).
+
+    :Attributes:
+
+        **path**: str
+            Path of the script.
+        **bib_template**: BibTemplate
+            Template which conversion commands are used.
+        **output_format**: str
+            'png' or 'pdf'.
+        **px_width**: int
+            Width of the png files.
+        **batch_size**: int
+            Number of files converted by a batch.
+        **files**: list of tuples
+            `(source, command)` pairs of the files to convert: name of the
+            svg file in the output repository and its own conversion
+            command.
+
+    """
+    def __init__(self, path, bib_template, output_format='png',
+                 px_width=2000, batch_size=20):
+        assert batch_size > 0, "batch_size must be a positive integer"
+        self.path = path
+        self.bib_template = bib_template
+        self.output_format = output_format
+        self.px_width = px_width
+        self.batch_size = batch_size
+        self.files = []
+
+    def add(self, source, dest):
+        """Adds a file to convert and returns its conversion command. Only
+        the names of `source` (svg file) and `dest` (converted file) are
+        used: both are in the directory of the script."""
+        source = os.path.basename(source)
+        command = self.bib_template.make_conversion_command(
+            source=shlex.quote(source),
+            dest=shlex.quote(os.path.basename(dest)),
+            px_width=self.px_width, output_format=self.output_format,
+            absolute=False, posix=True)
+        self.files.append((source, command))
+        return(command)
+
+    def batches(self):
+        """Returns the commands of each batch, as a list of lists of str."""
+        batches = []
+        for start in range(0, len(self.files), self.batch_size):
+            files = self.files[start:start + self.batch_size]
+            command = self.bib_template.make_batch_conversion_command(
+                [source for source, _ in files], px_width=self.px_width,
+                output_format=self.output_format)
+            if command is None:
+                batches.append([single.strip() for _, single in files])
+            else:
+                batches.append([command])
+        return(batches)
+
+    def close(self):
+        """Writes the script and deletes the completion log of the previous
+        script."""
+        script = os.path.basename(self.path)
+        log = log_name(script)
+        batches = self.batches()
+        parts = [_HEADER.format(count=len(self.files),
+                                format=self.output_format,
+                                batches=len(batches), script=script,
+                                log=shlex.quote(log))]
+        for index, commands in enumerate(batches):
+            parts.append('    {})\n        {}\n        ;;\n'.format(
+                             index + 1, ' &&\n        '.join(commands)))
+        parts.append(_FOOTER.format(batches=len(batches)))
+        with open(self.path, 'w', newline='\n') as stream:
+            stream.write(''.join(parts))
+        mode = os.stat(self.path).st_mode
+        os.chmod(self.path, mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        log = os.path.join(os.path.dirname(self.path), log)
+        if os.path.exists(log):
+            os.remove(log)
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains a long-running bib creation mode for registration desks,
+where the bibs are made again many times a day.
+
+A `BibDaemon` keeps the participants table, its templates (compiled, see
+`BibTemplate.compile`) and pandas warm in memory. It watches the base files of
+the templates and the participants file, and when one of them is saved, makes
+again the affected bibs only:
+
+    - when a template changes, all the bibs of this template,
+    - when the participants file changes, the bibs of the participants which
+      row was added or modified, for all the templates.
+
+The bibs of the participants removed from the table are left in the output
+repositories.
+
+When a `PriorityScheduler` is given, the bibs are made by its workers: all
+the bibs of a template as bulk jobs of `chunk_size` bibs, and the bibs of
+the participants added or modified as late entry jobs, which run before the
+remaining bulk chunks (see module `scheduler`). The jobs of different output
+repositories run in parallel, those of the same output repository one at a
+time, as each run updates the caches of its repository. A conversion script
+or a manifest would list the bibs of the last job only: with a scheduler,
+the bibs are converted by a `ConversionExecutor` (`convert` argument) and
+no manifest is written. The failures of the jobs are reported as warnings.
+
+Files are watched with inotify when the optional `inotify_simple` package is
+available (Linux), by polling their modification time and size else (see
+`FileWatcher`).
+
+Example
+-------
+
+>>> daemon = race_bib_creator.BibDaemon('race_1/participants_1.xlsx',
+...                                     [(template, 'race_1')],
+...                                     field_for_numbering='Number')
+>>> daemon.run()
+
+Class definitions
+-----------------
+"""
+import copy
+import functools
+import os
+import threading
+import time
+import warnings
+
+from .bib_factory import CONVERSION_FORMATS, BibFactory
+from .journal import row_digest
+
+
+def _get_inotify():
+    """Returns the `inotify_simple` module, or None if it is not
+    available."""
+    try:
+        import inotify_simple
+    except ImportError:
+        return(None)
+    return(inotify_simple)
+
+
+def _stamp(path):
+    """Returns the modification time and size of a file (None if it does not
+    exist)."""
+    try:
+        status = os.stat(path)
+    except OSError:
+        return(None)
+    return((status.st_mtime_ns, status.st_size))
+
+
+class FileWatcher():
+    """Watches files for modifications.
+
+    The directories of the files are watched rather than the files themselves
+    so that files saved by replacement (as most editors do) are still
+    watched afterwards.
+
+    :Attributes:
+
+        **paths**: list of str
+            Paths of the watched files.
+        **poll_interval**: float
+            Seconds between two checks of the files when polling.
+        **debounce**: float
+            Seconds waited after a first modification for the other writes
+            of the same save.
+        **use_inotify**: bool
+            Whether inotify is used instead of polling. By default, inotify
+            is used if `inotify_simple` can be imported.
+
+    """
+    def __init__(self, paths, poll_interval=0.25, debounce=0.1,
+                 use_inotify=None):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        inotify_simple = _get_inotify() if use_inotify is not False else None
+        if use_inotify and inotify_simple is None:
+            raise ImportError("inotify_simple is needed to use inotify")
+        self.use_inotify = inotify_simple is not None
+        self._stamps = {path: _stamp(path) for path in self.paths}
+        self._inotify = None
+        if self.use_inotify:
+            flags = inotify_simple.flags
+            self._inotify = inotify_simple.INotify()
+            self._names = {}
+            for path in self.paths:
+                directory, name = os.path.split(path)
+                if directory not in self._names:
+                    self._inotify.add_watch(directory, flags.CLOSE_WRITE |
+                                            flags.MOVED_TO | flags.CREATE |
+                                            flags.DELETE)
+                    self._names[directory] = set()
+                self._names[directory].add(name)
+            self._names = {name for names in self._names.values()
+                           for name in names}
+
+    def _changed(self):
+        """Returns the paths which stamp changed since the last call."""
+        changed = []
+        for path in self.paths:
+            stamp = _stamp(path)
+            if stamp != self._stamps[path]:
+                self._stamps[path] = stamp
+                changed.append(path)
+        return(changed)
+
+    def wait(self, timeout=None):
+        """Waits for modifications of the watched files and returns the
+        modified paths (empty list if `timeout` seconds elapsed first)."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            if self._inotify is not None:
+                remaining = None
+                if deadline is not None:
+                    remaining = max(0, int((deadline - time.time()) * 1000))
+                events = self._inotify.read(
+                    timeout=remaining, read_delay=int(self.debounce * 1000))
+                if not any(event.name in self._names for event in events):
+                    if deadline is not None and time.time() >= deadline:
+                        return([])
+                    continue
+            else:
+                time.sleep(self.poll_interval)
+                if self._changed_stamps_only():
+                    time.sleep(self.debounce)
+            changed = self._changed()
+            if changed:
+                return(changed)
+            if deadline is not None and time.time() >= deadline:
+                return([])
+
+    def _changed_stamps_only(self):
+        """Returns True if a stamp changed, without recording it."""
+        return(any(_stamp(path) != self._stamps[path] for path in self.paths))
+
+    def close(self):
+        """Stops watching the files."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+class BibDaemon():
+    """Makes the bibs of a participants file again each time it or one of
+    the templates is modified.
+
+    :Attributes:
+
+        **participants**: str
+            Path of the participants file (Excel or csv).
+        **targets**: list of tuples
+            `(bib_template, output_rep)` pairs: bibs are made with each
+            template in its output repository.
+        **factory**: BibFactory
+            Factory of the last version of the participants file.
+        **watcher**: FileWatcher
+            Watcher of the participants and base files.
+
+    """
+    def __init__(self, participants, targets, field_for_numbering=None,
+                 output_file_prefix="dossard_", poll_interval=0.25,
+                 debounce=0.1, use_inotify=None, on_render=None,
+                 scheduler=None, chunk_size=500, **kwargs):
+        """
+        :Parameters:
+
+            *participants*: str
+                Path of the participants file.
+            *targets*: list of tuples
+                `(bib_template, output_rep)` pairs.
+            *field_for_numbering*: str, optional
+                See `BibFactory`. Rows are identified by their bib number
+                (their position if no numbering field is given).
+            *output_file_prefix*: str, optional
+                See `BibFactory`.
+            *poll_interval*, *debounce*, *use_inotify*:
+                See `FileWatcher`.
+            *on_render*: callable, optional
+                Called with the bib template, the output repository, the
+                list of the numbers of the bibs made (None for all) and the
+                duration of each update (of each chunk with a scheduler).
+            *scheduler*: PriorityScheduler, optional
+                Scheduler running the updates. By default, they are run by
+                the calling thread. With a scheduler, png or pdf bibs must be
+                converted by a `ConversionExecutor` (`convert` argument, or
+                `make_convert_script=False`) and no manifest can be written.
+            *chunk_size*: int, optional
+                Number of bibs of the bulk jobs given to the scheduler.
+            *kwargs*:
+                Other arguments of `BibFactory.make_bib_files`
+                (`output_format`, `png_px_width`, `jobs`, `errors`...).
+                Bibs are always made incrementally.
+
+        """
+        if scheduler is not None:
+            if (kwargs.get('make_convert_script', True) and
+                    kwargs.get('output_format', 'png') in CONVERSION_FORMATS
+                    and not kwargs.get('layered') and
+                    kwargs.get('convert') in (None, False)):
+                raise ValueError(
+                    "The conversion script of a repository would list the "
+                    "bibs of its last job only: use convert="
+                    "ConversionExecutor(...) with a scheduler")
+            if kwargs.get('make_manifest'):
+                raise ValueError(
+                    "The manifest of a repository would list the bibs of its "
+                    "last job only: manifests cannot be made with a "
+                    "scheduler")
+        self.participants = participants
+        self.targets = list(targets)
+        self._field_for_numbering = field_for_numbering
+        self._output_file_prefix = output_file_prefix
+        self._on_render = on_render
+        self._kwargs = kwargs
+        self.scheduler = scheduler
+        self.chunk_size = chunk_size
+        self._local = threading.local()
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._running = False
+        self.factory = None
+        self._digests = {}
+        self.watcher = FileWatcher(
+            [participants] + [template._base_file
+                              for template, _ in self.targets],
+            poll_interval=poll_interval, debounce=debounce,
+            use_inotify=use_inotify)
+
+    def load(self):
+        """Reads the participants file. Returns the bib numbers of the rows
+        added or modified since the previous reading."""
+        factory = BibFactory(self.participants,
+                             field_for_numbering=self._field_for_numbering,
+                             output_file_prefix=self._output_file_prefix)
+        digests = {number: row_digest(row) for number, row in
+                   zip(factory._get_numbers(), factory._get_records())}
+        modified = [number for number, digest in digests.items()
+                    if self._digests.get(number) != digest]
+        self.factory = factory
+        self._digests = digests
+        return(modified)
+
+    def _make(self, bib_template, output_rep, numbers=None,
+              priority='bulk'):
+        """Makes (incrementally) the bibs of a target. With a scheduler, the
+        bibs are submitted to it, in chunks for bulk jobs, and the futures
+        of the jobs are returned."""
+        factory = self.factory
+        if self.scheduler is None:
+            self._make_now(factory, bib_template, output_rep, numbers)
+            return([])
+        if numbers is None:
+            numbers = list(factory._get_numbers())
+        size = self.chunk_size if priority == 'bulk' else len(numbers)
+        futures = [self.scheduler.submit(priority, self._make_now, factory,
+                                         bib_template, output_rep,
+                                         numbers[start:start + size])
+                   for start in range(0, len(numbers), max(size, 1))]
+        for future in futures:
+            future.add_done_callback(functools.partial(self._report,
+                                                       output_rep))
+        return(futures)
+
+    def _report(self, output_rep, future):
+        """Warns about the failure of a job run by the scheduler, which
+        future is not kept by `start` and `update`."""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            warnings.warn("Could not make bibs in {}: {!r}".format(
+                              output_rep, error))
+
+    def _make_now(self, factory, bib_template, output_rep, numbers=None):
+        """Makes the bibs of a target with a factory. The runs in the same
+        output repository are made one at a time."""
+        template = bib_template
+        if self.scheduler is not None:
+            factory, template = self._worker_copies(factory, bib_template)
+        with self._output_lock(output_rep):
+            start = time.perf_counter()
+            factory.make_bib_files(template, output_rep, numbers=numbers,
+                                   incremental=True, **self._kwargs)
+        if self._on_render is not None:
+            self._on_render(bib_template, output_rep, numbers,
+                            time.perf_counter() - start)
+
+    def _output_lock(self, output_rep):
+        """Returns the lock of an output repository."""
+        key = os.path.normcase(os.path.abspath(output_rep))
+        with self._locks_lock:
+            return(self._locks.setdefault(key, threading.Lock()))
+
+    def _worker_copies(self, factory, bib_template):
+        """Returns copies of a factory and of a template owned by the
+        calling worker thread. The workers of a scheduler make bibs at the
+        same time, and factories and templates keep the state of the bib
+        being made."""
+        copies = getattr(self._local, 'copies', None)
+        if copies is None or copies[0] is not factory:
+            copies = self._local.copies = (factory, copy.copy(factory), {})
+        templates = copies[2]
+        pair = templates.get(id(bib_template))
+        if pair is None or pair[0] is not bib_template:
+            template = copy.copy(bib_template)
+            # the state dropped for worker processes is kept
+            template.__dict__.update(bib_template.__dict__)
+            pair = templates[id(bib_template)] = (bib_template, template)
+        return(copies[1], pair[1])
+
+    def start(self):
+        """Reads the participants file, compiles the templates and makes all
+        the bibs (incrementally: unchanged bibs are not rewritten)."""
+        self.load()
+        for bib_template, output_rep in self.targets:
+            bib_template.compile()
+            self._make(bib_template, output_rep)
+
+    def update(self, changed):
+        """Makes again the bibs affected by the modification of the given
+        files (paths as returned by the watcher)."""
+        numbers = []
+        if os.path.abspath(self.participants) in changed:
+            try:
+                numbers = self.load()
+            except Exception as error:
+                # file being written or invalid, wait for the next save
+                warnings.warn("Could not read {}: {}".format(
+                                  self.participants, error))
+        for bib_template, output_rep in self.targets:
+            if os.path.abspath(bib_template._base_file) in changed:
+                self._make(bib_template, output_rep)
+            elif numbers:
+                self._make(bib_template, output_rep, numbers,
+                           priority='late_entry')
+
+    def run(self, timeout=None):
+        """Makes all the bibs, then watches the files and updates the bibs
+        until `stop` is called (from a listener or another thread) or
+        `timeout` seconds elapsed."""
+        deadline = None if timeout is None else time.time() + timeout
+        self._running = True
+        self.start()
+        try:
+            while self._running:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                changed = self.watcher.wait(timeout=min(remaining or 1.0,
+                                                        1.0))
+                if changed:
+                    self.update(changed)
+        finally:
+            self._running = False
+
+    def stop(self):
+        """Stops `run` after the current update."""
+        self._running = False
+
+    def close(self):
+        """Stops watching the files."""
+        self.watcher.close()
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `DerivedField` class: fields of the bibs computed from
+the columns of the participants table (upper-cased surname, short name, age
+category...) rather than read from it.
+
+The derived fields of a template are given to `BibTemplate` (`derived_fields`
+parameter) with their markers in `fields`, like any other field. When bibs are
+made by a `BibFactory`, each derived field is evaluated once for the whole
+table, column-wise with pandas and NumPy, before the bibs are rendered: making
+a bib then only looks up the precomputed text of its participant. A field
+which column-wise evaluation raises (e.g. a value of an unexpected type in one
+row) is evaluated again participant by participant: the bibs of the
+participants for which it still fails raise its error when they are made, so
+that a factory isolating failures reports them and makes the others. Derived
+fields are evaluated for a single participant when a template renders a bib
+without a factory.
+
+The functions of this module build the usual derived fields. Other fields are
+built from a function taking the participants table (pd.DataFrame) and
+returning a column of values.
+
+Example
+-------
+
+>>> from race_bib_creator import derived_fields
+>>> template = race_bib_creator.BibTemplate(
+...     'bib_template_example.svg',
+...     {'Number': 'DNB', 'LASTNAME': 'last_name', 'Short': 'short_name',
+...      'Category': '&lt;cat&gt;', 'Team': 'team_name'},
+...     derived_fields={
+...         'LASTNAME': derived_fields.upper('Lastname'),
+...         'Short': derived_fields.short_name('Firstname', 'Lastname'),
+...         'Category': derived_fields.age_category(
+...             'Birthdate', [(15, 'MI'), (17, 'CA'), (19, 'JU'),
+...                           (22, 'ES'), (34, 'SE'), (None, 'MA')],
+...             year=2017),
+...         'Team': derived_fields.truncate('Team', 18)})
+
+Class and functions definitions
+-------------------------------
+"""
+import datetime
+import math
+import re
+import string
+
+
+class DerivedField():
+    """Field computed column-wise from the participants table.
+
+    :Attributes:
+
+        **function**: callable
+            Function taking the participants table (pd.DataFrame) and
+            returning the values of the field, as a pd.Series, a NumPy
+            array or a list, in the order of the table.
+        **columns**: tuple of str
+            Columns of the table used by the function.
+        **description**: str
+            Description of the field, used in the fingerprint of the
+            templates (see `BibTemplate.fingerprint`).
+
+    """
+    def __init__(self, function, columns=(), description=None):
+        """
+        :Parameters:
+
+            *function*: callable
+                See the attributes.
+            *columns*: tuple of str, optional
+                Columns used by the function. If given, only these columns
+                are put in the table given to the function when a single
+                participant is evaluated.
+            *description*: str, optional
+                Description of the field. Default is the name of the
+                function: it should be given when the field depends on other
+                parameters.
+
+        """
+        assert callable(function), "function must be callable"
+        self.function = function
+        self.columns = tuple(columns)
+        self.description = description or getattr(function, '__qualname__',
+                                                  repr(function))
+
+    def evaluate(self, table):
+        """Returns the text of the field for each participant of a table, as
+        a list of str in the order of the table. Missing values give empty
+        strings."""
+        import pandas as pd
+        values = self.function(table)
+        if not isinstance(values, pd.Series):
+            values = pd.Series(values, index=table.index, dtype=object)
+        return(values.astype(object).where(values.notna(), '')
+               .astype(str).tolist())
+
+    def evaluate_rows(self, table):
+        """Same as `evaluate`, the participants being evaluated one at a
+        time: the value of a participant for which the evaluation fails is
+        the exception raised."""
+        values = []
+        for position in range(len(table)):
+            try:
+                values.append(self.evaluate(table.iloc[[position]])[0])
+            except Exception as error:
+                values.append(error)
+        return(values)
+
+    def __repr__(self):
+        return('DerivedField({})'.format(self.description))
+
+
+def evaluate(derived_fields, table):
+    """Evaluates derived fields for a whole table.
+
+    :Parameters:
+
+        *derived_fields*: dict
+            `DerivedField` objects keyed by fields names.
+        *table*: pd.DataFrame
+            Participants table.
+
+    :Returns:
+
+        *values*: dict
+            Lists of the texts of the fields (in the order of the table),
+            keyed by fields names. The texts of the participants for which a
+            field could not be evaluated are the exceptions raised (see
+            `DerivedField.evaluate_rows`).
+
+    """
+    values = {}
+    for field, derived in derived_fields.items():
+        try:
+            values[field] = derived.evaluate(table)
+        except Exception:
+            values[field] = derived.evaluate_rows(table)
+    return(values)
+
+
+def evaluate_row(derived_fields, row):
+    """Evaluates derived fields for a single participant, given as a
+    dictionnary. Returns the texts of the fields keyed by fields names."""
+    import pandas as pd
+    values = {}
+    for field, derived in derived_fields.items():
+        columns = derived.columns or list(row)
+        table = pd.DataFrame([{column: row.get(column)
+                               for column in columns}])
+        values[field] = derived.evaluate(table)[0]
+    return(values)
+
+
+def _text(table, column):
+    """Returns the values of a column as a Series of str, missing values
+    being empty strings."""
+    values = table[column].astype(object)
+    return(values.where(values.notna(), '').astype(str))
+
+
+def upper(column):
+    """Returns the `DerivedField` of the values of a column in upper case
+    (e.g. surnames)."""
+    return(DerivedField(lambda table: _text(table, column).str.upper(),
+                        (column,), 'upper({!r})'.format(column)))
+
+
+def short_name(first_column, last_column):
+    """Returns the `DerivedField` of the short names of the participants, as
+    "Firstname L.". Participants without last name get their first name
+    only."""
+    def function(table):
+        first = _text(table, first_column).str.strip()
+        last = _text(table, last_column).str.strip()
+        short = first + ' ' + last.str.slice(0, 1) + '.'
+        return(short.where(last != '', first))
+    return(DerivedField(function, (first_column, last_column),
+                        'short_name({!r}, {!r})'.format(first_column,
+                                                        last_column)))
+
+
+def truncate(column, length, ellipsis='…'):
+    """Returns the `DerivedField` of the values of a column truncated to
+    `length` characters, `ellipsis` included (e.g. team names too long for
+    their frame)."""
+    assert length > len(ellipsis), ("length must be greater than the length "
+    "of the ellipsis")
+
+    def function(table):
+        text = _text(table, column)
+        short = text.str.slice(0, length - len(ellipsis)).str.rstrip()
+        return(text.where(text.str.len() <= length, short + ellipsis))
+    return(DerivedField(function, (column,),
+                        'truncate({!r}, {}, {!r})'.format(column, length,
+                                                          ellipsis)))
+
+
+def age_category(column, categories, year=None):
+    """Returns the `DerivedField` of the age categories of the participants.
+
+    :Parameters:
+
+        *column*: str
+            Column of the birth dates, or of the birth years.
+        *categories*: list of tuples
+            `(max_age, label)` pairs, by increasing maximal age. A
+            participant gets the label of the first category which maximal
+            age is greater or equal to its age. The maximal age of the last
+            category can be None (no limit). Participants out of all the
+            categories, or without birth date, get an empty string.
+        *year*: int, optional
+            Year in which the ages are computed (year of the race or of the
+            season). Default is the current year.
+
+    """
+    bounds = [math.inf if max_age is None else max_age
+              for max_age, _ in categories]
+    assert bounds == sorted(bounds), ("categories must be given by "
+    "increasing maximal age")
+    labels = [label for _, label in categories] + ['']
+    if year is None:
+        year = datetime.date.today().year
+
+    def function(table):
+        import numpy as np
+        import pandas as pd
+        births = table[column]
+        if births.dtype.kind in 'iuf':
+            birth_years = births.to_numpy(dtype=float)
+        else:
+            birth_years = pd.to_datetime(births, errors='coerce').dt.year
+            birth_years = birth_years.to_numpy(dtype=float, na_value=np.nan)
+        ages = year - birth_years
+        indexes = np.searchsorted(bounds, ages, side='left')
+        indexes[np.isnan(ages)] = len(categories)
+        return(np.array(labels, dtype=object)[indexes])
+    return(DerivedField(function, (column,), 'age_category({!r}, {!r}, '
+                        '{})'.format(column, categories, year)))
+
+
+def formatted(pattern):
+    """Returns the `DerivedField` of a pattern filled with the values of
+    columns, e.g. `'{Firstname} {Lastname}'`. Only plain columns names can be
+    used between braces."""
+    parts = []
+    for literal, column, spec, conversion in string.Formatter().parse(
+            pattern):
+        assert not spec and not conversion, ("Only plain columns names can "
+        "be used in the pattern of a formatted field")
+        parts.append((literal, column))
+
+    def function(table):
+        import pandas as pd
+        text = pd.Series('', index=table.index, dtype=object)
+        for literal, column in parts:
+            text = text + literal
+            if column is not None:
+                text = text + _text(table, column)
+        return(text)
+    return(DerivedField(function, tuple(column for _, column in parts
+                                        if column is not None),
+                        'formatted({!r})'.format(pattern)))
+
+
+def from_expression(expression):
+    """Returns the `DerivedField` of a textual expression, as given on the
+    command line: `upper(COLUMN)`, `short_name(FIRST, LAST)`,
+    `truncate(COLUMN, LENGTH)`, or else a pattern (see `formatted`)."""
+    match = re.fullmatch(r'\s*(\w+)\((.*)\)\s*', expression)
+    if match is not None and match.group(1) in ('upper', 'short_name',
+                                                'truncate'):
+        name = match.group(1)
+        arguments = [argument.strip()
+                     for argument in match.group(2).split(',')]
+        if name == 'upper' and len(arguments) == 1:
+            return(upper(arguments[0]))
+        if name == 'short_name' and len(arguments) == 2:
+            return(short_name(*arguments))
+        if name == 'truncate' and len(arguments) == 2:
+            return(truncate(arguments[0], int(arguments[1])))
+        raise ValueError("Wrong arguments in {!r}".format(expression))
+    return(formatted(expression))
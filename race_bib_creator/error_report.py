@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `ErrorReport` class used by
+`BibFactory.make_bib_files` to isolate the failures of individual bibs.
+
+By default, the first failing bib aborts the run. When an `ErrorReport` is
+given to `make_bib_files` (`errors` parameter), the failure of a bib is
+recorded in the report as a `BibError` (participant, stage of the failure and
+exception) and the other bibs are created normally. Failed bibs are neither
+listed in the conversion script nor in the manifest (or journal).
+
+Once the faulty rows are fixed, only the failed bibs can be created again,
+either with the `numbers` parameter of `make_bib_files` or by resuming the run
+(`resume=True`).
+
+Example
+-------
+
+>>> report = race_bib_creator.ErrorReport()
+>>> factory.make_bib_files(template, 'race_1', errors=report)
+>>> for error in report:
+...     print(error.number, error.stage, error.message)
+>>> report.write('race_1/errors.json')
+>>> # once the participants table is fixed
+>>> factory.make_bib_files(template, 'race_1', numbers=report.numbers())
+
+Class definitions
+-----------------
+"""
+import json
+import traceback
+
+#: Version of the error reports format.
+ERROR_REPORT_VERSION = 1
+
+
+def _json_value(value):
+    """Returns a value that can be written in json (numpy scalars are
+    converted to Python objects, unknown objects to strings)."""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return(value)
+    return(str(value))
+
+
+class BibError():
+    """Failure of the creation of one bib. Only made of plain values so that
+    it can be sent by worker processes and written in json.
+
+    :Attributes:
+
+        **position**: int
+            Position of the participant in the participants table.
+        **number**: object
+            Bib number.
+        **participant**: dict
+            Row of the participant.
+        **stage**: str
+            Stage of the run that failed (see module `run_stats`).
+        **exception**: str
+            Name of the class of the exception.
+        **message**: str
+            Message of the exception.
+        **traceback**: str
+            Formatted traceback of the exception.
+        **target**: str or None
+            Output repository of the failed bib.
+
+    """
+    __slots__ = ('position', 'number', 'participant', 'stage', 'exception',
+                 'message', 'traceback', 'target')
+
+    def __init__(self, position, number, participant, stage, exception,
+                 message, traceback=None, target=None):
+        self.position = position
+        self.number = _json_value(number)
+        self.participant = {str(key): _json_value(value)
+                            for key, value in participant.items()}
+        self.stage = stage
+        self.exception = exception
+        self.message = message
+        self.traceback = traceback
+        self.target = target
+
+    @classmethod
+    def from_exception(cls, position, number, participant, stage, error):
+        """Returns the `BibError` of an exception being handled."""
+        return(cls(position, number, participant, stage,
+                   type(error).__name__, str(error), traceback.format_exc()))
+
+    def as_dict(self):
+        """Returns the error as a dictionnary (json compatible)."""
+        return({name: getattr(self, name) for name in self.__slots__})
+
+    def __repr__(self):
+        return('BibError(number={!r}, stage={!r}, {}: {})'.format(
+                   self.number, self.stage, self.exception, self.message))
+
+
+class ErrorReport():
+    """Collection of the failures of a run, in the order of the participants
+    table.
+
+    :Attributes:
+
+        **errors**: list of BibError
+            Failures of the run.
+        **output_rep**: str
+            Output repository of the run.
+
+    """
+    def __init__(self):
+        self.errors = []
+        self.output_rep = None
+
+    def add(self, error):
+        """Adds a `BibError` to the report."""
+        self.errors.append(error)
+
+    def __len__(self):
+        return(len(self.errors))
+
+    def __iter__(self):
+        return(iter(sorted(self.errors, key=lambda error: error.position)))
+
+    def numbers(self):
+        """Returns the bib numbers of the failed bibs."""
+        return([error.number for error in self])
+
+    def by_stage(self):
+        """Returns the number of failures per stage."""
+        counts = {}
+        for error in self.errors:
+            counts[error.stage] = counts.get(error.stage, 0) + 1
+        return(counts)
+
+    def as_dict(self):
+        """Returns the report as a dictionnary (json compatible)."""
+        return({'version': ERROR_REPORT_VERSION,
+                'output_rep': self.output_rep,
+                'errors': [error.as_dict() for error in self]})
+
+    def write(self, path):
+        """Writes the report in a json file."""
+        with open(path, 'w') as report:
+            json.dump(self.as_dict(), report, indent=1, sort_keys=True)
+            report.write('\n')
+
+
+def read_error_report(path):
+    """Reads an error report written by `ErrorReport.write`."""
+    with open(path) as stream:
+        content = json.load(stream)
+    if content.get('version') != ERROR_REPORT_VERSION:
+        raise ValueError("{} is not a version {} error report".format(
+                             path, ERROR_REPORT_VERSION))
+    report = ErrorReport()
+    report.output_rep = content['output_rep']
+    for error in content['errors']:
+        report.add(BibError(**error))
+    return(report)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the journal used by `BibFactory.make_bib_files` to
+resume interrupted runs (`resume=True`).
+
+The journal is an append-only file of the output repository. Its first line
+identifies the template used for the run (see `BibTemplate.fingerprint`);
+each following line is written as soon as a bib is completed and holds its
+manifest entry (see module `manifest`) completed with a digest of the
+participant's row and the sha256 digest of its barcode file.
+
+When a run is resumed, a journaled bib is skipped if the template and the
+participant's row are unchanged and if its files are still intact (same
+sha256 digests). A journal written for another template is discarded. A
+truncated last line (power cut while writing) is ignored.
+
+The journal file is never truncated: when a run starts, the valid entries of
+the previous run are written to a new file which then replaces the journal
+at once, so that an interruption at any time leaves either journal intact.
+The entries are then appended, and synced to the disk at most every
+`sync_interval` seconds: a power cut only loses the last entries, whose bibs
+are made again by the next run.
+
+Class definition
+----------------
+"""
+import hashlib
+import json
+import os
+import time
+
+from .manifest import file_digest
+
+#: Version of the journal format.
+JOURNAL_VERSION = 1
+
+
+def row_digest(row):
+    """Returns a digest of the values of a participant's row."""
+    return(hashlib.sha1(repr(sorted(row.items(), key=lambda item:
+                                    str(item[0]))).encode('utf-8')
+                        ).hexdigest())
+
+
+class Journal():
+    """Append-only journal of the bibs completed during a run.
+
+    :Attributes:
+
+        **path**: str
+            Path of the journal file.
+        **fingerprint**: str
+            Fingerprint of the template used for the run.
+        **sync_interval**: float
+            Maximal number of seconds between two syncs of the appended
+            entries to the disk (0: each entry is synced).
+
+    """
+    def __init__(self, path, fingerprint, sync_interval=0.5):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.sync_interval = sync_interval
+        self._stream = None
+        self._synced = None
+
+    def load(self):
+        """Reads the journal and returns its entries in a dictionnary which
+        keys are the positions of the participants. Returns an empty
+        dictionnary if there is no journal or if it was written for another
+        template."""
+        entries = {}
+        if not os.path.exists(self.path):
+            return(entries)
+        with open(self.path) as journal:
+            lines = journal.read().split('\n')
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            return(entries)
+        if header != {'version': JOURNAL_VERSION,
+                      'fingerprint': self.fingerprint}:
+            return(entries)
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # empty or truncated line
+                continue
+            entries[entry['position']] = entry
+        return(entries)
+
+    def open(self, entries):
+        """Opens the journal for appending. The journal is first replaced by
+        a journal holding the given entries (the valid entries of a previous
+        run), written and synced aside."""
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as journal:
+            journal.write(json.dumps({'version': JOURNAL_VERSION,
+                                      'fingerprint': self.fingerprint}) +
+                          '\n')
+            for entry in entries:
+                journal.write(json.dumps(entry, sort_keys=True) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(temporary, self.path)
+        self._stream = open(self.path, 'a')
+        self._synced = time.monotonic()
+
+    def append(self, entry):
+        """Appends the entry of a completed bib. It is flushed to the system
+        at once and synced to the disk if the last sync is older than
+        `sync_interval`."""
+        self._stream.write(json.dumps(entry, sort_keys=True) + '\n')
+        self._stream.flush()
+        now = time.monotonic()
+        if now - self._synced >= self.sync_interval:
+            os.fsync(self._stream.fileno())
+            self._synced = now
+
+    def close(self):
+        """Syncs and closes the journal."""
+        if self._stream is not None:
+            self._stream.flush()
+            os.fsync(self._stream.fileno())
+            self._stream.close()
+            self._stream = None
+
+
+def is_intact(entry, output_rep):
+    """Returns True if the files of a journal entry exist in `output_rep` with
+    the journaled digests."""
+    files = [(entry['bib'], entry['sha256'])]
+    if entry['barcode'] is not None:
+        files.append((entry['barcode'], entry['barcode_sha256']))
+    try:
+        return(all(file_digest(os.path.join(output_rep, name)) == digest
+                   for name, digest in files))
+    except OSError:
+        return(False)
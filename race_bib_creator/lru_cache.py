@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `LRUCache` class, a cache of byte strings bounded by
+their total size. It is used for the bibs served by `BibService` and for the
+barcode pictures of a `BibTemplate`, which are reused by all the runs of the
+template (bulk runs, `BibFactory.make_bib`, daemon, service).
+
+Class definition
+----------------
+"""
+import collections
+import threading
+
+
+class LRUCache():
+    """Thread safe least recently used cache bounded by the total size (in
+    bytes) of its values.
+
+    :Attributes:
+
+        **max_bytes**: int
+            Maximal size of the values kept.
+        **size**: int
+            Current size of the values kept.
+        **hits**: int
+            Number of successful lookups.
+        **misses**: int
+            Number of failed lookups.
+
+    """
+    def __init__(self, max_bytes=64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Returns the value cached for a key, or None if there is none or if
+        it was cached for another version."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return(None)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return(entry[1])
+
+    def put(self, key, version, value):
+        """Caches a value (bytes) for a key and a version and evicts the least
+        recently used values exceeding the size limit."""
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self._entries[key] = (version, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        """Empties the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return(len(self._entries))
+
+    def __getstate__(self):
+        # a copy sent to another process starts empty
+        return({'max_bytes': self.max_bytes})
+
+    def __setstate__(self, state):
+        self.__init__(state['max_bytes'])
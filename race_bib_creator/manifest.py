@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the manifests of bib creation runs and the tools to merge
+the manifests and conversion scripts of partial runs (shards).
+
+A manifest is a json file written in the output repository by
+`BibFactory.make_bib_files` when `make_manifest` is True (which is the
+default for sharded runs). It lists, for each created bib, its position in the
+participants table, its number, the names of its svg and barcode files, the
+sha256 digest of the svg file and its conversion command.
+
+When a race is split in shards (see the `shard` parameter of
+`BibFactory.make_bib_files`), each node writes a partial manifest
+(`manifest.shard-<i>-of-<n>.json`) and a partial conversion script
+(`make_pngs.shard-<i>-of-<n>.bat`). Once the outputs of all the nodes are
+gathered in one repository, `merge_shards` writes the manifest and the
+conversion script that a single-node run would have written.
+
+Example
+-------
+
+On node i out of 4 (with the same output path on every node):
+
+>>> factory.make_bib_files(template, '/shared/race_1', shard=(i, 4),
+...                        shard_by='hash')
+
+Then, once the four outputs are gathered:
+
+>>> race_bib_creator.merge_shards('/shared/race_1')
+
+Functions definitions
+---------------------
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+
+#: Version of the manifests format.
+MANIFEST_VERSION = 1
+
+_SHARD_SUFFIX = re.compile(r'\.shard-(\d+)-of-(\d+)$')
+
+
+def file_digest(path, block_size=2 ** 16):
+    """Returns the sha256 hexadecimal digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stream:
+        block = stream.read(block_size)
+        while block:
+            digest.update(block)
+            block = stream.read(block_size)
+    return(digest.hexdigest())
+
+
+def shard_suffix(shard):
+    """Returns the suffix added to the manifest and script names of a shard.
+
+    :Parameters:
+
+        *shard*: tuple
+            `(i, n)` pair.
+
+    """
+    return('.shard-{}-of-{}'.format(*shard))
+
+
+def part_name(name, suffix):
+    """Inserts a suffix before the extension of a file name:
+    `part_name('make_pngs.bat', '.shard-0-of-2')` returns
+    `'make_pngs.shard-0-of-2.bat'`."""
+    root, extension = os.path.splitext(name)
+    return(root + suffix + extension)
+
+
+def write_manifest(path, entries, output_format, shard=None):
+    """Writes a manifest file.
+
+    :Parameters:
+
+        *path*: str
+            Path of the manifest file.
+        *entries*: list of dict
+            One dictionnary per bib with the keys `position`, `number`,
+            `bib`, `barcode`, `sha256` and `command`.
+        *output_format*: str
+            Final format of the bibs of the run.
+        *shard*: tuple, optional
+            `(i, n)` pair of a sharded run.
+
+    """
+    content = {'version': MANIFEST_VERSION,
+               'output_format': output_format,
+               'shard': list(shard) if shard is not None else None,
+               'entries': sorted(entries,
+                                 key=lambda entry: entry['position'])}
+    with open(path, 'w') as manifest:
+        json.dump(content, manifest, indent=1, sort_keys=True)
+        manifest.write('\n')
+
+
+def read_manifest(path):
+    """Reads a manifest file and returns its content as a dictionnary."""
+    with open(path) as manifest:
+        content = json.load(manifest)
+    if content.get('version') != MANIFEST_VERSION:
+        raise ValueError("{} is not a version {} manifest".format(
+                             path, MANIFEST_VERSION))
+    return(content)
+
+
+def merge_manifests(output_rep, parts, manifest_name='manifest.json',
+                    script_name=None):
+    """Merges partial manifests and writes the conversion script listing the
+    commands of all their entries in the order of the participants table.
+
+    :Parameters:
+
+        *output_rep*: str
+            Repository containing the partial manifests.
+        *parts*: list of str
+            Names of the partial manifest files.
+        *manifest_name*: str, optional
+            Name of the merged manifest file.
+        *script_name*: str, optional
+            Name of the merged conversion script. Default is
+            `make_<format>s.bat`. No script is written for formats that need
+            no conversion.
+
+    :Returns:
+
+        *entries*: list of dict
+            Entries of the merged manifest.
+
+    """
+    entries = []
+    output_formats = set()
+    for part in parts:
+        content = read_manifest(os.path.join(output_rep, part))
+        output_formats.add(content['output_format'])
+        entries.extend(content['entries'])
+    if len(output_formats) > 1:
+        raise ValueError("Parts were made for different formats: "
+                         "{}".format(sorted(output_formats)))
+    output_format = output_formats.pop() if output_formats else 'png'
+    positions = [entry['position'] for entry in entries]
+    if len(set(positions)) != len(positions):
+        raise ValueError("Some bibs appear in several parts")
+    write_manifest(os.path.join(output_rep, manifest_name), entries,
+                   output_format)
+    entries.sort(key=lambda entry: entry['position'])
+    commands = [entry['command'] for entry in entries
+                if entry['command'] is not None]
+    if commands:
+        script_name = script_name or 'make_{}s.bat'.format(output_format)
+        with open(os.path.join(output_rep, script_name), 'w') as script:
+            script.writelines(commands)
+    return(entries)
+
+
+def merge_shards(output_rep, manifest_name='manifest.json', script_name=None):
+    """Merges the manifests and conversion scripts of all the shards found in
+    `output_rep`. Fails if a shard is missing. See `merge_manifests`."""
+    root, extension = os.path.splitext(manifest_name)
+    parts = {}
+    counts = set()
+    for path in glob.glob(os.path.join(output_rep, root + '.shard-*-of-*' +
+                                                   extension)):
+        name = os.path.basename(path)
+        match = _SHARD_SUFFIX.search(os.path.splitext(name)[0])
+        if match is None:
+            continue
+        parts[int(match.group(1))] = name
+        counts.add(int(match.group(2)))
+    if len(counts) != 1:
+        raise ValueError("Expected the manifests of one sharding in {}, found "
+                         "shard counts {}".format(output_rep, sorted(counts)))
+    count = counts.pop()
+    missing = sorted(set(range(count)) - set(parts))
+    if missing:
+        raise ValueError("Missing shards {} out of {}".format(missing, count))
+    return(merge_manifests(output_rep, [parts[i] for i in range(count)],
+                           manifest_name=manifest_name,
+                           script_name=script_name))
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the progress reporting tools of bib creation runs.
+
+A `ProgressTracker` is fed by the factory each time a bib is completed or
+fails, and sends `ProgressEvent` objects to listeners. A listener is any
+callable taking an event as single argument. A run always sends a 'start'
+event first and an 'end' event last, even when it fails. Events describe the
+whole run: the number of bibs completed so far, a rolling throughput (bibs
+per second over the last seconds), an estimated time of arrival, the number
+of failures and the number of bibs waiting to be processed (queue depth).
+
+When no listener is given to the factory, `NULL_PROGRESS` is used instead of a
+tracker: its methods do nothing so that a silent run pays almost nothing for
+progress reporting.
+
+Events can either be handled by callbacks:
+
+>>> def show(event):
+...     print("{} / {} bibs, ETA {:.0f} s".format(event.completed, event.total,
+...                                             event.eta or 0))
+>>> factory.make_bib_files(template, 'race_1', progress=show)
+
+or iterated over from another thread with an `EventQueue`:
+
+>>> import threading
+>>> events = race_bib_creator.EventQueue()
+>>> threading.Thread(target=factory.make_bib_files,
+...                  kwargs={'bib_template': template, 'progress': events}
+...                  ).start()
+>>> for event in events:
+...     print(event)
+
+Class definitions
+-----------------
+"""
+import collections
+import queue
+import time
+
+#: Kinds of events sent by a `ProgressTracker`.
+EVENT_KINDS = ('start', 'bib', 'failure', 'end')
+
+
+class ProgressEvent():
+    """State of a run at a given time.
+
+    :Attributes:
+
+        **kind**: str
+            One of 'start', 'bib' (a bib was completed), 'failure' (a bib
+            could not be created) and 'end'.
+        **completed**: int
+            Number of bibs completed since the start of the run.
+        **total**: int
+            Number of bibs expected for the run.
+        **failures**: int
+            Number of bibs that could not be created.
+        **rate**: float
+            Rolling throughput, in bibs per second.
+        **eta**: float or None
+            Estimated number of seconds before the end of the run. None while
+            the throughput is unknown.
+        **queue_depth**: int
+            Number of bibs handed to workers and not completed yet. Always 0
+            when the bibs are created in the calling process.
+        **elapsed**: float
+            Seconds elapsed since the start of the run.
+        **number**: object
+            Number of the bib concerned by a 'bib' or 'failure' event.
+        **error**: Exception, BibError or None
+            Exception raised for a 'failure' event, or its `BibError` when
+            failures are collected in an error report.
+
+    """
+    __slots__ = ('kind', 'completed', 'total', 'failures', 'rate', 'eta',
+                 'queue_depth', 'elapsed', 'number', 'error')
+
+    def __init__(self, kind, completed, total, failures, rate, eta,
+                 queue_depth, elapsed, number=None, error=None):
+        self.kind = kind
+        self.completed = completed
+        self.total = total
+        self.failures = failures
+        self.rate = rate
+        self.eta = eta
+        self.queue_depth = queue_depth
+        self.elapsed = elapsed
+        self.number = number
+        self.error = error
+
+    def __repr__(self):
+        return("ProgressEvent({}, {}/{}, failures={}, rate={:.1f}/s, eta={}, "
+               "queue_depth={})".format(self.kind, self.completed, self.total,
+                                        self.failures, self.rate, self.eta,
+                                        self.queue_depth))
+
+
+class ProgressTracker():
+    """Computes the progress of a run and notifies listeners.
+
+    :Attributes:
+
+        **listeners**: list
+            Callables to which the `ProgressEvent` objects are sent.
+        **total**: int
+            Number of bibs expected for the run.
+        **window**: float
+            Duration (in seconds) over which the rolling throughput is
+            computed.
+        **min_interval**: float
+            Minimal duration (in seconds) between two 'bib' events. 'start',
+            'failure' and 'end' events are always sent.
+
+    """
+    def __init__(self, listeners, total, window=10.0, min_interval=0.0):
+        if callable(listeners):
+            listeners = [listeners]
+        self.listeners = list(listeners)
+        self.total = total
+        self.window = window
+        self.min_interval = min_interval
+        self.completed = 0
+        self.failures = 0
+        self._start = None
+        self._last_event = None
+        self._history = collections.deque()
+
+    def start(self, total=None):
+        """Starts the run clock, resets the counters of the tracker (which
+        can be used for several runs) and sends a 'start' event.
+
+        :Parameters:
+
+            *total*: int, optional
+                Number of bibs expected for the run. Default is to keep
+                `total`.
+
+        """
+        if total is not None:
+            self.total = total
+        self.completed = 0
+        self.failures = 0
+        self._last_event = None
+        self._history.clear()
+        self._start = time.perf_counter()
+        self._history.append((self._start, 0))
+        self._emit('start', self._start, 0)
+
+    def bib_done(self, number=None, queue_depth=0):
+        """Records a completed bib."""
+        self.completed += 1
+        now = time.perf_counter()
+        self._history.append((now, self.completed))
+        if (self._last_event is not None and
+                now - self._last_event < self.min_interval and
+                self.completed < self.total):
+            return
+        self._emit('bib', now, queue_depth, number)
+
+    def bib_failed(self, number=None, error=None, queue_depth=0):
+        """Records a bib that could not be created."""
+        self.failures += 1
+        self._emit('failure', time.perf_counter(), queue_depth, number, error)
+
+    def end(self):
+        """Sends an 'end' event. The next run starts with `start`."""
+        self._emit('end', time.perf_counter(), 0)
+        self._start = None
+
+    def rate(self, now=None):
+        """Returns the throughput (bibs per second) over the last `window`
+        seconds."""
+        now = now or time.perf_counter()
+        history = self._history
+        while len(history) > 2 and now - history[1][0] > self.window:
+            history.popleft()
+        first_time, first_completed = history[0]
+        if now <= first_time:
+            return(0.0)
+        return((self.completed - first_completed) / (now - first_time))
+
+    def _emit(self, kind, now, queue_depth, number=None, error=None):
+        if self._start is None:
+            # run failed before it was started: listeners still get the
+            # 'start' event first
+            self.start()
+            now = max(now, self._start)
+        self._last_event = now
+        rate = self.rate(now)
+        remaining = self.total - self.completed - self.failures
+        eta = remaining / rate if rate > 0 else None
+        event = ProgressEvent(kind, self.completed, self.total, self.failures,
+                              rate, eta, queue_depth, now - self._start,
+                              number, error)
+        for listener in self.listeners:
+            listener(event)
+
+
+class _NullProgress():
+    """Stand-in for `ProgressTracker` used when there is no listener."""
+    def start(self, total=None):
+        pass
+
+    def bib_done(self, number=None, queue_depth=0):
+        pass
+
+    def bib_failed(self, number=None, error=None, queue_depth=0):
+        pass
+
+    def end(self):
+        pass
+
+
+#: Object used by the factory when no progress listener is provided.
+NULL_PROGRESS = _NullProgress()
+
+
+class EventQueue():
+    """Listener storing the events in a thread-safe queue so that they can be
+    iterated over from another thread. Iteration stops after the 'end'
+    event.
+    """
+    def __init__(self, maxsize=0):
+        self._queue = queue.Queue(maxsize)
+
+    def __call__(self, event):
+        self._queue.put(event)
+
+    def __iter__(self):
+        while True:
+            event = self._queue.get()
+            yield event
+            if event.kind == 'end':
+                return
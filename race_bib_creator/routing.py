@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `TemplateRouter` class, used to make the bibs of
+events mixing several races (10 km, half-marathon, kids' race...) from a
+single participants table, each race having its own bib design.
+
+A router maps the values of a column of the table to bib templates. It is
+given to `BibFactory.make_bib_files` (or to the factory) instead of a
+template: each participant is rendered with the template of its value, in a
+single pass over the table. The bibs of each template are written in their
+own output repository, a sub-repository of the output repository of the
+factory named after the value unless one is given, with their own conversion
+script and manifest. Routes of different templates which would write their
+bibs in the same repository (e.g. values 'A/B' and 'A_B', both named 'A_B')
+are refused.
+
+The values are compared as text, numbers being written without a useless
+decimal part: the value 1.0 of a column of numbers read as floats (because
+of an empty cell) takes the route '1'. Empty cells (None, NaN) take the
+default route. When worker processes are used, the bibs are handed to
+the workers template by template so that the small races are processed
+alongside the big ones.
+
+Example
+-------
+
+>>> router = race_bib_creator.TemplateRouter(
+...     'Race', {'10k': template_10k, 'Semi': (template_semi, 'race_1/semi'),
+...              'Kids': template_kids})
+>>> factory.make_bib_files(router, 'race_1', jobs=4)
+
+Class definition
+----------------
+"""
+import math
+import numbers
+import os
+import re
+
+
+class TemplateRouter():
+    """Routing of the participants to bib templates according to the value
+    of a column.
+
+    :Attributes:
+
+        **column**: str
+            Name of the column of the participants table used for routing.
+        **routes**: dict
+            Bib template of each value of the column (as text, see
+            `route_key`), with its output repository (None for the default
+            one), as a `(bib_template, output_rep)` pair.
+        **default**: tuple or None
+            `(bib_template, output_rep)` pair used for the values without
+            route. If None, such values make the run fail.
+
+    """
+    def __init__(self, column, routes, default=None):
+        """
+        :Parameters:
+
+            *column*: str
+                Name of the column used for routing.
+            *routes*: dict
+                Keys are values of the column, values are a `BibTemplate` or
+                a `(bib_template, output_rep)` pair.
+            *default*: BibTemplate or tuple, optional
+                Template (or pair) of the values without route. Its bibs are
+                written in the output repository of the factory unless a
+                repository is given.
+
+        """
+        assert isinstance(routes, dict), ("The routes must be given in a dict"
+        " which keys are values of the column and values are templates")
+        self.column = column
+        self.routes = {}
+        values = {}
+        for value, route in routes.items():
+            key = route_key(value)
+            assert key is not None, "Empty values take the default route"
+            assert key not in values, ("The route values {!r} and {!r} are "
+            "the same".format(values.get(key), value))
+            values[key] = value
+            self.routes[key] = _pair(route)
+        self.default = None if default is None else _pair(default)
+
+    def targets(self, output_rep):
+        """Returns the list of the distinct `(bib_template, output_rep)`
+        targets of the router, the repositories without name being made in
+        `output_rep` (named after the routed value). Raises a ValueError if
+        targets of different templates share a repository."""
+        targets = []
+        values = {}
+        routes = list(self.routes.items())
+        if self.default is not None:
+            routes.append((None, self.default))
+        for value, (bib_template, rep) in routes:
+            target = self._target(value, bib_template, rep, output_rep)
+            if target in targets:
+                continue
+            path = os.path.normcase(os.path.abspath(target[1]))
+            if path in values:
+                raise ValueError("The routes of the values {!r} and {!r} of "
+                                 "column {} write different templates in the "
+                                 "same repository {}: give them their own "
+                                 "output repository".format(
+                                     values[path], value, self.column,
+                                     target[1]))
+            values[path] = value
+            targets.append(target)
+        return(targets)
+
+    def route(self, row, output_rep):
+        """Returns the `(bib_template, output_rep)` target of a participant's
+        row. Raises a KeyError if its value has no route and there is no
+        default."""
+        value = route_key(row.get(self.column))
+        route = self.routes.get(value)
+        if route is None:
+            if self.default is None:
+                raise KeyError("No bib template for the value {!r} of column "
+                               "{}".format(row.get(self.column), self.column))
+            value = None
+            route = self.default
+        return(self._target(value, route[0], route[1], output_rep))
+
+    def _target(self, value, bib_template, rep, output_rep):
+        """Returns the target of the route of a value (None for the default
+        route)."""
+        if rep is None:
+            rep = output_rep
+            if value is not None:
+                rep = os.path.join(output_rep, _dir_name(value))
+        return((bib_template, rep))
+
+
+def route_key(value):
+    """Returns the text of a value of the routing column, as compared with the
+    routes: integral numbers are written without decimal part (1.0 gives '1')
+    and empty values (None, NaN, '') give None."""
+    if value is None:
+        return(None)
+    if (isinstance(value, numbers.Real) and
+            not isinstance(value, numbers.Integral)):
+        if math.isnan(value):
+            return(None)
+        if float(value).is_integer():
+            value = int(value)
+    return(str(value).strip() or None)
+
+
+def _pair(route):
+    """Returns the `(bib_template, output_rep)` pair of a route."""
+    if isinstance(route, (list, tuple)):
+        bib_template, output_rep = route
+        return((bib_template, output_rep))
+    return((route, None))
+
+
+def _dir_name(value):
+    """Returns the name of the output repository of a routed value."""
+    return(re.sub(r'[^\w.-]+', '_', str(value)).strip('_') or '_')
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the definition of the `RunStats` class used to instrument
+bib creation runs, and of the `StatsHook` class from which hooks forwarding
+these measures to another system (logs, metrics server...) can be derived.
+
+Instrumentation is opt-in. When a `BibFactory` or a `BibTemplate` is not given
+a `RunStats` object, it uses `NULL_STATS` whose methods do nothing, so that
+non-instrumented runs pay (almost) nothing for it.
+
+A run is split in the following stages:
+
+    - *read*: reading of the participants table,
+    - *validate*: checks and selection of the fields of a participant,
+    - *barcode*: creation of the barcode picture files,
+    - *render*: replacement of the markers of the template,
+    - *write*: writing of the bib files on disk,
+    - *convert*: creation of the conversion commands and script.
+
+For each stage, the wall time, the number of calls and the number of bytes
+produced are recorded.
+
+Example
+-------
+
+>>> import race_bib_creator
+>>> class PrintHook(race_bib_creator.StatsHook):
+...     def on_run_end(self, stats):
+...         print(stats.as_dict())
+>>> result = factory.make_bib_files(template, 'race_1',
+...                                 stats=race_bib_creator.RunStats(
+...                                     hooks=[PrintHook()]))
+>>> result.stats.stages['barcode'].wall_time
+
+Class definitions
+-----------------
+"""
+import time
+
+#: Names of the stages of a bib creation run, in order.
+STAGES = ('read', 'validate', 'barcode', 'render', 'write', 'convert')
+
+
+class StageStats():
+    """Cumulated measures of one stage of a run.
+
+    :Attributes:
+
+        **wall_time**: float
+            Time spent in the stage, in seconds.
+        **calls**: int
+            Number of times the stage was executed.
+        **bytes**: int
+            Number of bytes produced by the stage (written on disk or read for
+            the *read* stage).
+
+    """
+    __slots__ = ('wall_time', 'calls', 'bytes')
+
+    def __init__(self):
+        self.wall_time = 0.0
+        self.calls = 0
+        self.bytes = 0
+
+    def as_dict(self):
+        """Returns the measures as a dictionnary."""
+        return({'wall_time': self.wall_time, 'calls': self.calls,
+                'bytes': self.bytes})
+
+
+class StatsHook():
+    """Base class of the hooks attached to a `RunStats` object.
+
+    Derived classes override the methods corresponding to the events they are
+    interested in. Hooks are called synchronously, in the process producing
+    the bibs: costly operations (network calls...) should rather be done in
+    `on_run_end`.
+    """
+    def on_stage(self, stage, elapsed, nbytes):
+        """Called each time a stage is executed."""
+        pass
+
+    def on_run_end(self, stats):
+        """Called with the `RunStats` object at the end of a run."""
+        pass
+
+
+class RunStats():
+    """Measures of a bib creation run.
+
+    :Attributes:
+
+        **stages**: dict
+            Dictionnary which keys are stage names (see `STAGES`) and values
+            are `StageStats` objects.
+        **bibs**: int
+            Number of bibs created during the run.
+        **elapsed**: float
+            Total duration of the run, in seconds.
+        **output_rep**: str
+            Repository where the bibs of the run were stored.
+        **hooks**: list
+            `StatsHook` objects notified of the measures.
+        **enabled**: bool
+            Always True. Lets the instrumented code skip measures that have a
+            cost of their own (such as files sizes) when `NULL_STATS` is used.
+
+    """
+    enabled = True
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, hooks=None):
+        self.stages = {stage: StageStats() for stage in STAGES}
+        self.bibs = 0
+        self.elapsed = 0.0
+        self.output_rep = None
+        self.hooks = list(hooks or [])
+
+    def record(self, stage, elapsed, nbytes=0):
+        """Adds a measure to a stage.
+
+        :Parameters:
+
+            *stage*: str
+                Name of the stage.
+            *elapsed*: float
+                Duration of the stage execution, in seconds.
+            *nbytes*: int, optional
+                Number of bytes produced by the stage execution.
+
+        """
+        stage_stats = self.stages[stage]
+        stage_stats.wall_time += elapsed
+        stage_stats.calls += 1
+        stage_stats.bytes += nbytes
+        for hook in self.hooks:
+            hook.on_stage(stage, elapsed, nbytes)
+
+    def merge(self, other):
+        """Adds the measures of another `RunStats` object to this one. Hooks
+        are not notified."""
+        for stage, stage_stats in other.stages.items():
+            own = self.stages.setdefault(stage, StageStats())
+            own.wall_time += stage_stats.wall_time
+            own.calls += stage_stats.calls
+            own.bytes += stage_stats.bytes
+        self.bibs += other.bibs
+
+    def end_run(self):
+        """Notifies the hooks that the run is over."""
+        for hook in self.hooks:
+            hook.on_run_end(self)
+
+    @property
+    def bibs_per_second(self):
+        """Number of bibs created per second during the run."""
+        if not self.elapsed:
+            return(0.0)
+        return(self.bibs / self.elapsed)
+
+    def as_dict(self):
+        """Returns the measures as a (JSON serializable) dictionnary."""
+        return({'bibs': self.bibs, 'elapsed': self.elapsed,
+                'bibs_per_second': self.bibs_per_second,
+                'output_rep': self.output_rep,
+                'stages': {stage: stage_stats.as_dict() for stage, stage_stats
+                           in self.stages.items()}})
+
+
+class _NullStats():
+    """Stand-in for `RunStats` used when instrumentation is disabled."""
+    enabled = False
+
+    @staticmethod
+    def clock():
+        return(0.0)
+
+    def record(self, stage, elapsed, nbytes=0):
+        pass
+
+
+#: Object used by the instrumented code when no `RunStats` is provided.
+NULL_STATS = _NullStats()
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `PriorityScheduler` class, which runs the rendering
+jobs of a registration desk by priority, so that the reprint of a lost bib
+does not wait behind a run making thousands of bibs.
+
+Jobs are submitted in one of the priority classes of `PRIORITIES`, from the
+highest to the lowest:
+
+    - 'reprint': bib requested by a volunteer, who is waiting for it (see
+      `BibService`),
+    - 'late_entry': bibs of participants added or modified since the last
+      run (see `BibDaemon`),
+    - 'bulk': runs making all the bibs, split in chunks.
+
+The jobs are run by a pool of worker threads. A free worker takes the job of
+the highest class first, the oldest one within a class. `reserved` workers
+never take bulk jobs, so that a high-priority job starts at once even when
+all the other workers are busy with bulk chunks. Jobs age while they wait:
+their class is raised by one level every `aging` seconds, so that a long
+stream of high-priority jobs cannot starve the bulk runs.
+
+The time spent by the jobs in the queue is measured per class (see
+`PriorityScheduler.wait_stats`).
+
+Example
+-------
+
+>>> scheduler = race_bib_creator.PriorityScheduler(workers=3, reserved=1)
+>>> daemon = race_bib_creator.BibDaemon('race_1/participants_1.xlsx',
+...                                     [(template, 'race_1')],
+...                                     scheduler=scheduler)
+>>> service = race_bib_creator.BibService('race_1/participants_1.xlsx',
+...                                       template, 'race_1',
+...                                       scheduler=scheduler)
+>>> scheduler.wait_stats()['reprint']['max']
+
+Class definition
+----------------
+"""
+import collections
+import concurrent.futures
+import threading
+import time
+
+#: Priority classes of the jobs, from the highest to the lowest.
+PRIORITIES = ('reprint', 'late_entry', 'bulk')
+
+
+class _WaitStats():
+    """Queue wait times of the jobs of a priority class."""
+    __slots__ = ('jobs', 'total', 'max', 'recent')
+
+    def __init__(self, history):
+        self.jobs = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=history)
+
+    def add(self, wait):
+        """Records the wait time of a job."""
+        self.jobs += 1
+        self.total += wait
+        self.max = max(self.max, wait)
+        self.recent.append(wait)
+
+    def as_dict(self):
+        """Returns the statistics as a dictionnary (json compatible)."""
+        recent = sorted(self.recent)
+        p95 = recent[int(0.95 * (len(recent) - 1))] if recent else 0.0
+        return({'jobs': self.jobs, 'max': self.max, 'p95': p95,
+                'mean': self.total / self.jobs if self.jobs else 0.0})
+
+
+class PriorityScheduler():
+    """Pool of worker threads running jobs by priority class (see the module
+    documentation).
+
+    :Attributes:
+
+        **workers**: int
+            Number of worker threads.
+        **reserved**: int
+            Number of workers which do not run bulk jobs.
+        **aging**: float or None
+            Seconds of waiting after which a job is raised by one priority
+            class (None: jobs do not age).
+
+    """
+    def __init__(self, workers=2, reserved=1, aging=30.0, history=1000):
+        """
+        :Parameters:
+
+            *workers*: int, optional
+                See the attributes.
+            *reserved*: int, optional
+                See the attributes. Must be lower than `workers`.
+            *aging*: float, optional
+                See the attributes.
+            *history*: int, optional
+                Number of recent jobs per class from which the 95th
+                percentile of the wait times is computed.
+
+        """
+        assert 0 <= reserved < workers, ("reserved must be lower than the "
+        "number of workers")
+        self.workers = workers
+        self.reserved = reserved
+        self.aging = aging
+        self._queues = {priority: collections.deque()
+                        for priority in PRIORITIES}
+        self._waits = {priority: _WaitStats(history)
+                       for priority in PRIORITIES}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = []
+        for index in range(workers):
+            thread = threading.Thread(
+                target=self._work, args=(index < reserved,),
+                name='bib-scheduler-{}'.format(index), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, priority, function, *args, **kwargs):
+        """Submits a job: `function(*args, **kwargs)` is called by a worker.
+        Returns a `concurrent.futures.Future` of its result.
+
+        :Parameters:
+
+            *priority*: str
+                Priority class of the job, one of `PRIORITIES`.
+            *function*: callable
+                Job.
+
+        """
+        assert priority in PRIORITIES, ("priority must be one of "
+        "{}".format(PRIORITIES))
+        future = concurrent.futures.Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The scheduler is shut down")
+            self._queues[priority].append(
+                (time.monotonic(), future, function, args, kwargs))
+            self._condition.notify_all()
+        return(future)
+
+    def _take(self, reserved):
+        """Returns the `(priority, job)` pair of the job to run next by a
+        worker, or None if it has none to run. Must be called with the
+        condition held."""
+        now = time.monotonic()
+        best = None
+        for rank, priority in enumerate(PRIORITIES):
+            queue = self._queues[priority]
+            if not queue or (reserved and priority == PRIORITIES[-1]):
+                continue
+            effective = rank
+            if self.aging:
+                effective -= (now - queue[0][0]) / self.aging
+            if best is None or effective < best[0]:
+                best = (effective, priority)
+        if best is None:
+            return(None)
+        job = self._queues[best[1]].popleft()
+        self._waits[best[1]].add(now - job[0])
+        return((best[1], job))
+
+    def _work(self, reserved):
+        """Loop of a worker thread."""
+        while True:
+            with self._condition:
+                taken = self._take(reserved)
+                while taken is None:
+                    if self._closed:
+                        return
+                    self._condition.wait()
+                    taken = self._take(reserved)
+            _, (_, future, function, args, kwargs) = taken
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def queued(self):
+        """Returns the number of jobs waiting in each class."""
+        with self._condition:
+            return({priority: len(queue)
+                    for priority, queue in self._queues.items()})
+
+    def wait_stats(self):
+        """Returns the queue wait times of the jobs started in each class, in
+        seconds: dictionnaries with the number of jobs (`jobs`), the mean,
+        the 95th percentile (`p95`, on the recent jobs) and the maximal
+        wait, the number of jobs waiting (`queued`) and the wait of the
+        oldest of them (`oldest`)."""
+        with self._condition:
+            now = time.monotonic()
+            stats = {}
+            for priority in PRIORITIES:
+                queue = self._queues[priority]
+                stats[priority] = self._waits[priority].as_dict()
+                stats[priority]['queued'] = len(queue)
+                stats[priority]['oldest'] = now - queue[0][0] if queue else 0.0
+            return(stats)
+
+    def shutdown(self, wait=True, cancel=False):
+        """Stops the workers once the queued jobs are run (or cancelled if
+        `cancel` is True). If `wait` is True, returns when they are
+        stopped."""
+        with self._condition:
+            self._closed = True
+            if cancel:
+                for queue in self._queues.values():
+                    while queue:
+                        queue.popleft()[1].cancel()
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the helpers shared by the modules reading or writing
+the lengths and coordinates of svg files: `parse_length` reads a length
+given with a CSS unit (font size, coordinate, size of the root element...)
+and `format_number` writes a coordinate with as few characters as possible,
+which keeps the path data of the outlined texts small (see modules
+`text_outlines` and `text_fit`).
+
+Example
+-------
+
+>>> race_bib_creator.svg_units.parse_length('12pt')
+16.0
+>>> race_bib_creator.svg_units.format_number(3.14159)
+'3.14'
+
+Functions definitions
+---------------------
+"""
+import re
+
+#: Lengths of the supported units, in px.
+UNITS = {'': 1.0, 'px': 1.0, 'pt': 4.0 / 3.0, 'pc': 16.0, 'mm': 96 / 25.4,
+         'cm': 96 / 2.54, 'in': 96.0}
+
+_LENGTH = re.compile(r'^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*'
+                     r'([a-z]*)\s*$')
+
+
+def parse_length(text):
+    """Returns a length (font size, coordinate...) in px. Raises a
+    ValueError if its unit is not one of `UNITS`."""
+    match = _LENGTH.match(text)
+    if match is None or match.group(2) not in UNITS:
+        raise ValueError("Unsupported length {!r}".format(text))
+    return(float(match.group(1)) * UNITS[match.group(2)])
+
+
+def format_number(value):
+    """Returns the shortest text of a coordinate, rounded to 1/100 of a
+    unit."""
+    value = round(value, 2)
+    if value == int(value):
+        return(str(int(value)))
+    return(repr(value))
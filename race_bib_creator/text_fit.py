@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the `TextFit` class, used to fit the texts of a field
+(long names...) in a box of the bibs (`text_fits` parameter of
+`BibTemplate`), instead of fixing the overflowing bibs by hand after
+proofing.
+
+A text which is wider than the box is narrowed, either by reducing its font
+size (`mode='size'`) or by tightening its letter spacing (`mode='spacing'`),
+down to a limit (`min_scale`, `min_spacing`) beyond which it is left
+overflowing. The texts that fit are left unchanged.
+
+The texts are not measured by a renderer but with the advance widths and the
+kerning of the font file of the field, read with fontTools and cached per
+font and per glyph (see `text_outlines.OutlineFont`). The factory prepares
+the texts of a whole column at once (see `BibTemplate.prepare`): their widths
+are computed in one vectorised pass with NumPy (see `OutlineFont.widths`),
+so that fitting thousands of names only takes a few milliseconds.
+
+The marker of a fitted field must be the whole text of its text elements,
+which are drawn on a single line. The width of the box is given in the user
+units of the text element (those of its `x` and `font-size`), and is
+centered on the text, starts or ends at it according to its `text-anchor`.
+The font size or the letter spacing of a narrowed text is set on a `<tspan>`
+element holding the text. If the field is also outlined (see module
+`text_outlines`), the path of the text is scaled or spaced instead.
+
+Example
+-------
+
+>>> template = race_bib_creator.BibTemplate(
+...     'bib_template_example.svg', {'Number': 'DNB',
+...                                  'Lastname': 'last_name'},
+...     text_fits={'Lastname': race_bib_creator.TextFit(
+...         180, 'fonts/Lato-Regular.ttf', mode='size', min_scale=0.6)})
+>>> factory.make_bib_files(template, 'race_1')
+
+Class definitions
+-----------------
+"""
+import math
+
+from .compiled_template import escape
+from .svg_units import format_number
+
+#: Ways of narrowing the texts.
+FIT_MODES = ('size', 'spacing')
+
+
+class TextFit():
+    """Fitting of the texts of a field in a box.
+
+    :Attributes:
+
+        **width**: float
+            Width of the box, in the user units of the text elements.
+        **font**: str
+            Path of the font file of the texts (TrueType or OpenType). It
+            may be None for an outlined field: its outline font is used.
+        **mode**: str
+            'size' (the font size is reduced) or 'spacing' (the letter
+            spacing is reduced).
+        **min_scale**: float
+            Smallest ratio of the font size to the size of the template
+            (mode 'size').
+        **min_spacing**: float
+            Smallest letter spacing, in em (negative, mode 'spacing').
+
+    """
+    def __init__(self, width, font=None, mode='size', min_scale=0.5,
+                 min_spacing=-0.1):
+        """
+        :Parameters:
+
+            *width*: float
+                See the attributes.
+            *font*: str, optional
+                See the attributes.
+            *mode*: str, optional
+                See the attributes.
+            *min_scale*: float, optional
+                See the attributes.
+            *min_spacing*: float, optional
+                See the attributes.
+
+        """
+        assert width > 0, "width must be positive"
+        assert mode in FIT_MODES, "mode must be one of {}".format(FIT_MODES)
+        assert 0 < min_scale <= 1, "min_scale must be in ]0, 1]"
+        assert min_spacing <= 0, "min_spacing must be negative or 0"
+        self.width = width
+        self.font = font
+        self.mode = mode
+        self.min_scale = min_scale
+        self.min_spacing = min_spacing
+
+    def __repr__(self):
+        return('TextFit({!r}, {!r}, mode={!r}, min_scale={!r}, '
+               'min_spacing={!r})'.format(self.width, self.font, self.mode,
+                                          self.min_scale, self.min_spacing))
+
+    def adjust(self, font, texts, box):
+        """Returns the scales of the font size and the letter spacings (in
+        font units) fitting a column of texts in a box, as two lists. The
+        texts that fit are given a scale of 1 and a spacing of 0.
+
+        :Parameters:
+
+            *font*: OutlineFont
+                Font of the texts.
+            *texts*: list of str
+                Texts.
+            *box*: float
+                Width of the box, in font units.
+
+        """
+        import numpy as np
+        widths = font.widths(texts)
+        count = len(texts)
+        if self.mode == 'size':
+            scales = np.ones(count)
+            over = widths > box
+            scales[over] = np.maximum(box / widths[over], self.min_scale)
+            return(scales.tolist(), [0] * count)
+        gaps = np.fromiter((len(text) - 1 for text in texts), dtype=float,
+                           count=count)
+        spacings = np.zeros(count)
+        over = (widths > box) & (gaps > 0)
+        spacings[over] = np.maximum((box - widths[over]) / gaps[over],
+                                    self.min_spacing * font.units_per_em)
+        return([1.0] * count, spacings.tolist())
+
+
+class FittedText():
+    """Text of a fitted field in a text element: function returning the
+    escaped text of a value, held by a `<tspan>` narrowing it if it does not
+    fit in its box (see `CompiledTemplate`, `formatters`).
+
+    :Attributes:
+
+        **fit**: TextFit
+            Fitting of the texts.
+        **font**: OutlineFont
+            Font measuring the texts.
+        **font_size**: float
+            Font size of the text element, in user units.
+
+    """
+    def __init__(self, fit, font, font_size):
+        self.fit = fit
+        self.font = font
+        self.font_size = font_size
+
+    def _key(self):
+        return((repr(self.fit), self.font.path, self.font_size))
+
+    def __eq__(self, other):
+        return(isinstance(other, FittedText) and self._key() == other._key())
+
+    def __hash__(self):
+        return(hash(self._key()))
+
+    def __call__(self, text):
+        return(self.column([text])[0])
+
+    def column(self, texts):
+        """Returns the texts of a column of values, as a list. The texts are
+        measured in one pass (see `TextFit.adjust`)."""
+        units = self.font_size / self.font.units_per_em
+        scales, spacings = self.fit.adjust(self.font, texts,
+                                           self.fit.width / units)
+        formatted = []
+        for text, scale, spacing in zip(texts, scales, spacings):
+            text = escape(text, 'text')
+            # rounded down, so that the rounding does not widen the text
+            if scale != 1:
+                size = math.floor(self.font_size * scale * 100) / 100
+                text = '<tspan style="font-size:{}px">{}</tspan>'.format(
+                    format_number(size), text)
+            elif spacing:
+                letter_spacing = math.floor(spacing * units * 100) / 100
+                text = '<tspan style="letter-spacing:{}px">{}</tspan>'.format(
+                    format_number(letter_spacing), text)
+            formatted.append(text)
+        return(formatted)
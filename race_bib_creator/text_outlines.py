@@ -0,0 +1,606 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains the outline mode of `BibTemplate` (`outline_fonts`
+parameter): the texts of some fields (number, names...) are drawn in the
+bibs as paths, made of the outlines of the glyphs of a font file, rather
+than as `<text>` elements.
+
+The bibs are then self-contained: they look the same whatever the fonts
+installed on the computers converting or printing them, and a print shop
+receiving pdf or svg files does not need the fonts of the race.
+
+The font files (TrueType or OpenType) are read with fontTools, once per
+process (see `get_font`). The outline of each glyph is drawn once, the first
+time a text uses it, and kept as relative SVG path data, so that the path of
+a text is assembled by joining the outlines of its glyphs: only the move to
+the first point of each glyph is computed for each bib. The glyphs are placed
+with the advance widths and the kerning of the font (`GPOS` pair adjustments
+of the `kern` feature, or the legacy `kern` table). Ligatures and other
+substitutions are not applied.
+
+When the template is compiled (see `outline_texts`), each `<text>` element
+holding the marker of an outlined field is replaced by a `<path>` element
+with the same position (`x`, `y`, `text-anchor`), size (`font-size`),
+transform and style (its paint attributes, `fill`, `stroke`..., included).
+The marker is moved to the path data of the element and replaced, for each
+bib, by the path of the text (see `TextOutline`). A text element may hold
+other text around the marker ("N° DNB") but not the markers of other fields,
+and is drawn on a single line. The texts of the fields fitted in a box (see
+module `text_fit`) are laid out by the same pass.
+
+Example
+-------
+
+>>> template = race_bib_creator.BibTemplate(
+...     'bib_template_example.svg', {'Number': 'DNB',
+...                                  'Firstname': 'first_name'},
+...     outline_fonts={'Number': 'fonts/Lato-Black.ttf',
+...                    'Firstname': 'fonts/Lato-Regular.ttf'})
+>>> factory.make_bib_files(template, 'race_1')
+
+Class and functions definitions
+-------------------------------
+"""
+import math
+import os
+import re
+import threading
+from xml.parsers import expat
+
+from .compiled_template import escape
+from .svg_units import format_number, parse_length
+
+#: Fonts read by the process, keyed by absolute paths.
+_FONTS = {}
+_FONTS_LOCK = threading.Lock()
+
+_NUMBER = re.compile(r'-?[\d.]+')
+
+#: Presentation attributes of the text elements kept on their paths (in the
+#: style of the path).
+PAINT_ATTRIBUTES = ('fill', 'fill-opacity', 'fill-rule', 'stroke',
+                    'stroke-width', 'stroke-opacity', 'stroke-linecap',
+                    'stroke-linejoin', 'stroke-dasharray', 'opacity')
+
+
+def get_font(path):
+    """Returns the `OutlineFont` of a font file, read once per process."""
+    key = os.path.abspath(path)
+    with _FONTS_LOCK:
+        font = _FONTS.get(key)
+        if font is None:
+            font = _FONTS[key] = OutlineFont(key)
+    return(font)
+
+
+_pen_class = None
+
+
+def _get_pen_class():
+    """Returns the pen drawing glyphs as relative path data. fontTools is
+    imported on first use only."""
+    global _pen_class
+    if _pen_class is None:
+        from fontTools.pens.basePen import BasePen
+
+        class RelativePen(BasePen):
+            """Pen drawing a glyph as SVG path data with relative commands.
+            The first move is not written: it is made by
+            `OutlineFont.path_data`, from the end of the previous glyph."""
+            def __init__(self, glyph_set):
+                BasePen.__init__(self, glyph_set)
+                self.commands = []
+                self.first = None
+                self.point = (0, 0)
+                self.start = (0, 0)
+
+            def _relative(self, *points):
+                coordinates = []
+                x, y = self.point
+                for point in points:
+                    coordinates.append('{} {}'.format(
+                        format_number(point[0] - x),
+                        format_number(point[1] - y)))
+                self.point = points[-1]
+                return(' '.join(coordinates))
+
+            def _moveTo(self, point):
+                if self.first is None:
+                    self.first = point
+                    self.point = point
+                else:
+                    self.commands.append('m' + self._relative(point))
+                self.start = point
+
+            def _lineTo(self, point):
+                self.commands.append('l' + self._relative(point))
+
+            def _qCurveToOne(self, point_1, point_2):
+                self.commands.append('q' + self._relative(point_1, point_2))
+
+            def _curveToOne(self, point_1, point_2, point_3):
+                self.commands.append('c' + self._relative(point_1, point_2,
+                                                          point_3))
+
+            def _closePath(self):
+                self.commands.append('z')
+                self.point = self.start
+
+            def _endPath(self):
+                pass
+
+        _pen_class = RelativePen
+    return(_pen_class)
+
+
+class OutlineFont():
+    """Font file which glyphs are drawn as SVG path data, in font units (y
+    axis upwards).
+
+    The outlines, advance widths and kerning values are cached as they are
+    used. Use `get_font` rather than this class to share the fonts between
+    the templates.
+
+    :Attributes:
+
+        **path**: str
+            Path of the font file.
+        **units_per_em**: int
+            Number of font units per em (font size).
+
+    """
+    def __init__(self, path):
+        try:
+            from fontTools.ttLib import TTFont
+        except ImportError:
+            raise ImportError("The fontTools package is needed to draw the "
+                              "texts of the bibs as paths")
+        self.path = path
+        self._font = TTFont(path, lazy=True)
+        self.units_per_em = self._font['head'].unitsPerEm
+        self._cmap = self._font.getBestCmap() or {}
+        self._glyph_set = self._font.getGlyphSet()
+        self._metrics = self._font['hmtx'].metrics
+        self._outlines = {}
+        self._scaled_outlines = {}
+        self._kerning = {}
+        self._pairs, self._classes = self._kerning_tables()
+        self._lock = threading.Lock()
+
+    def _kerning_tables(self):
+        """Returns the kerning pairs of the font, as a dictionnary of
+        dictionnaries (`{left: {right: value}}`), and its class-based
+        kerning subtables, as `(coverage, left classes, right classes,
+        values)` tuples."""
+        pairs = {}
+        classes = []
+        font = self._font
+        if 'GPOS' in font:
+            table = font['GPOS'].table
+            indices = []
+            for record in (table.FeatureList.FeatureRecord
+                           if table.FeatureList else []):
+                if record.FeatureTag == 'kern':
+                    indices.extend(index for index in
+                                   record.Feature.LookupListIndex
+                                   if index not in indices)
+            for index in indices:
+                lookup = table.LookupList.Lookup[index]
+                for subtable in lookup.SubTable:
+                    if lookup.LookupType == 9:
+                        if subtable.ExtensionLookupType != 2:
+                            continue
+                        subtable = subtable.ExtSubTable
+                    elif lookup.LookupType != 2:
+                        continue
+                    if subtable.Format == 1:
+                        for left, pair_set in zip(subtable.Coverage.glyphs,
+                                                  subtable.PairSet):
+                            rights = pairs.setdefault(left, {})
+                            for record in pair_set.PairValueRecord:
+                                value = getattr(record.Value1, 'XAdvance',
+                                                0) or 0
+                                rights.setdefault(record.SecondGlyph, value)
+                    elif subtable.Format == 2:
+                        values = [[getattr(record.Value1, 'XAdvance', 0) or 0
+                                   for record in row.Class2Record]
+                                  for row in subtable.Class1Record]
+                        classes.append((frozenset(subtable.Coverage.glyphs),
+                                        subtable.ClassDef1.classDefs,
+                                        subtable.ClassDef2.classDefs,
+                                        values))
+        elif 'kern' in font:
+            for table in font['kern'].kernTables:
+                for (left, right), value in table.kernTable.items():
+                    pairs.setdefault(left, {}).setdefault(right, value)
+        return(pairs, classes)
+
+    def glyph(self, character):
+        """Returns the name of the glyph of a character ('.notdef' if the
+        font has none)."""
+        return(self._cmap.get(ord(character), '.notdef'))
+
+    def advance(self, glyph):
+        """Returns the advance width of a glyph, in font units."""
+        return(self._metrics[glyph][0])
+
+    def kerning(self, left, right):
+        """Returns the kerning of a pair of glyphs, in font units."""
+        key = (left, right)
+        try:
+            return(self._kerning[key])
+        except KeyError:
+            pass
+        value = self._pairs.get(left, {}).get(right)
+        if value is None:
+            value = 0
+            for coverage, left_classes, right_classes, values in self._classes:
+                if left in coverage:
+                    value = values[left_classes.get(left, 0)][
+                        right_classes.get(right, 0)]
+                    break
+        self._kerning[key] = value
+        return(value)
+
+    def outline(self, glyph):
+        """Returns the outline of a glyph: its first point (None for an
+        empty glyph), the rest of its path data, relative to this point, and
+        its last point (current point at the end of the path data)."""
+        try:
+            return(self._outlines[glyph])
+        except KeyError:
+            pass
+        with self._lock:
+            # glyphs are decompiled on first access, once at a time
+            pen = _get_pen_class()(self._glyph_set)
+            self._glyph_set[glyph].draw(pen)
+        outline = (pen.first, ''.join(pen.commands), pen.point)
+        self._outlines[glyph] = outline
+        return(outline)
+
+    def _scaled(self, glyph, commands, scale):
+        """Returns the path data of a glyph scaled by a factor, cached per
+        glyph and factor."""
+        key = (glyph, scale)
+        try:
+            return(self._scaled_outlines[key])
+        except KeyError:
+            pass
+        scaled = _NUMBER.sub(
+            lambda match: format_number(float(match.group()) * scale),
+            commands)
+        self._scaled_outlines[key] = scaled
+        return(scaled)
+
+    def layout(self, text, spacing=0):
+        """Returns the glyphs of a text with their horizontal positions, and
+        the advance width of the text, in font units. `spacing` is added
+        between the glyphs (letter spacing, in font units)."""
+        glyphs = [self.glyph(character) for character in text]
+        positions = []
+        x = 0
+        previous = None
+        for glyph in glyphs:
+            if previous is not None:
+                x += self.kerning(previous, glyph) + spacing
+            positions.append(x)
+            x += self.advance(glyph)
+            previous = glyph
+        return(glyphs, positions, x)
+
+    def widths(self, texts):
+        """Returns the advance widths of a column of texts, kerning
+        included, in font units, as a NumPy array. The widths are computed
+        in one pass over the characters of all the texts: each distinct
+        character and each distinct pair of characters is looked up once."""
+        import numpy as np
+        count = len(texts)
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64,
+                              count=count)
+        codes = np.frombuffer(''.join(texts).encode('utf-32-le'),
+                              dtype='<u4')
+        if not len(codes):
+            return(np.zeros(count))
+        characters, indices = np.unique(codes, return_inverse=True)
+        indices = indices.reshape(-1)
+        glyphs = [self.glyph(chr(code)) for code in characters.tolist()]
+        advances = np.array([self.advance(glyph) for glyph in glyphs],
+                            dtype=float)
+        owners = np.repeat(np.arange(count), lengths)
+        widths = np.bincount(owners, advances[indices], minlength=count)
+        # pairs of consecutive characters of a same text
+        inside = owners[:-1] == owners[1:]
+        pairs = (indices[:-1][inside] * len(characters) +
+                 indices[1:][inside])
+        if len(pairs):
+            distinct, pair_indices = np.unique(pairs, return_inverse=True)
+            kernings = np.array([self.kerning(glyphs[pair // len(glyphs)],
+                                              glyphs[pair % len(glyphs)])
+                                 for pair in distinct.tolist()], dtype=float)
+            widths += np.bincount(owners[:-1][inside],
+                                  kernings[pair_indices.reshape(-1)],
+                                  minlength=count)
+        return(widths)
+
+    def path_data(self, text, anchor='start', scale=1.0, spacing=0):
+        """Returns the SVG path data of a text, in font units, y axis
+        upwards. The text starts at the origin, is centered on it or ends
+        on it if `anchor` is 'start', 'middle' or 'end' (as `text-anchor`
+        in svg). The text is scaled by `scale` around the origin (the
+        scaled outlines are cached per factor), and `spacing` is added
+        between its glyphs (see `layout`)."""
+        glyphs, positions, width = self.layout(text, spacing)
+        origin = {'start': 0, 'middle': -width / 2, 'end': -width}[anchor]
+        parts = []
+        current = (0, 0)
+        for glyph, position in zip(glyphs, positions):
+            first, commands, last = self.outline(glyph)
+            if first is None:
+                continue
+            x = origin + position
+            parts.append('m{} {}'.format(
+                format_number((x + first[0]) * scale - current[0]),
+                format_number(first[1] * scale - current[1])))
+            if scale != 1:
+                commands = self._scaled(glyph, commands, scale)
+            parts.append(commands)
+            current = ((x + last[0]) * scale, last[1] * scale)
+        return(''.join(parts))
+
+
+class TextOutline():
+    """Text of an outlined field in a template: function returning the path
+    data of the text of a value (see `CompiledTemplate`, `formatters`).
+
+    :Attributes:
+
+        **font**: OutlineFont
+            Font of the text.
+        **prefix**, **suffix**: str
+            Text of the element before and after the marker of the field.
+        **anchor**: str
+            Text anchor of the element: 'start', 'middle' or 'end'.
+        **fit**: TextFit
+            Fitting of the texts in a box (None: not fitted, see module
+            `text_fit`).
+        **box**: float
+            Width of the box, in font units.
+
+    """
+    def __init__(self, font, prefix='', suffix='', anchor='start', fit=None,
+                 box=None):
+        self.font = font
+        self.prefix = prefix
+        self.suffix = suffix
+        self.anchor = anchor
+        self.fit = fit
+        self.box = box
+
+    def _key(self):
+        return((self.font.path, self.prefix, self.suffix, self.anchor,
+                repr(self.fit), self.box))
+
+    def __eq__(self, other):
+        return(isinstance(other, TextOutline) and
+               self._key() == other._key())
+
+    def __hash__(self):
+        return(hash(self._key()))
+
+    def __call__(self, text):
+        return(self.column([text])[0])
+
+    def column(self, texts):
+        """Returns the path data of a column of texts, as a list. Fitted
+        texts are measured in one pass (see `TextFit.adjust`)."""
+        texts = [self.prefix + text + self.suffix for text in texts]
+        if self.fit is None:
+            return([self.font.path_data(text, self.anchor) for text in texts])
+        scales, spacings = self.fit.adjust(self.font, texts, self.box)
+        # scales rounded down to 1/100, so that the scaled outlines of the
+        # glyphs are reused (see `OutlineFont.path_data`)
+        return([self.font.path_data(text, self.anchor,
+                                    math.floor(scale * 100) / 100, spacing)
+                for text, scale, spacing in zip(texts, scales, spacings)])
+
+
+def _text_elements(data):
+    """Returns the text elements of a xml document (bytes), in document
+    order: dictionnaries with the byte offsets of the element (`start`,
+    `end`), its attributes and those of its descendants, in document order
+    (`attributes`), and its text (`text`)."""
+    parser = expat.ParserCreate('utf-8')
+    elements = []
+    current = []
+
+    def start_element(name, attributes):
+        if current:
+            current[0]['attributes'].append(attributes)
+            current[0]['depth'] += 1
+        elif name.rpartition(':')[2] == 'text':
+            current.append({'start': parser.CurrentByteIndex, 'depth': 0,
+                            'attributes': [attributes], 'text': []})
+
+    def end_element(name):
+        if not current:
+            return
+        element = current[0]
+        if element['depth']:
+            element['depth'] -= 1
+            return
+        position = parser.CurrentByteIndex
+        if data[position - 2:position] == b'/>':
+            element['end'] = position
+        else:
+            element['end'] = data.index(b'>', position) + 1
+        element['text'] = ''.join(element['text'])
+        elements.append(current.pop())
+
+    def character_data(text):
+        if current:
+            current[0]['text'].append(text)
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+    parser.Parse(data, True)
+    return(elements)
+
+
+def _style(attributes, name):
+    """Returns the value of a presentation property of an element, given in
+    its style or as an attribute (None if it is not given)."""
+    for declaration in attributes.get('style', '').split(';'):
+        key, _, value = declaration.partition(':')
+        if key.strip() == name:
+            return(value.strip())
+    return(attributes.get(name))
+
+
+def _property(attributes_list, name, default=None):
+    """Returns the value of a property on the innermost element giving it
+    (inheritance of the properties within a text element)."""
+    value = default
+    for attributes in attributes_list:
+        given = _style(attributes, name)
+        if given is not None:
+            value = given
+    return(value)
+
+
+def _coordinate(attributes_list, name):
+    """Returns the first coordinate given by the elements (first value of a
+    list of coordinates), 0 if none gives it."""
+    for attributes in reversed(attributes_list):
+        if attributes.get(name, '').strip():
+            return(parse_length(attributes[name].replace(',', ' ').split()[0]))
+    return(0.0)
+
+
+def outline_texts(content, markers, fonts, fits=None):
+    """Replaces the text elements of a svg content holding the markers of
+    outlined fields by path elements (see the module documentation), and
+    gives the formatters of the outlined and fitted fields (see module
+    `text_fit`).
+
+    :Parameters:
+
+        *content*: str
+            Content of the base file.
+        *markers*: dict
+            Fields names and their markers.
+        *fonts*: dict
+            Paths of the font files of the outlined fields, keyed by fields
+            names.
+        *fits*: dict, optional
+            `TextFit` objects of the fitted fields, keyed by fields names.
+
+    :Returns:
+
+        *content*: str
+            Content with the path elements, holding the markers of the
+            outlined fields in their path data.
+        *formatters*: dict
+            `TextOutline` of each outlined field and `FittedText` of each
+            fitted field (not outlined) which marker was found.
+
+    Raises a ValueError if the marker of an outlined or fitted field is not
+    held by a text element, if a text element holds the markers of several
+    fields, if the texts of a field do not have the same layout or if the
+    marker of a fitted field is not the whole text of its element.
+
+    """
+    from xml.sax.saxutils import unescape
+    from .text_fit import FittedText
+    data = content.encode('utf-8')
+    fits = fits or {}
+    markers = {field: marker for field, marker in markers.items() if marker}
+    handled = {field: marker for field, marker in markers.items()
+               if field in fonts or field in fits}
+    formatters = {}
+    counts = {}
+    parts = []
+    position = 0
+    for element in _text_elements(data):
+        start, end = element['start'], element['end']
+        held = [field for field, marker in markers.items()
+                if marker.encode('utf-8') in data[start:end]]
+        if not any(field in handled for field in held):
+            continue
+        if len(held) > 1:
+            raise ValueError("An outlined or fitted text element holds the "
+                             "markers of several fields: {}".format(
+                                 ', '.join(held)))
+        field = held[0]
+        marker = handled[field]
+        attributes = element['attributes']
+        text = element['text']
+        if _property(attributes, 'xml:space') != 'preserve':
+            text = ' '.join(text.split())
+        if unescape(marker) not in text:
+            raise ValueError("The marker {!r} is not in the text of its "
+                             "element".format(marker))
+        prefix, _, suffix = text.partition(unescape(marker))
+        fit = fits.get(field)
+        if fit is not None and (prefix or suffix):
+            raise ValueError("The marker {!r} of the fitted field {} is not "
+                             "the whole text of its element".format(marker,
+                                                                    field))
+        anchor = _property(attributes, 'text-anchor', 'start')
+        if anchor not in ('start', 'middle', 'end'):
+            anchor = 'start'
+        size = parse_length(_property(attributes, 'font-size', '16'))
+        if field in fonts:
+            font = get_font(fonts[field])
+            scale = size / font.units_per_em
+            formatter = TextOutline(font, prefix, suffix, anchor, fit,
+                                    None if fit is None else fit.width / scale)
+        elif fit.font is None:
+            raise ValueError("The font of the fitted field {} is not "
+                             "given".format(field))
+        else:
+            formatter = FittedText(fit, get_font(fit.font), size)
+        if formatters.setdefault(field, formatter) != formatter:
+            raise ValueError("The texts of the field {} do not have the same "
+                             "layout".format(field))
+        counts[field] = counts.get(field, 0) + 1
+        if field not in fonts:
+            # fitted text element, kept as is
+            continue
+        transform = '{}translate({},{}) scale({},{})'.format(
+            attributes[0]['transform'] + ' ' if 'transform' in attributes[0]
+            else '', format_number(_coordinate(attributes, 'x')),
+            format_number(_coordinate(attributes, 'y')), repr(scale),
+            repr(-scale))
+        # presentation attributes first, as the style overrides them
+        style = ';'.join(
+            declaration for attributes in attributes for declaration in
+            ['{}:{}'.format(name, attributes[name].strip())
+             for name in PAINT_ATTRIBUTES if name in attributes] +
+            [attributes.get('style', '').strip().rstrip(';')]
+            if declaration)
+        path = ['<path d="{}" transform="{}"'.format(marker, transform)]
+        for name, value in (('id', attributes[0].get('id')),
+                            ('class', attributes[0].get('class')),
+                            ('style', style)):
+            if value:
+                path.append(' {}="{}"'.format(name, escape(value,
+                                                           'attribute')))
+        path.append(' />')
+        parts.append(data[position:start].decode('utf-8'))
+        parts.append(''.join(path))
+        position = end
+    parts.append(data[position:].decode('utf-8'))
+    outlined = ''.join(parts)
+    for field, marker in handled.items():
+        if field in fonts:
+            outside = marker in outlined.replace(
+                '<path d="{}"'.format(marker), '')
+        else:
+            outside = content.count(marker) != counts.get(field, 0)
+        if outside:
+            raise ValueError("The marker {!r} of the field {} is not held by "
+                             "a text element".format(marker, field))
+    return(outlined, formatters)
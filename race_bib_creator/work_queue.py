@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 2026
+
+This module contains a coordinator/worker mode of bib creation with dynamic
+load balancing between nodes (or processes) of unequal speed.
+
+The coordinator splits the participants in chunks of bib numbers and publishes
+them in a `DirectoryWorkQueue`, a directory shared by all the nodes (network
+share...). Workers claim chunks, create their bibs with
+`BibFactory.make_bib_files` and acknowledge them. A claimed chunk is leased
+to its worker: the lease is renewed by a timer thread of the worker, and a
+chunk which lease expired (crashed or stalled worker) is published again by
+the coordinator. A worker which lost its lease stops working on the chunk and
+does not acknowledge it.
+
+The queue only relies on atomic file renames within the shared directory:
+
+    - `pending/<chunk>.json`: chunks waiting for a worker,
+    - `leased/<chunk>.json--<worker>`: chunks being processed (the
+      modification time of the file is the time of the last lease renewal),
+    - `done/<chunk>.json`: acknowledged chunks,
+    - `failed/<chunk>.json`: chunks which were claimed `max_attempts` times
+      without being done (their bibs raise, or the workers processing them
+      crash or stall), with their last error. They are not processed any
+      more, so that a poison chunk cannot keep the coordinator waiting
+      forever.
+
+Each chunk produces its own manifest and conversion script
+(`manifest.<chunk>.json`, `make_pngs.<chunk>.bat`) in the output repository
+which are merged by the coordinator when all chunks are done. The journal and
+the conversion cache of a chunk (`resume`, `conversion_cache`) are its own as
+well (`bibs.<chunk>.journal`, `conversions.<chunk>.json`), so that the
+workers sharing the output repository do not overwrite each other's.
+
+Example
+-------
+
+On the coordinator:
+
+>>> queue = race_bib_creator.DirectoryWorkQueue('/shared/queue')
+>>> coordinator = race_bib_creator.Coordinator(factory, queue, chunk_size=50)
+>>> coordinator.publish()
+>>> coordinator.wait('/shared/race_1')
+
+On each worker (with the same output path):
+
+>>> race_bib_creator.run_worker(factory, template, queue, '/shared/race_1')
+
+Class definitions
+-----------------
+"""
+import json
+import os
+import socket
+import threading
+import time
+import warnings
+
+from .manifest import merge_manifests, part_name
+
+_LEASE_SEPARATOR = '--'
+_STATES = ('pending', 'leased', 'done', 'failed')
+
+
+class Lease():
+    """Chunk claimed by a worker.
+
+    :Attributes:
+
+        **chunk**: str
+            Name of the chunk (`chunk-<index>`).
+        **numbers**: list
+            Bib numbers of the chunk.
+        **path**: str
+            Path of the lease file.
+        **attempts**: int
+            Number of times the chunk was claimed, this claim included.
+
+    """
+    def __init__(self, chunk, numbers, path, attempts=1):
+        self.chunk = chunk
+        self.numbers = numbers
+        self.path = path
+        self.attempts = attempts
+
+
+class DirectoryWorkQueue():
+    """Work queue stored in a (shared) directory.
+
+    :Attributes:
+
+        **path**: str
+            Root directory of the queue.
+        **lease_timeout**: float
+            Number of seconds after which a lease that was not renewed is
+            considered expired.
+        **max_attempts**: int
+            Number of times a chunk is claimed before it is moved to the
+            failed chunks, if it keeps failing or its lease keeps expiring.
+
+    """
+    def __init__(self, path, lease_timeout=300.0, max_attempts=3):
+        assert max_attempts > 0, "max_attempts must be a positive integer"
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        for state in _STATES:
+            os.makedirs(os.path.join(path, state), exist_ok=True)
+
+    def _dir(self, state):
+        return(os.path.join(self.path, state))
+
+    def publish(self, chunks):
+        """Publishes chunks of bib numbers and returns their names.
+
+        :Parameters:
+
+            *chunks*: list of lists
+                Bib numbers of each chunk.
+
+        """
+        names = []
+        for index, numbers in enumerate(chunks):
+            name = 'chunk-{:05d}'.format(index)
+            numbers = [number.item() if hasattr(number, 'item') else number
+                       for number in numbers]
+            temporary = os.path.join(self.path, name + '.tmp')
+            with open(temporary, 'w') as chunk:
+                json.dump({'numbers': numbers}, chunk)
+            # the chunk only becomes visible to workers once complete
+            os.replace(temporary, os.path.join(self._dir('pending'),
+                                               name + '.json'))
+            names.append(name)
+        return(names)
+
+    def claim(self, worker_id):
+        """Claims a pending chunk for a worker. Returns a `Lease` or None if
+        no chunk is pending."""
+        for name in sorted(os.listdir(self._dir('pending'))):
+            if not name.endswith('.json'):
+                continue
+            lease_path = os.path.join(self._dir('leased'),
+                                      name + _LEASE_SEPARATOR + worker_id)
+            try:
+                os.rename(os.path.join(self._dir('pending'), name),
+                          lease_path)
+            except OSError:
+                # claimed by another worker in the meantime
+                continue
+            with open(lease_path) as chunk:
+                content = json.load(chunk)
+            content['attempts'] = content.get('attempts', 0) + 1
+            # rewritten in place, which also renews the lease
+            with open(lease_path, 'w') as chunk:
+                json.dump(content, chunk)
+            return(Lease(name[:-len('.json')], content['numbers'], lease_path,
+                         content['attempts']))
+        return(None)
+
+    def _release(self, path, name, error=None):
+        """Moves a leased chunk back to the pending chunks, or to the failed
+        chunks once it was claimed `max_attempts` times. Returns its new
+        state, or None if the lease file was moved in the meantime."""
+        try:
+            with open(path) as chunk:
+                content = json.load(chunk)
+            if error is not None:
+                content['error'] = error
+                with open(path, 'w') as chunk:
+                    json.dump(content, chunk)
+            state = 'pending'
+            if content.get('attempts', 0) >= self.max_attempts:
+                state = 'failed'
+            os.rename(path, os.path.join(self._dir(state), name))
+        except (OSError, ValueError):
+            # moved, or being rewritten by its worker, in the meantime
+            return(None)
+        return(state)
+
+    def renew(self, lease):
+        """Renews a lease. Returns False if the lease was lost (expired and
+        published again)."""
+        try:
+            os.utime(lease.path)
+        except OSError:
+            return(False)
+        return(True)
+
+    def ack(self, lease):
+        """Marks the chunk of a lease as done. Returns False if the lease was
+        lost, in which case the chunk will be processed again (bib creation
+        being idempotent, this is harmless)."""
+        try:
+            os.replace(lease.path, os.path.join(self._dir('done'),
+                                                lease.chunk + '.json'))
+        except OSError:
+            return(False)
+        return(True)
+
+    def fail(self, lease, error):
+        """Releases the chunk of a lease which bibs could not be created:
+        it is published again, or moved to the failed chunks once it was
+        claimed `max_attempts` times. Returns its new state ('pending' or
+        'failed'), or None if the lease was lost.
+
+        :Parameters:
+
+            *lease*: Lease
+                Lease of the chunk.
+            *error*: str
+                Description of the failure, kept in the chunk file.
+
+        """
+        return(self._release(lease.path, lease.chunk + '.json', error))
+
+    def requeue_expired(self):
+        """Publishes again the chunks which lease expired (or moves them to
+        the failed chunks, see `fail`) and returns their names."""
+        requeued = []
+        now = time.time()
+        for name in os.listdir(self._dir('leased')):
+            path = os.path.join(self._dir('leased'), name)
+            try:
+                expired = now - os.path.getmtime(path) > self.lease_timeout
+            except OSError:
+                # acknowledged in the meantime
+                continue
+            if expired:
+                chunk = name.split(_LEASE_SEPARATOR)[0]
+                if self._release(path, chunk, "lease expired") is not None:
+                    requeued.append(chunk[:-len('.json')])
+        return(requeued)
+
+    def counts(self):
+        """Returns the number of pending, leased, done and failed chunks."""
+        return({state: len([name for name in os.listdir(self._dir(state))
+                            if not name.endswith('.tmp')])
+                for state in _STATES})
+
+    def is_finished(self):
+        """Returns True when no chunk is pending or leased."""
+        counts = self.counts()
+        return(counts['pending'] == 0 and counts['leased'] == 0)
+
+    def done_chunks(self):
+        """Returns the sorted names of the acknowledged chunks."""
+        return(sorted(name[:-len('.json')]
+                      for name in os.listdir(self._dir('done'))))
+
+    def failed_chunks(self):
+        """Returns the failed chunks: a dictionnary which keys are their
+        names and values their last errors."""
+        failed = {}
+        for name in sorted(os.listdir(self._dir('failed'))):
+            with open(os.path.join(self._dir('failed'), name)) as chunk:
+                failed[name[:-len('.json')]] = json.load(chunk).get('error')
+        return(failed)
+
+
+class Coordinator():
+    """Publishes the participants of a factory in a work queue and waits for
+    the workers to process them.
+
+    :Attributes:
+
+        **factory**: BibFactory
+            Factory providing the participants.
+        **queue**: DirectoryWorkQueue
+            Queue shared with the workers.
+        **chunk_size**: int
+            Number of bibs per chunk.
+
+    """
+    def __init__(self, factory, queue, chunk_size=100):
+        self.factory = factory
+        self.queue = queue
+        self.chunk_size = chunk_size
+
+    def publish(self):
+        """Publishes the chunks of bib numbers, in the order of the table,
+        and returns their names."""
+        numbers = self.factory._get_numbers()
+        return(self.queue.publish([numbers[i:i + self.chunk_size]
+                                   for i in range(0, len(numbers),
+                                                  self.chunk_size)]))
+
+    def wait(self, output_rep=None, poll_interval=1.0,
+             manifest_name='manifest.json', script_name=None):
+        """Waits for all the chunks to be done or failed, publishing again
+        the chunks which lease expired, then merges the manifests and
+        conversion scripts of the done chunks (see
+        `manifest.merge_manifests`). A warning is given if chunks failed
+        (see `DirectoryWorkQueue.failed_chunks`).
+
+        :Returns:
+
+            *entries*: list of dict
+                Entries of the merged manifest, or None if `output_rep` is
+                None (no merge).
+
+        """
+        while not self.queue.is_finished():
+            self.queue.requeue_expired()
+            time.sleep(poll_interval)
+        failed = self.queue.failed_chunks()
+        if failed:
+            warnings.warn("{} chunks failed and were left out: {}".format(
+                              len(failed), ', '.join(
+                                  '{} ({})'.format(chunk, error)
+                                  for chunk, error in failed.items())))
+        if output_rep is None:
+            return(None)
+        parts = [part_name(manifest_name, '.' + chunk)
+                 for chunk in self.queue.done_chunks()]
+        return(merge_manifests(output_rep, parts, manifest_name=manifest_name,
+                               script_name=script_name))
+
+
+def _renew_lease(queue, lease, interval, stopped, lost):
+    """Loop of the thread renewing the lease of a worker every `interval`
+    seconds until `stopped` is set. Sets `lost` if the lease was lost."""
+    while not stopped.wait(interval):
+        if not queue.renew(lease):
+            lost.set()
+            return
+
+
+def run_worker(factory, bib_template, queue, output_rep, worker_id=None,
+               poll_interval=1.0, renew_interval=None, wait=True,
+               manifest_name='manifest.json', journal_name='bibs.journal',
+               conversion_cache_name='conversions.json', **kwargs):
+    """Claims and processes chunks until the queue is finished.
+
+    The lease of the chunk being processed is renewed by a timer thread. If
+    it is lost nevertheless (worker stalled longer than the lease timeout),
+    the worker stops processing the chunk at the next bib (see the `cancel`
+    parameter of `BibFactory.make_bib_files`) and does not acknowledge it.
+    A chunk which bibs raise is released with its error (see
+    `DirectoryWorkQueue.fail`) and the worker goes on with the next chunk.
+
+    :Parameters:
+
+        *factory*: BibFactory
+            Factory built on the same participants table as the
+            coordinator's one.
+        *bib_template*: BibTemplate
+            Template used to create the bibs.
+        *queue*: DirectoryWorkQueue
+            Queue shared with the coordinator.
+        *output_rep*: str
+            Output repository (shared by all the workers).
+        *worker_id*: str, optional
+            Name of the worker. Default is `<host name>-<process id>`.
+        *poll_interval*: float, optional
+            Seconds between two claims when no chunk is pending.
+        *renew_interval*: float, optional
+            Seconds between two renewals of the lease while a chunk is
+            processed. Default is a third of the lease timeout.
+        *wait*: bool, optional
+            If True (default), the worker waits for the leased chunks of the
+            other workers to be done (they may be published again). Else it
+            stops as soon as no chunk is pending.
+        *manifest_name*, *journal_name*, *conversion_cache_name*: str
+            Names of the files of the run (see `BibFactory.make_bib_files`),
+            to which the name of the chunk is added.
+        *kwargs*:
+            Other arguments of `BibFactory.make_bib_files` (`jobs`,
+            `output_format`...).
+
+    :Returns:
+
+        *chunks*: list of str
+            Names of the chunks processed and acknowledged by the worker.
+
+    """
+    worker_id = worker_id or '{}-{}'.format(socket.gethostname(), os.getpid())
+    if renew_interval is None:
+        renew_interval = queue.lease_timeout / 3.0
+    output_format = kwargs.get('output_format', 'png')
+    processed = []
+    while True:
+        lease = queue.claim(worker_id)
+        if lease is None:
+            if not wait or queue.is_finished():
+                return(processed)
+            time.sleep(poll_interval)
+            continue
+        stopped = threading.Event()
+        lost = threading.Event()
+        renewer = threading.Thread(
+            target=_renew_lease, args=(queue, lease, renew_interval, stopped,
+                                       lost),
+            name='bib-lease-{}'.format(lease.chunk), daemon=True)
+        renewer.start()
+
+        suffix = '.' + lease.chunk
+        try:
+            # the run stops at the next bib if the lease is lost
+            factory.make_bib_files(
+                bib_template, output_rep, numbers=lease.numbers,
+                script_name=part_name('make_{}s.{}'.format(
+                    output_format, kwargs.get('script_format', 'bat')),
+                    suffix),
+                make_manifest=True,
+                manifest_name=part_name(manifest_name, suffix),
+                journal_name=part_name(journal_name, suffix),
+                conversion_cache_name=part_name(conversion_cache_name,
+                                                suffix),
+                cancel=lost, **kwargs)
+        except Exception as error:
+            if not lost.is_set():
+                state = queue.fail(lease, '{}: {}'.format(
+                                       type(error).__name__, error))
+                warnings.warn("Chunk {} failed ({}): {}".format(
+                                  lease.chunk, state, error))
+            continue
+        finally:
+            stopped.set()
+            renewer.join()
+        if lost.is_set() or not queue.ack(lease):
+            # processed again by another worker
+            continue
+        processed.append(lease.chunk)
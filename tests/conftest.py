@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Fixtures shared by the tests of race_bib_creator."""
+import pytest
+
+import race_bib_creator
+
+TEMPLATE = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="210mm" height="148mm"
+     viewBox="0 0 744 524">
+  <text x="20" y="40">NUMBER</text>
+  <text x="20" y="70">NAME</text>
+</svg>
+"""
+
+
+@pytest.fixture
+def base_file(tmp_path):
+    """Path of a small svg template with the markers NUMBER and NAME."""
+    path = tmp_path / 'template.svg'
+    path.write_text(TEMPLATE, encoding='utf-8')
+    return(str(path))
+
+
+@pytest.fixture
+def template(base_file):
+    """Template filling the Number and Name fields."""
+    return(race_bib_creator.BibTemplate(base_file, {'Number': 'NUMBER',
+                                                    'Name': 'NAME'}))
+
+
+@pytest.fixture
+def participants():
+    """Participants table, as a list of rows."""
+    return([{'Number': number, 'Name': 'Runner {}'.format(number)}
+            for number in range(1, 11)])
+
+
+@pytest.fixture
+def factory(participants):
+    """Factory of the participants, numbered by their Number field."""
+    return(race_bib_creator.BibFactory(participants,
+                                       field_for_numbering='Number'))
+
+
+@pytest.fixture(scope='session')
+def font_file(tmp_path_factory):
+    """Path of a TrueType font of 1000 units per em which digits and
+    capital letters are squares 500 units wide (400 units drawn, 700
+    units high)."""
+    fontBuilder = pytest.importorskip('fontTools.fontBuilder')
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+    characters = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    names = ['.notdef', 'space'] + ['g{}'.format(ord(character))
+                                    for character in characters]
+    glyphs = {}
+    for name in names:
+        pen = TTGlyphPen(None)
+        if name != 'space':
+            pen.moveTo((50, 0))
+            pen.lineTo((50, 700))
+            pen.lineTo((450, 700))
+            pen.lineTo((450, 0))
+            pen.closePath()
+        glyphs[name] = pen.glyph()
+    builder = fontBuilder.FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(names)
+    cmap = {ord(character): 'g{}'.format(ord(character))
+            for character in characters}
+    cmap[ord(' ')] = 'space'
+    builder.setupCharacterMap(cmap)
+    builder.setupGlyf(glyphs)
+    builder.setupHorizontalMetrics({name: (500, 50) for name in names})
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    builder.setupNameTable({'familyName': 'Squares',
+                            'styleName': 'Regular'})
+    builder.setupOS2()
+    builder.setupPost()
+    path = str(tmp_path_factory.mktemp('fonts') / 'squares.ttf')
+    builder.save(path)
+    return(path)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Tests of the barcode caches of `BibTemplate`."""
+import os
+import pickle
+
+import pytest
+
+import race_bib_creator
+from race_bib_creator.bib_template import BARCODE_CACHE
+from race_bib_creator.lru_cache import LRUCache
+
+pytest.importorskip('barcode')
+
+
+def _template(base_file, **options):
+    return(race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER', 'barcode': 'barcode.png'},
+        use_barcodes=True, barcode_number_field_name='Number', **options))
+
+
+def test_no_cache_by_default(base_file, tmp_path):
+    BARCODE_CACHE.clear()
+    template = _template(base_file)
+    template._make_barcode(1, str(tmp_path))
+    assert len(template._barcode_cache) == 0
+    assert len(BARCODE_CACHE) == 0
+
+
+def test_own_cache(base_file, tmp_path):
+    template = _template(base_file, barcode_cache_bytes=2 ** 20)
+    template._make_barcode(1, str(tmp_path))
+    template._make_barcode(1, str(tmp_path))
+    assert len(template._barcode_cache) == 1
+
+
+def test_shared_cache(base_file, tmp_path):
+    BARCODE_CACHE.clear()
+    first = _template(base_file, shared_barcode_cache=True)
+    second = _template(base_file, shared_barcode_cache=True)
+    first._make_barcode(1, str(tmp_path))
+    assert second._barcode_cache is BARCODE_CACHE
+    assert len(BARCODE_CACHE) == 1
+    # a copy made for a worker process uses the shared cache of its process
+    assert pickle.loads(pickle.dumps(first))._barcode_cache is BARCODE_CACHE
+    BARCODE_CACHE.clear()
+
+
+def test_run_cache_is_shared_by_the_templates_of_a_run(
+        monkeypatch, base_file, participants, tmp_path):
+    BARCODE_CACHE.clear()
+    import barcode
+    generated = []
+    get = barcode.get
+
+    def counted(encoding, text, **kwargs):
+        generated.append(text)
+        return(get(encoding, text, **kwargs))
+
+    monkeypatch.setattr(barcode, 'get', counted)
+    first = _template(base_file)
+    second = _template(base_file)
+    targets = [(first, str(tmp_path / 'first')),
+               (second, str(tmp_path / 'second'))]
+    for _, output_rep in targets:
+        os.mkdir(output_rep)
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    result = factory.make_bib_files(targets, output_format='svg')
+    assert result.ok
+    assert len(generated) == len(participants)
+    for _, output_rep in targets:
+        assert 'barcode_0000001.png' in os.listdir(output_rep)
+    # the cache is dropped and the templates' own caches are unchanged
+    assert first._run_barcode_cache is None
+    assert len(first._barcode_cache) == 0
+    assert len(BARCODE_CACHE) == 0
+
+
+def test_run_cache_stays_shared_in_worker_processes(base_file):
+    first = _template(base_file)
+    second = _template(base_file)
+    first._run_barcode_cache = second._run_barcode_cache = LRUCache(2 ** 20)
+    first, second = pickle.loads(pickle.dumps((first, second)))
+    assert first._run_barcode_cache is second._run_barcode_cache
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Tests of the barcode sprite sheets of the proof sheets."""
+import os
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+import race_bib_creator
+
+pytest.importorskip('barcode')
+
+TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:xlink="http://www.w3.org/1999/xlink" width="100mm" height="50mm"
+     viewBox="0 0 100 50">
+  <text x="5" y="20">NUMBER</text>
+  <image x="5" y="25" width="60" height="20" xlink:href="barcode.png" />
+</svg>
+"""
+SVG = '{http://www.w3.org/2000/svg}'
+XLINK = '{http://www.w3.org/1999/xlink}href'
+
+
+def test_barcodes_are_drawn_once(tmp_path):
+    base_file = tmp_path / 'template.svg'
+    base_file.write_text(TEMPLATE)
+    template = race_bib_creator.BibTemplate(
+        str(base_file), {'Number': 'NUMBER', 'barcode': 'barcode.png'},
+        use_barcodes=True, barcode_number_field_name='Number')
+    participants = [{'Number': number} for number in (1, 2, 3)]
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    sprites = race_bib_creator.BarcodeSprites()
+    path = str(tmp_path / 'proof.svg')
+    factory.make_proof_sheet(path, template, barcode_sprites=sprites)
+    # no png barcode is written
+    assert sorted(os.listdir(str(tmp_path))) == ['proof.svg',
+                                                 'template.svg']
+    root = ElementTree.parse(path).getroot()
+    [defs] = root.findall(SVG + 'defs')
+    symbols = defs.findall(SVG + 'symbol')
+    assert [symbol.get('id') for symbol in symbols] == [
+        'barcode_0000001', 'barcode_0000002', 'barcode_0000003']
+    assert len(sprites.symbols) == 3
+    # the start/stop character of code39 is defined once for all the
+    # barcodes and referenced by each of them
+    fragments = {path.get('id') for path in defs.findall(SVG + 'path')}
+    assert 'code39-2a' in fragments
+    for symbol in symbols:
+        links = [use.get(XLINK) for use in symbol.findall(SVG + 'use')]
+        assert links.count('#code39-2a') == 2
+        assert set(link[1:] for link in links) <= fragments
+    # the bibs reference their barcode instead of a png file
+    references = [use.get(XLINK) for use in root.iter(SVG + 'use')
+                  if use.get('width') == '60']
+    assert references == ['#barcode_0000001', '#barcode_0000002',
+                          '#barcode_0000003']
+    # a barcode added again keeps its symbol
+    assert sprites.add('code39', '0000002',
+                       name='barcode_0000002') == 'barcode_0000002'
+    assert len(sprites.symbols) == 3
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Tests of the png conversions of `BibService`."""
+import glob
+import os
+import sys
+import time
+
+import pytest
+
+import race_bib_creator
+
+FAKE_CONVERTER = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                              'benchmarks', 'fake_converter.py')
+
+
+def _service(base_file, factory, output_rep, options='', timeout=30.0):
+    command = '"{}" "{}" {} {{source_svg}} {{width}} {{dest_png}}'.format(
+        sys.executable, FAKE_CONVERTER, options)
+    template = race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER', 'Name': 'NAME'},
+        conversion_command=command)
+    return(race_bib_creator.BibService(factory, template, output_rep,
+                                       png_px_width=20,
+                                       conversion_timeout=timeout))
+
+
+def _running(tag):
+    """Returns the command lines of the processes mentioning `tag`."""
+    commands = []
+    for path in glob.glob('/proc/[0-9]*/cmdline'):
+        try:
+            with open(path, 'rb') as stream:
+                command = stream.read().replace(b'\0', b' ').decode()
+        except OSError:
+            continue
+        if tag in command:
+            commands.append(command)
+    return(commands)
+
+
+def test_png_bib(base_file, factory, tmp_path):
+    service = _service(base_file, factory, str(tmp_path))
+    assert service.get(3, 'png').startswith(b'\x89PNG')
+    assert not glob.glob(str(tmp_path / '.service-*'))
+
+
+def test_failed_conversion(base_file, factory, tmp_path):
+    service = _service(base_file, factory, str(tmp_path), '--fail-rate 1')
+    with pytest.raises(race_bib_creator.ConversionError):
+        service.get(3, 'png')
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason="needs /proc")
+def test_hung_converter_is_killed(base_file, factory, tmp_path):
+    output_rep = tmp_path / 'hung'
+    output_rep.mkdir()
+    service = _service(base_file, factory, str(output_rep), '--hang-rate 1',
+                       timeout=1.0)
+    start = time.monotonic()
+    with pytest.raises(race_bib_creator.ConversionError):
+        service.get(3, 'png')
+    assert time.monotonic() - start < 10
+    assert _running(str(output_rep)) == []
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Tests of the command line interface."""
+import os
+
+import pytest
+
+import race_bib_creator
+from race_bib_creator import cli
+
+
+@pytest.fixture
+def arguments(base_file, tmp_path):
+    participants = tmp_path / 'participants.csv'
+    participants.write_text('Number,Name\n' + ''.join(
+        '{0},Runner {0}\n'.format(number) for number in range(1, 6)))
+    output_rep = tmp_path / 'bibs'
+    output_rep.mkdir()
+    return([base_file, str(participants), str(output_rep), '--numbering',
+            'Number', '--field', 'Number=NUMBER', '--field', 'Name=NAME'])
+
+
+@pytest.mark.parametrize('options', [
+    ['--route', 'A=other.svg'],
+    ['--route-by', 'Name', '--watch'],
+    ['--route-by', 'Name', '--serve', '8000'],
+    ['--watch', '--serve', '8000', '--workers', '1'],
+])
+def test_invalid_combinations_are_refused(arguments, options):
+    with pytest.raises(SystemExit) as raised:
+        cli.main(arguments + options)
+    assert raised.value.code == 2
+
+
+
+def test_written_bytes_leave_out_the_conversion_script(arguments, capsys):
+    assert cli.main(arguments) == 0
+    assert 'make_pngs.bat' in os.listdir(arguments[2])
+    assert '0.0 MB written' in capsys.readouterr().out
+    stats = race_bib_creator.RunStats()
+    stats.record('write', 0.1, 1000)
+    stats.record('barcode', 0.1, 10)
+    # commands of the script, or files converted by an executor
+    stats.record('convert', 0.1, 50)
+    assert cli._written_bytes(stats, False) == 1010
+    assert cli._written_bytes(stats, True) == 1060
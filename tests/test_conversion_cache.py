@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Tests of the confirmation of the expected conversions of
+`ConversionCache`."""
+import os
+
+import pytest
+
+from race_bib_creator import ConversionCache
+
+OPTIONS = {'format': 'png', 'width': 100}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Cache expecting bib_1.png from bib_1.svg, reloaded from its file."""
+    (tmp_path / 'bib_1.svg').write_text('<svg/>')
+    cache = ConversionCache(str(tmp_path))
+    cache.expect('bib_1.png', 'digest', OPTIONS, 'bib_1.svg')
+    cache.write()
+    return(ConversionCache(str(tmp_path)).load())
+
+
+def _set_mtime(path, mtime_ns):
+    os.utime(str(path), ns=(mtime_ns, mtime_ns))
+
+
+def test_converted_file_is_confirmed(cache, tmp_path):
+    (tmp_path / 'bib_1.png').write_bytes(b'png')
+    assert cache.is_current('bib_1.png', 'digest', OPTIONS)
+    assert cache.entries['bib_1.png']['sha256'] is not None
+    assert not cache.is_current('bib_1.png', 'other digest', OPTIONS)
+
+
+def test_missing_file_is_not_confirmed(cache):
+    assert not cache.is_current('bib_1.png', 'digest', OPTIONS)
+
+
+def test_empty_file_is_not_confirmed(cache, tmp_path):
+    (tmp_path / 'bib_1.png').write_bytes(b'')
+    assert not cache.is_current('bib_1.png', 'digest', OPTIONS)
+
+
+def test_file_older_than_its_svg_is_not_confirmed(cache, tmp_path):
+    source = cache.entries['bib_1.png']['source']
+    (tmp_path / 'bib_1.png').write_bytes(b'png')
+    # e.g. an old conversion copied in the output repository
+    _set_mtime(tmp_path / 'bib_1.png', source[1] - 10 ** 9)
+    assert not cache.is_current('bib_1.png', 'digest', OPTIONS)
+
+
+def test_unchanged_file_is_not_confirmed(tmp_path):
+    (tmp_path / 'bib_1.svg').write_text('<svg/>')
+    (tmp_path / 'bib_1.png').write_bytes(b'old png')
+    cache = ConversionCache(str(tmp_path))
+    cache.expect('bib_1.png', 'digest', OPTIONS, 'bib_1.svg')
+    assert not cache.is_current('bib_1.png', 'digest', OPTIONS)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Tests of `ConversionExecutor`, with the stand-in converter of the
+benchmarks."""
+import os
+import sys
+import time
+
+import pytest
+
+import race_bib_creator
+from race_bib_creator import ConversionExecutor
+from race_bib_creator.conversion_executor import ConversionJob
+
+FAKE_CONVERTER = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                              'benchmarks', 'fake_converter.py')
+
+
+@pytest.fixture
+def svg(tmp_path):
+    path = tmp_path / 'bib_1.svg'
+    path.write_text('<svg xmlns="http://www.w3.org/2000/svg"/>')
+    return(str(path))
+
+
+def _job(svg, options='', key=None):
+    dest = os.path.splitext(svg)[0] + '.png'
+    command = '"{}" "{}" {} "{}" 20 "{}"'.format(
+        sys.executable, FAKE_CONVERTER, options, svg, dest)
+    return(ConversionJob(command, dest, key))
+
+
+def test_successful_job(svg):
+    job = ConversionExecutor(retries=0).run_job(_job(svg))
+    assert job.ok and job.attempts == 1
+    assert os.path.getsize(job.dest) > 0
+
+
+def test_failed_job_is_retried(svg):
+    executor = ConversionExecutor(retries=2, backoff=0.01)
+    job = executor.run_job(_job(svg, '--fail-rate 1'))
+    assert not job.ok
+    assert job.attempts == 3
+    assert job.returncode == 1
+    message = job.message()
+    assert 'exit status 1' in message and 'cannot convert' in message
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="needs a POSIX shell")
+def test_flaky_job_succeeds_on_a_retry(tmp_path, svg):
+    # the command fails on its first attempt only
+    marker = tmp_path / 'attempted'
+    dest = os.path.splitext(svg)[0] + '.png'
+    command = ('[ -f "{marker}" ] || {{ touch "{marker}"; exit 3; }}; '
+               '"{python}" "{converter}" "{svg}" 20 "{dest}"').format(
+                   marker=marker, python=sys.executable,
+                   converter=FAKE_CONVERTER, svg=svg, dest=dest)
+    job = ConversionExecutor(retries=1, backoff=0.01).run_job(
+        ConversionJob(command, dest))
+    assert job.ok and job.attempts == 2
+
+
+def test_stale_file_is_not_a_success(svg):
+    job = _job(svg, '--fail-rate 1')
+    with open(job.dest, 'wb') as stream:
+        stream.write(b'previous conversion')
+    ConversionExecutor(retries=0).run_job(job)
+    assert not job.ok
+    assert not os.path.exists(job.dest)
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="needs process groups")
+def test_hung_job_is_killed(svg):
+    executor = ConversionExecutor(timeout=0.5, retries=0)
+    start = time.monotonic()
+    job = executor.run_job(_job(svg, '--hang-rate 1'))
+    assert time.monotonic() - start < 10
+    assert job.timed_out and not job.ok
+    assert 'timed out' in job.message()
+
+
+def test_run_yields_all_the_jobs(tmp_path):
+    jobs = []
+    for number in range(6):
+        path = tmp_path / 'bib_{}.svg'.format(number)
+        path.write_text('<svg/>')
+        jobs.append(_job(str(path), '--fail-on "bib_3"', key=number))
+    done = list(ConversionExecutor(jobs=3, retries=0).run(jobs))
+    assert sorted(job.key for job in done) == list(range(6))
+    assert [job.key for job in done if not job.ok] == [3]
+
+
+def test_factory_reports_failed_conversions(factory, base_file, tmp_path):
+    template = race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER'},
+        conversion_command='"{}" "{}" --fail-on "_4\\.svg" {{source_svg}} '
+                           '{{width}} {{dest_png}}\n'.format(
+                               sys.executable, FAKE_CONVERTER))
+    output_rep = tmp_path / 'bibs'
+    output_rep.mkdir()
+    executor = ConversionExecutor(jobs=4, retries=1, backoff=0.01)
+    result = factory.make_bib_files(template, str(output_rep),
+                                    output_format='png', png_px_width=20,
+                                    convert=executor, errors=True)
+    assert result.failures == 1
+    assert [error.number for error in result.errors] == [4]
+    assert 'exit status 1' in list(result.errors)[0].message
+    pngs = [name for name in os.listdir(str(output_rep))
+            if name.endswith('.png')]
+    assert len(pngs) == 9
+
+
+def test_factory_raises_without_error_report(factory, base_file, tmp_path):
+    template = race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER'},
+        conversion_command='"{}" "{}" --fail-rate 1 {{source_svg}} '
+                           '{{width}} {{dest_png}}\n'.format(
+                               sys.executable, FAKE_CONVERTER))
+    output_rep = tmp_path / 'bibs'
+    output_rep.mkdir()
+    with pytest.raises(race_bib_creator.ConversionError):
+        factory.make_bib_files(template, str(output_rep),
+                               output_format='png', png_px_width=20,
+                               convert=ConversionExecutor(retries=0))
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Tests of the POSIX conversion script of `BibFactory.make_bib_files`."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import race_bib_creator
+
+FAKE_CONVERTER = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                              'benchmarks', 'fake_converter.py')
+
+
+def _script(output_rep):
+    with open(os.path.join(output_rep, 'make_pngs.sh')) as stream:
+        return(stream.read())
+
+
+def test_default_converter_is_on_the_path(factory, template, tmp_path):
+    factory.make_bib_files(template, str(tmp_path), output_format='png',
+                           script_format='sh')
+    script = _script(str(tmp_path))
+    assert 'inkscape --export-type=png' in script
+    assert 'Program Files' not in script
+
+
+def test_given_converter_is_kept(factory, base_file, tmp_path):
+    template = race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER'},
+        conversion_command='rsvg-convert -w {width} -o {dest_png} '
+                           '{source_svg}\n')
+    factory.make_bib_files(template, str(tmp_path), output_format='png',
+                           script_format='sh')
+    assert 'rsvg-convert -w 2000' in _script(str(tmp_path))
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="needs a POSIX shell")
+def test_script_converts_the_bibs(factory, base_file, tmp_path):
+    template = race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER'},
+        conversion_command='"{}" "{}" {{source_svg}} {{width}} '
+                           '{{dest_png}}\n'.format(sys.executable,
+                                                   FAKE_CONVERTER))
+    output_rep = tmp_path / 'bibs'
+    output_rep.mkdir()
+    factory.make_bib_files(template, str(output_rep), output_format='png',
+                           script_format='sh', png_px_width=20,
+                           batch_size=3)
+    subprocess.run(['sh', str(output_rep / 'make_pngs.sh'), '2'],
+                   check=True)
+    pngs = [name for name in os.listdir(str(output_rep))
+            if name.endswith('.png')]
+    assert len(pngs) == 10
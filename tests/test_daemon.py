@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Tests of the updates of `BibDaemon` run by a `PriorityScheduler`."""
+import os
+import threading
+import time
+import warnings
+
+import pytest
+
+import race_bib_creator
+
+
+@pytest.fixture
+def participants_file(tmp_path):
+    path = tmp_path / 'participants.csv'
+    path.write_text('Number,Name\n' + ''.join(
+        '{0},Runner {0}\n'.format(number) for number in range(1, 21)))
+    return(str(path))
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = race_bib_creator.PriorityScheduler(workers=4, reserved=0)
+    yield scheduler
+    scheduler.shutdown(cancel=True)
+
+
+def _watch_runs(monkeypatch, delay=0.05):
+    """Records the number of runs at the same time per output repository."""
+    make_bib_files = race_bib_creator.BibFactory.make_bib_files
+    lock = threading.Lock()
+    running = {}
+    overlaps = {}
+
+    def watched(factory, bib_template, output_rep, **kwargs):
+        with lock:
+            running[output_rep] = running.get(output_rep, 0) + 1
+            overlaps[output_rep] = max(overlaps.get(output_rep, 0),
+                                       running[output_rep])
+        try:
+            time.sleep(delay)
+            return(make_bib_files(factory, bib_template, output_rep,
+                                  **kwargs))
+        finally:
+            with lock:
+                running[output_rep] -= 1
+
+    monkeypatch.setattr(race_bib_creator.BibFactory, 'make_bib_files',
+                        watched)
+    return(overlaps)
+
+
+def test_chunks_of_a_repository_run_one_at_a_time(
+        monkeypatch, participants_file, template, scheduler, tmp_path):
+    overlaps = _watch_runs(monkeypatch)
+    output_rep = str(tmp_path / 'bibs')
+    os.mkdir(output_rep)
+    daemon = race_bib_creator.BibDaemon(
+        participants_file, [(template, output_rep)],
+        field_for_numbering='Number', use_inotify=False, scheduler=scheduler,
+        chunk_size=5, output_format='svg')
+    daemon.load()
+    futures = daemon._make(template, output_rep)
+    assert len(futures) == 4
+    for future in futures:
+        future.result(timeout=30)
+    daemon.close()
+    assert overlaps[output_rep] == 1
+    bibs = [name for name in os.listdir(output_rep)
+            if name.endswith('.svg')]
+    assert len(bibs) == 20
+
+
+def test_repositories_run_in_parallel(monkeypatch, participants_file,
+                                      template, scheduler, tmp_path):
+    overlaps = _watch_runs(monkeypatch, delay=0.5)
+    targets = []
+    for name in ('first', 'second'):
+        os.mkdir(str(tmp_path / name))
+        targets.append((template, str(tmp_path / name)))
+    daemon = race_bib_creator.BibDaemon(
+        participants_file, targets, field_for_numbering='Number',
+        use_inotify=False, scheduler=scheduler, chunk_size=20,
+        output_format='svg')
+    daemon.load()
+    start = time.monotonic()
+    futures = [future for bib_template, output_rep in targets
+               for future in daemon._make(bib_template, output_rep)]
+    for future in futures:
+        future.result(timeout=30)
+    daemon.close()
+    assert time.monotonic() - start < 0.95
+    assert all(overlap == 1 for overlap in overlaps.values())
+
+
+def test_scripts_and_manifests_are_refused_with_a_scheduler(
+        participants_file, template, scheduler, tmp_path):
+    for kwargs in ({}, {'output_format': 'pdf'},
+                   {'output_format': 'svg', 'make_manifest': True}):
+        with pytest.raises(ValueError):
+            race_bib_creator.BibDaemon(
+                participants_file, [(template, str(tmp_path))],
+                use_inotify=False, scheduler=scheduler, **kwargs)
+    daemon = race_bib_creator.BibDaemon(
+        participants_file, [(template, str(tmp_path))], use_inotify=False,
+        scheduler=scheduler, make_convert_script=False)
+    daemon.close()
+
+
+def test_failed_jobs_are_reported(monkeypatch, participants_file, template,
+                                  scheduler, tmp_path):
+    def failing(factory, bib_template, output_rep, **kwargs):
+        raise RuntimeError('disk full')
+
+    monkeypatch.setattr(race_bib_creator.BibFactory, 'make_bib_files',
+                        failing)
+    daemon = race_bib_creator.BibDaemon(
+        participants_file, [(template, str(tmp_path))],
+        field_for_numbering='Number', use_inotify=False, scheduler=scheduler,
+        chunk_size=10, output_format='svg')
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        daemon.start()
+        deadline = time.monotonic() + 30
+        while len(caught) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    daemon.close()
+    messages = [str(warning.message) for warning in caught]
+    assert len(messages) == 2
+    assert all('disk full' in message for message in messages)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Tests of the derived fields of `BibTemplate`."""
+import os
+
+import pytest
+
+import race_bib_creator
+from race_bib_creator.derived_fields import DerivedField
+
+pytest.importorskip('pandas')
+
+
+def _next_age(table):
+    return(table['Age'].astype(int) + 1)
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_failing_rows_are_reported_and_the_others_made(base_file, tmp_path,
+                                                       jobs):
+    participants = [{'Number': number, 'Age': str(20 + number)}
+                    for number in range(1, 6)]
+    participants[2]['Age'] = 'unknown'
+    template = race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER', 'Next': 'NAME'},
+        derived_fields={'Next': DerivedField(_next_age, ('Age',))})
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    os.mkdir(str(tmp_path / 'bibs'))
+    result = factory.make_bib_files(template, str(tmp_path / 'bibs'),
+                                    output_format='svg', errors=True,
+                                    jobs=jobs)
+    assert result.bibs == 4 and result.failures == 1
+    [error] = list(result.errors)
+    assert error.number == 3
+    assert error.stage == 'validate'
+    assert error.exception == 'ValueError'
+    with open(str(tmp_path / 'bibs' / 'dossard_4.svg')) as bib:
+        assert '>25<' in bib.read()
+    assert not os.path.exists(str(tmp_path / 'bibs' / 'dossard_3.svg'))
+
+
+def test_derived_columns_are_computed():
+    import pandas as pd
+    from race_bib_creator import derived_fields
+    table = pd.DataFrame({
+        'First': ['Jean', 'Ana', 'Léa'],
+        'Last': ['Martin', None, 'de la Fontaine'],
+        'Team': ['AC Grenoble Athlétisme', 'Club', None],
+        'Birth': ['2008-05-01', '1990-01-01', None]})
+    values = derived_fields.evaluate({
+        'LAST': derived_fields.upper('Last'),
+        'Short': derived_fields.short_name('First', 'Last'),
+        'Team': derived_fields.truncate('Team', 10),
+        'Category': derived_fields.age_category(
+            'Birth', [(17, 'CA'), (34, 'SE'), (None, 'MA')], year=2026),
+        'Full': derived_fields.from_expression('{First} {Last}')}, table)
+    assert values == {
+        'LAST': ['MARTIN', '', 'DE LA FONTAINE'],
+        'Short': ['Jean M.', 'Ana', 'Léa d.'],
+        'Team': ['AC Grenob…', 'Club', ''],
+        'Category': ['SE', 'MA', ''],
+        'Full': ['Jean Martin', 'Ana ', 'Léa de la Fontaine']}
+
+
+def test_factory_and_single_bib_give_the_same_texts(base_file, tmp_path):
+    from race_bib_creator import derived_fields
+    participants = [{'Number': 1, 'First': 'Jean', 'Last': 'Martin'},
+                    {'Number': 2, 'First': 'Ana', 'Last': 'Lopez'}]
+    template = race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER', 'Short': 'NAME'},
+        derived_fields={'Short': derived_fields.short_name('First',
+                                                           'Last')})
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    factory.make_bib_files(template, str(tmp_path), output_format='svg')
+    with open(str(tmp_path / 'dossard_2.svg')) as bib:
+        assert '>Ana L.<' in bib.read()
+    # evaluated for the participant alone without a factory
+    content = template.render(dict(participants[1]))
+    assert '>Ana L.<' in content
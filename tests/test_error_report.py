@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Tests of the isolation of the failures of `BibFactory.make_bib_files`."""
+import os
+
+import pytest
+
+import race_bib_creator
+
+pytest.importorskip('barcode')
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_failing_row_ends_up_in_the_error_report(base_file, participants,
+                                                 tmp_path, jobs):
+    template = race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER', 'barcode': 'barcode.png'},
+        use_barcodes=True, barcode_number_field_name='Code')
+    for row in participants:
+        if row['Number'] != 4:
+            # no barcode number for the bib 4
+            row['Code'] = row['Number']
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    output_rep = str(tmp_path / 'bibs')
+    os.mkdir(output_rep)
+    result = factory.make_bib_files(template, output_rep, errors=True,
+                                    output_format='svg', jobs=jobs)
+    assert result.bibs == 9 and result.failures == 1 and not result.ok
+    [error] = list(result.errors)
+    assert (error.number, error.stage, error.exception) == (4, 'validate',
+                                                            'ValueError')
+    bibs = [name for name in os.listdir(output_rep) if name.endswith('.svg')]
+    assert len(bibs) == 9 and 'dossard_4.svg' not in bibs
+    path = str(tmp_path / 'errors.json')
+    result.errors.write(path)
+    report = race_bib_creator.read_error_report(path)
+    assert report.numbers() == [4]
+    assert report.by_stage() == {'validate': 1}
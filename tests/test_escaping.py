@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Tests of the escaping of the values of the fields for XML."""
+import os
+import xml.etree.ElementTree as ElementTree
+
+import race_bib_creator
+
+TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg">
+  <!-- NAME -->
+  <text id="number" aria-label="NAME" data-team='TEAM'>NAME</text>
+  <text id="team">TEAM</text>
+</svg>
+"""
+NAME = 'Smith & Jones <"Junior"> \'A\''
+TEAM = "Dupont & Fils 'Élite'"
+
+
+def _check(path):
+    root = ElementTree.parse(path).getroot()
+    texts = {element.get('id'): element for element in root}
+    assert texts['number'].text == NAME
+    assert texts['number'].get('aria-label') == NAME
+    assert texts['number'].get('data-team') == TEAM
+    assert texts['team'].text == TEAM
+
+
+def test_values_are_escaped_in_text_and_attributes(tmp_path):
+    base_file = tmp_path / 'template.svg'
+    base_file.write_text(TEMPLATE, encoding='utf-8')
+    template = race_bib_creator.BibTemplate(
+        str(base_file), {'Number': 'NUMBER', 'Name': 'NAME',
+                         'Team': 'TEAM'})
+    participants = [{'Number': 1, 'Name': NAME, 'Team': TEAM}]
+    output_rep = str(tmp_path / 'bibs')
+    os.mkdir(output_rep)
+    # escaped column-wise by the factory
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    factory.make_bib_files(template, output_rep, output_format='svg')
+    _check(os.path.join(output_rep, 'dossard_1.svg'))
+    # escaped for a single bib
+    template.make_svg_file(dict(participants[0]), 'single.svg',
+                           output_rep=output_rep)
+    _check(os.path.join(output_rep, 'single.svg'))
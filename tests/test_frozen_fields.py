@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Tests of the frozen fields of `BibTemplate` and `BibFactory`."""
+import os
+
+import race_bib_creator
+
+
+def _bib(output_rep, number):
+    with open(os.path.join(output_rep, 'dossard_{}.svg'.format(number)),
+              encoding='utf-8') as bib:
+        return(bib.read())
+
+
+def test_frozen_fields_of_a_template(base_file, participants, tmp_path):
+    template = race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER', 'Name': 'NAME'},
+        frozen_fields={'Name': 'Trail des Crêtes & Co'})
+    assert 'Name' not in template.compile().fields
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    factory.make_bib_files(template, str(tmp_path), output_format='svg')
+    for number in (1, 10):
+        content = _bib(str(tmp_path), number)
+        # substituted once and escaped, the values of the rows are ignored
+        assert '>Trail des Crêtes &amp; Co<' in content
+        assert 'Runner' not in content
+        assert '>{}<'.format(number) in content
+
+
+def test_frozen_fields_of_a_factory(template, tmp_path):
+    # the table does not need the columns of the frozen fields
+    participants = [{'Number': number} for number in range(1, 4)]
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number',
+                                          frozen_fields={'Name': '2026'})
+    factory.make_bib_files(template, str(tmp_path), output_format='svg')
+    assert '>2026<' in _bib(str(tmp_path), 2)
+    # the template given to the factory is left unchanged
+    assert 'Name' in template.compile().fields
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Tests of the modules loaded by the import of the package."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import race_bib_creator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ('race_bib_creator.daemon', 'race_bib_creator.bib_service',
+                'race_bib_creator.work_queue', 'race_bib_creator.scheduler',
+                'race_bib_creator.text_outlines', 'multiprocessing',
+                'xml.sax.saxutils', 'concurrent.futures', 'http.server')
+
+
+def test_import_leaves_the_long_running_modes_out():
+    code = ('import json, sys; import race_bib_creator; '
+            'print(json.dumps([name for name in {!r} '
+            'if name in sys.modules]))'.format(LAZY_MODULES))
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT)
+    assert json.loads(output.decode()) == []
+
+
+def test_lazy_names_are_exported():
+    from race_bib_creator.daemon import BibDaemon
+    assert race_bib_creator.BibDaemon is BibDaemon
+    for name in ('FileWatcher', 'BibService', 'Coordinator',
+                 'DirectoryWorkQueue', 'run_worker', 'PriorityScheduler',
+                 'OutlineFont', 'get_font'):
+        assert name in dir(race_bib_creator)
+        assert callable(getattr(race_bib_creator, name))
+    with pytest.raises(AttributeError):
+        race_bib_creator.NoSuchName
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Tests of the index of the participants of `BibFactory`."""
+import os
+
+import pytest
+
+import race_bib_creator
+
+
+def test_find(factory, participants):
+    assert factory.find(3) == participants[2]
+    assert factory.find('3') == participants[2]
+    assert factory.find(42) is None
+
+
+def test_find_warns_about_duplicate_numbers(participants):
+    participants[5]['Number'] = 3
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    with pytest.warns(UserWarning):
+        assert factory.find(3) == participants[2]
+
+
+def test_find_by_name(participants):
+    participants[1]['Name'] = 'Éloïse  Dupont'
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number',
+                                          name_fields=['Name'])
+    assert factory.find_by_name('eloise dupont') == [2]
+    assert factory.find_by_name('Nobody') == []
+
+
+def test_make_bib_matches_make_bib_files(factory, template, tmp_path):
+    everyone = str(tmp_path / 'everyone')
+    single = str(tmp_path / 'single')
+    os.mkdir(everyone)
+    os.mkdir(single)
+    factory.make_bib_files(template, everyone, output_format='svg')
+    path = factory.make_bib('7', template, output_rep=single)
+    assert os.listdir(single) == ['dossard_7.svg']
+    with open(path, 'rb') as bib, \
+            open(os.path.join(everyone, 'dossard_7.svg'), 'rb') as expected:
+        assert bib.read() == expected.read()
+    with pytest.raises(KeyError):
+        factory.make_bib(42, template, output_rep=single)
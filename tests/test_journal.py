@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Tests of the journal used to resume `BibFactory.make_bib_files`."""
+import os
+
+import pytest
+
+from race_bib_creator.journal import Journal
+
+
+def _entry(position):
+    return({'position': position, 'bib': 'bib_{}.svg'.format(position),
+            'sha256': 'digest', 'barcode': None})
+
+
+def _stamps(output_rep):
+    return({name: os.stat(os.path.join(output_rep, name)).st_mtime_ns
+            for name in os.listdir(output_rep) if name.endswith('.svg')})
+
+
+def test_resume_makes_only_the_missing_bibs(factory, template, tmp_path):
+    output_rep = str(tmp_path / 'bibs')
+    os.mkdir(output_rep)
+    factory.make_bib_files(template, output_rep, output_format='svg',
+                           resume=True)
+    bibs = sorted(name for name in os.listdir(output_rep)
+                  if name.endswith('.svg'))
+    assert len(bibs) == 10
+    os.remove(os.path.join(output_rep, bibs[3]))
+    stamps = {name: os.stat(os.path.join(output_rep, name)).st_mtime_ns
+              for name in bibs if name != bibs[3]}
+    result = factory.make_bib_files(template, output_rep,
+                                    output_format='svg', resume=True)
+    assert result.bibs == 10
+    assert os.path.exists(os.path.join(output_rep, bibs[3]))
+    for name, stamp in stamps.items():
+        assert os.stat(os.path.join(output_rep, name)).st_mtime_ns == stamp
+
+
+def test_partial_run_keeps_the_other_entries(factory, template, tmp_path):
+    output_rep = str(tmp_path / 'bibs')
+    os.mkdir(output_rep)
+    factory.make_bib_files(template, output_rep, output_format='svg',
+                           resume=True)
+    factory.make_bib_files(template, output_rep, output_format='svg',
+                           resume=True, numbers=[2, 3])
+    journal = Journal(os.path.join(output_rep, 'bibs.journal'),
+                      template.fingerprint())
+    assert sorted(journal.load()) == list(range(10))
+    stamps = _stamps(output_rep)
+    factory.make_bib_files(template, output_rep, output_format='svg',
+                           resume=True)
+    # all the bibs are resumed, none is made again
+    assert _stamps(output_rep) == stamps
+
+
+def test_journal_of_another_template_is_discarded(tmp_path):
+    path = str(tmp_path / 'bibs.journal')
+    journal = Journal(path, 'first')
+    journal.open([_entry(0)])
+    journal.close()
+    assert list(Journal(path, 'first').load()) == [0]
+    assert Journal(path, 'second').load() == {}
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / 'bibs.journal')
+    journal = Journal(path, 'fingerprint')
+    journal.open([_entry(0)])
+    journal.append(_entry(1))
+    journal.close()
+    with open(path, 'a') as stream:
+        stream.write('{"position": 2, "bib": "bi')
+    assert sorted(Journal(path, 'fingerprint').load()) == [0, 1]
+
+
+def test_interrupted_open_keeps_the_previous_journal(tmp_path):
+    path = str(tmp_path / 'bibs.journal')
+    journal = Journal(path, 'fingerprint')
+    journal.open([_entry(0), _entry(1)])
+    journal.close()
+
+    def interrupted():
+        yield _entry(0)
+        raise KeyboardInterrupt()
+
+    with pytest.raises(KeyboardInterrupt):
+        Journal(path, 'fingerprint').open(interrupted())
+    assert sorted(Journal(path, 'fingerprint').load()) == [0, 1]
+
+
+def test_entries_are_appended_after_the_kept_ones(tmp_path):
+    path = str(tmp_path / 'bibs.journal')
+    journal = Journal(path, 'fingerprint', sync_interval=0)
+    journal.open([_entry(0)])
+    journal.append(_entry(1))
+    # the appended entries can be read before the journal is closed
+    assert sorted(Journal(path, 'fingerprint').load()) == [0, 1]
+    journal.close()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Tests of the layered raster mode of `BibFactory.make_bib_files`."""
+import os
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+import race_bib_creator
+
+np = pytest.importorskip('numpy')
+Image = pytest.importorskip('PIL.Image')
+
+TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 40 20">
+  <rect x="0" y="0" width="40" height="20" fill="#ffffff"/>
+  <rect x="2" y="2" width="20" height="10" fill="#0000ff"/>
+  <g>
+    <rect x="10" y="5" width="WIDTH" height="8" fill="COLOR"/>
+  </g>
+  <rect x="30" y="14" width="8" height="5" fill="#00ff00"/>
+</svg>
+"""
+
+
+def rasterize(content, px_width, directory):
+    """Rasterizer drawing the opaque rectangles of a svg content."""
+    root = ElementTree.fromstring(content.encode('utf-8'))
+    _, _, width, height = [float(value)
+                           for value in root.get('viewBox').split()]
+    scale = px_width / width
+    picture = np.zeros((int(round(height * scale)), px_width, 4), np.uint8)
+    for rect in root.iter('{http://www.w3.org/2000/svg}rect'):
+        x, y, width, height = [int(round(float(rect.get(name)) * scale))
+                               for name in ('x', 'y', 'width', 'height')]
+        color = bytes.fromhex(rect.get('fill')[1:]) + b'\xff'
+        picture[y:y + height, x:x + width] = np.frombuffer(color, np.uint8)
+    return(picture)
+
+
+def test_layered_png_matches_the_full_render(tmp_path):
+    base_file = tmp_path / 'template.svg'
+    base_file.write_text(TEMPLATE, encoding='utf-8')
+    template = race_bib_creator.BibTemplate(
+        str(base_file), {'Number': 'NUMBER', 'Width': 'WIDTH',
+                         'Color': 'COLOR'})
+    participants = [{'Number': 1, 'Width': 5, 'Color': '#ff0000'},
+                    {'Number': 2, 'Width': 25, 'Color': '#808080'}]
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    output_rep = str(tmp_path / 'bibs')
+    os.mkdir(output_rep)
+    result = factory.make_bib_files(template, output_rep, png_px_width=80,
+                                    output_format='png', layered=True,
+                                    rasterizer=rasterize)
+    assert result.ok
+    for row in participants:
+        expected = rasterize(template.render(dict(row)), 80, output_rep)
+        path = os.path.join(output_rep, 'dossard_{}.png'.format(
+                                            row['Number']))
+        with Image.open(path) as picture:
+            assert np.array_equal(np.asarray(picture.convert('RGBA')),
+                                  expected)
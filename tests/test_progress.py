@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Tests of the progress events of `BibFactory.make_bib_files`."""
+import json
+import os
+import threading
+
+import pytest
+
+import race_bib_creator
+
+
+def test_run_sends_start_and_end(factory, template, tmp_path):
+    events = []
+    result = factory.make_bib_files(template, str(tmp_path),
+                                    output_format='svg',
+                                    progress=events.append)
+    kinds = [event.kind for event in events]
+    assert kinds == ['start'] + ['bib'] * 10 + ['end']
+    assert events[0].total == 10
+    assert events[-1].completed == 10
+    assert result.bibs == 10 and result.ok
+
+
+def test_failed_setup_still_sends_end(factory, template, tmp_path):
+    events = []
+    with pytest.raises(OSError):
+        # the conversion script cannot be written in a missing directory
+        factory.make_bib_files(template, str(tmp_path / 'missing'),
+                               output_format='png', progress=events.append)
+    kinds = [event.kind for event in events]
+    assert kinds == ['start', 'failure', 'end']
+
+
+def test_failure_gives_the_number_of_the_failed_bib(base_file, participants,
+                                                    tmp_path):
+    pytest.importorskip('barcode')
+    template = race_bib_creator.BibTemplate(
+        base_file, {'Number': 'NUMBER', 'barcode': 'barcode.png'},
+        use_barcodes=True, barcode_number_field_name='Code')
+    for row in participants:
+        if row['Number'] != 4:
+            # no barcode number for the bib 4
+            row['Code'] = row['Number']
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    events = []
+    with pytest.raises(ValueError):
+        factory.make_bib_files(template, str(tmp_path), output_format='svg',
+                               progress=events.append)
+    failures = [event for event in events if event.kind == 'failure']
+    assert [event.number for event in failures] == [4]
+    assert events[-1].kind == 'end'
+
+
+def test_tracker_is_reset_between_runs(factory, template, tmp_path):
+    events = []
+    tracker = race_bib_creator.ProgressTracker(events.append, 0)
+    for _ in range(2):
+        factory.make_bib_files(template, str(tmp_path), output_format='svg',
+                               progress=tracker)
+    assert events[-1].kind == 'end'
+    assert events[-1].completed == 10
+    assert events[-1].failures == 0
+
+
+def test_cancelled_run_keeps_the_bibs_made(factory, template, tmp_path):
+    cancel = threading.Event()
+    events = []
+
+    def listener(event):
+        events.append(event.kind)
+        if event.kind == 'bib' and event.completed == 3:
+            cancel.set()
+
+    result = factory.make_bib_files(template, str(tmp_path),
+                                    output_format='png', make_manifest=True,
+                                    progress=listener, cancel=cancel)
+    assert result.cancelled and not result.ok
+    assert result.bibs == 3
+    assert events == ['start'] + ['bib'] * 3 + ['end']
+    with open(str(tmp_path / 'make_pngs.bat')) as script:
+        assert len(script.read().splitlines()) == 3
+    with open(str(tmp_path / 'manifest.json')) as manifest:
+        assert len(json.load(manifest)['entries']) == 3
+
+
+def test_result_can_be_used_as_the_output_rep(factory, template, tmp_path):
+    result = factory.make_bib_files(template, str(tmp_path),
+                                    output_format='svg')
+    assert os.fspath(result) == str(tmp_path)
+    assert 'dossard_1.svg' in os.listdir(result)
+    result = race_bib_creator.RunResult([str(tmp_path), str(tmp_path)])
+    with pytest.raises(TypeError):
+        os.fspath(result)
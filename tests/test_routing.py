@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Tests of the routing of the participants to templates."""
+import os
+
+import pytest
+
+import race_bib_creator
+from race_bib_creator.routing import route_key
+
+
+def test_route_key():
+    assert route_key(1.0) == '1'
+    assert route_key(10) == '10'
+    assert route_key(2.5) == '2.5'
+    assert route_key(' 10k ') == '10k'
+    assert route_key(float('nan')) is None
+    assert route_key(None) is None
+
+
+def test_float_values_take_their_route(template, base_file, tmp_path):
+    other = race_bib_creator.BibTemplate(base_file, {'Number': 'NUMBER'})
+    router = race_bib_creator.TemplateRouter('Race', {'1': template,
+                                                      2: other})
+    output_rep = str(tmp_path)
+    assert router.route({'Race': 1.0}, output_rep) == (
+        template, os.path.join(output_rep, '1'))
+    assert router.route({'Race': '2'}, output_rep)[0] is other
+    with pytest.raises(KeyError):
+        router.route({'Race': float('nan')}, output_rep)
+
+
+def test_empty_values_take_the_default_route(template, base_file, tmp_path):
+    other = race_bib_creator.BibTemplate(base_file, {'Number': 'NUMBER'})
+    router = race_bib_creator.TemplateRouter('Race', {'1': template},
+                                             default=other)
+    assert router.route({'Race': float('nan')}, str(tmp_path)) == (
+        other, str(tmp_path))
+
+
+def test_colliding_repositories_are_refused(template, base_file, tmp_path):
+    other = race_bib_creator.BibTemplate(base_file, {'Number': 'NUMBER'})
+    router = race_bib_creator.TemplateRouter('Race', {'A/B': template,
+                                                      'A_B': other})
+    with pytest.raises(ValueError):
+        router.targets(str(tmp_path))
+    # values of the same template can share their repository
+    router = race_bib_creator.TemplateRouter('Race', {'A/B': template,
+                                                      'A_B': template})
+    assert router.targets(str(tmp_path)) == [
+        (template, os.path.join(str(tmp_path), 'A_B'))]
+
+
+def test_same_values_are_refused(template):
+    with pytest.raises(AssertionError):
+        race_bib_creator.TemplateRouter('Race', {1: template, '1': template})
+
+
+def test_run_with_float_column(participants, template, base_file, tmp_path):
+    other = race_bib_creator.BibTemplate(base_file, {'Number': 'NUMBER'})
+    for row in participants:
+        row['Race'] = float(row['Number'] % 2 + 1)
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    router = race_bib_creator.TemplateRouter('Race', {'1': template,
+                                                      '2': other})
+    result = factory.make_bib_files(router, str(tmp_path),
+                                    output_format='svg')
+    assert result.bibs == 10
+    assert len(os.listdir(str(tmp_path / '1'))) >= 5
+    assert len(os.listdir(str(tmp_path / '2'))) >= 5
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Tests of the priority classes, reserved workers and aging of
+`PriorityScheduler`."""
+import threading
+import time
+
+import pytest
+
+from race_bib_creator import PriorityScheduler
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(**options):
+        schedulers.append(PriorityScheduler(**options))
+        return(schedulers[-1])
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.shutdown(cancel=True)
+
+
+def _blocker(scheduler, priority='bulk'):
+    """Submits a job keeping a worker busy until the returned event is set,
+    and waits for the job to start."""
+    started = threading.Event()
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(10)
+
+    scheduler.submit(priority, block)
+    assert started.wait(5)
+    return(release)
+
+
+def test_highest_class_first(make_scheduler):
+    scheduler = make_scheduler(workers=1, reserved=0, aging=None)
+    release = _blocker(scheduler)
+    order = []
+    futures = [scheduler.submit(priority, order.append, priority)
+               for priority in ('bulk', 'late_entry', 'reprint', 'bulk')]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert order == ['reprint', 'late_entry', 'bulk', 'bulk']
+
+
+def test_reserved_worker_does_not_run_bulk_jobs(make_scheduler):
+    scheduler = make_scheduler(workers=2, reserved=1, aging=None)
+    release = _blocker(scheduler)
+    bulk = scheduler.submit('bulk', time.monotonic)
+    time.sleep(0.2)
+    # the reserved worker is free but leaves the bulk job queued
+    assert not bulk.done()
+    assert scheduler.queued()['bulk'] == 1
+    reprint = scheduler.submit('reprint', time.monotonic)
+    reprint.result(timeout=1)
+    release.set()
+    bulk.result(timeout=5)
+
+
+def test_waiting_jobs_age(make_scheduler):
+    scheduler = make_scheduler(workers=1, reserved=0, aging=0.1)
+    release = _blocker(scheduler)
+    order = []
+    bulk = scheduler.submit('bulk', order.append, 'bulk')
+    # raised by more than two classes
+    time.sleep(0.35)
+    reprint = scheduler.submit('reprint', order.append, 'reprint')
+    release.set()
+    bulk.result(timeout=5)
+    reprint.result(timeout=5)
+    assert order == ['bulk', 'reprint']
+
+
+def test_wait_stats(make_scheduler):
+    scheduler = make_scheduler(workers=1, reserved=0, aging=None)
+    release = _blocker(scheduler)
+    future = scheduler.submit('late_entry', time.monotonic)
+    time.sleep(0.1)
+    stats = scheduler.wait_stats()
+    assert stats['late_entry']['queued'] == 1
+    assert stats['late_entry']['oldest'] >= 0.1
+    release.set()
+    future.result(timeout=5)
+    stats = scheduler.wait_stats()['late_entry']
+    assert stats['jobs'] == 1 and stats['max'] >= 0.1
+
+
+def test_failed_job_gives_its_exception(make_scheduler):
+    scheduler = make_scheduler(workers=1, reserved=0)
+    with pytest.raises(ZeroDivisionError):
+        scheduler.submit('reprint', lambda: 1 / 0).result(timeout=5)
+    # the worker is still alive
+    assert scheduler.submit('reprint', int, '3').result(timeout=5) == 3
+
+
+def test_shutdown_cancels_queued_jobs(make_scheduler):
+    scheduler = make_scheduler(workers=1, reserved=0)
+    release = _blocker(scheduler)
+    future = scheduler.submit('bulk', time.monotonic)
+    threading.Timer(0.1, release.set).start()
+    scheduler.shutdown(cancel=True)
+    assert future.cancelled()
+    with pytest.raises(RuntimeError):
+        scheduler.submit('bulk', time.monotonic)
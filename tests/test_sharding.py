@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Tests of the sharded runs of `BibFactory.make_bib_files`."""
+import os
+
+import pytest
+
+import race_bib_creator
+from race_bib_creator.manifest import read_manifest
+
+
+def _files(output_rep):
+    """Returns the contents of the bibs of a repository, keyed by name."""
+    contents = {}
+    for name in os.listdir(output_rep):
+        if name.endswith('.svg'):
+            with open(os.path.join(output_rep, name), 'rb') as bib:
+                contents[name] = bib.read()
+    return(contents)
+
+
+@pytest.mark.parametrize('shard_by', ['number', 'hash'])
+def test_merged_shards_match_a_single_run(factory, template, tmp_path,
+                                          shard_by):
+    single = str(tmp_path / 'single')
+    sharded = str(tmp_path / 'sharded')
+    os.mkdir(single)
+    os.mkdir(sharded)
+    factory.make_bib_files(template, single, make_manifest=True)
+    for index in range(3):
+        factory.make_bib_files(template, sharded, shard=(index, 3),
+                               shard_by=shard_by)
+    entries = race_bib_creator.merge_shards(sharded)
+    assert len(entries) == 10
+    assert _files(sharded) == _files(single)
+    expected = read_manifest(os.path.join(single, 'manifest.json'))
+    merged = read_manifest(os.path.join(sharded, 'manifest.json'))
+    for entry in expected['entries'] + merged['entries']:
+        del entry['command']
+    assert merged['entries'] == expected['entries']
+    with open(os.path.join(single, 'make_pngs.bat')) as script:
+        commands = script.read().replace(single, sharded)
+    with open(os.path.join(sharded, 'make_pngs.bat')) as script:
+        assert script.read() == commands
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Tests of the fitted fields of `BibTemplate`."""
+import os
+
+import pytest
+
+import race_bib_creator
+
+pytest.importorskip('numpy')
+
+TEMPLATE = """<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 200 100">
+  <text x="100" y="80" font-size="10" text-anchor="middle">NAME</text>
+</svg>
+"""
+
+
+def _template(tmp_path, fit, **options):
+    base_file = tmp_path / 'template.svg'
+    base_file.write_text(TEMPLATE)
+    return(race_bib_creator.BibTemplate(str(base_file), {'Name': 'NAME'},
+                                        text_fits={'Name': fit}, **options))
+
+
+def _text(content):
+    return(content.split('text-anchor="middle">')[1].split('</text>')[0])
+
+
+def test_size_mode(font_file, tmp_path):
+    # box of 20 user units: 4 letters of 5 units at a size of 10
+    template = _template(tmp_path, race_bib_creator.TextFit(20, font_file))
+    assert _text(template.render({'Name': 'ABCD'})) == 'ABCD'
+    assert _text(template.render({'Name': 'ABCDEFGH'})) == (
+        '<tspan style="font-size:5px">ABCDEFGH</tspan>')
+    template = _template(tmp_path, race_bib_creator.TextFit(
+        20, font_file, min_scale=0.8))
+    # narrowed down to the limit only
+    assert _text(template.render({'Name': 'ABCDEFGH'})) == (
+        '<tspan style="font-size:8px">ABCDEFGH</tspan>')
+
+
+def test_spacing_mode(font_file, tmp_path):
+    template = _template(tmp_path, race_bib_creator.TextFit(
+        20, font_file, mode='spacing', min_spacing=-0.5))
+    # 5 units too wide, 4 gaps between the letters
+    assert _text(template.render({'Name': 'ABCDE'})) == (
+        '<tspan style="letter-spacing:-1.25px">ABCDE</tspan>')
+
+
+def test_outlined_field_is_scaled(font_file, tmp_path):
+    template = _template(tmp_path, race_bib_creator.TextFit(20),
+                         outline_fonts={'Name': font_file})
+    content = template.render({'Name': 'ABCDEFGH'})
+    # glyphs at half size, centered on x
+    assert '<path d="m-975 0l0 350l200 0l0 -350zm250 0' in content
+
+
+def test_factory_fits_the_whole_column(font_file, tmp_path):
+    template = _template(tmp_path, race_bib_creator.TextFit(20, font_file))
+    participants = [{'Number': number, 'Name': 'AB' * number}
+                    for number in range(1, 6)]
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    output_rep = str(tmp_path / 'bibs')
+    os.mkdir(output_rep)
+    factory.make_bib_files(template, output_rep, output_format='svg')
+    for row in participants:
+        path = os.path.join(output_rep,
+                            'dossard_{}.svg'.format(row['Number']))
+        with open(path) as bib:
+            assert bib.read() == template.render(dict(row))
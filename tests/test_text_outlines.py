@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Tests of the outlined fields of `BibTemplate`."""
+import os
+
+import race_bib_creator
+
+TEMPLATE = """<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 200 100">
+  <text x="10" y="40" font-size="20" fill="red"
+        style="opacity:0.5">N NUMBER</text>
+  <text x="100" y="80" font-size="10">NAME</text>
+</svg>
+"""
+# outline of a square glyph, relative to the start of the glyph
+SQUARE = 'l0 700l400 0l0 -700z'
+
+
+def test_outlined_field_is_drawn_as_a_path(font_file, tmp_path):
+    base_file = tmp_path / 'template.svg'
+    base_file.write_text(TEMPLATE)
+    template = race_bib_creator.BibTemplate(
+        str(base_file), {'Number': 'NUMBER', 'Name': 'NAME'},
+        outline_fonts={'Number': font_file})
+    content = template.render({'Number': 12, 'Name': 'Runner'})
+    # "N 12": the glyphs of N, 1 and 2, the space only advancing
+    assert ('<path d="m50 0{0}m1000 0{0}m500 0{0}" '
+            'transform="translate(10,40) scale(0.02,-0.02)" '
+            'style="fill:red;opacity:0.5" />'.format(SQUARE)) in content
+    assert 'NUMBER' not in content and '>N ' not in content
+    # the other fields are left as texts
+    assert '<text x="100" y="80" font-size="10">Runner</text>' in content
+
+
+def test_factory_outlines_the_whole_column(font_file, participants,
+                                           tmp_path):
+    base_file = tmp_path / 'template.svg'
+    base_file.write_text(TEMPLATE)
+    template = race_bib_creator.BibTemplate(
+        str(base_file), {'Number': 'NUMBER', 'Name': 'NAME'},
+        outline_fonts={'Number': font_file})
+    factory = race_bib_creator.BibFactory(participants,
+                                          field_for_numbering='Number')
+    output_rep = str(tmp_path / 'bibs')
+    os.mkdir(output_rep)
+    factory.make_bib_files(template, output_rep, output_format='svg')
+    for row in participants:
+        path = os.path.join(output_rep,
+                            'dossard_{}.svg'.format(row['Number']))
+        with open(path) as bib:
+            assert bib.read() == template.render(dict(row))
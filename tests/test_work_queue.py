@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Tests of the work queue of the distributed rendering mode."""
+import os
+import threading
+import time
+
+import pytest
+
+import race_bib_creator
+from race_bib_creator.work_queue import run_worker
+
+
+def test_expired_lease_is_published_again(tmp_path):
+    queue = race_bib_creator.DirectoryWorkQueue(str(tmp_path),
+                                                lease_timeout=0.05)
+    queue.publish([[1, 2], [3]])
+    lease = queue.claim('worker')
+    assert lease.numbers == [1, 2] and lease.attempts == 1
+    assert queue.requeue_expired() == []
+    time.sleep(0.1)
+    assert queue.requeue_expired() == [lease.chunk]
+    # the worker lost its lease
+    assert not queue.renew(lease)
+    assert not queue.ack(lease)
+    again = queue.claim('other')
+    assert again.chunk == lease.chunk and again.attempts == 2
+    assert queue.ack(again)
+    assert queue.counts() == {'pending': 1, 'leased': 0, 'done': 1,
+                              'failed': 0}
+
+
+def test_chunk_expiring_too_often_fails(tmp_path):
+    queue = race_bib_creator.DirectoryWorkQueue(str(tmp_path),
+                                                lease_timeout=0.0,
+                                                max_attempts=2)
+    queue.publish([[1]])
+    for _ in range(2):
+        queue.claim('worker')
+        time.sleep(0.01)
+        queue.requeue_expired()
+    assert queue.is_finished()
+    assert queue.failed_chunks() == {'chunk-00000': 'lease expired'}
+
+
+def test_poison_chunk_does_not_block_the_coordinator(factory, tmp_path):
+    template = race_bib_creator.BibTemplate(str(tmp_path / 'missing.svg'),
+                                            {'Number': 'NUMBER'})
+    queue = race_bib_creator.DirectoryWorkQueue(str(tmp_path / 'queue'),
+                                                max_attempts=2)
+    coordinator = race_bib_creator.Coordinator(factory, queue, chunk_size=5)
+    coordinator.publish()
+    with pytest.warns(UserWarning):
+        chunks = run_worker(factory, template, queue, str(tmp_path),
+                            output_format='svg', poll_interval=0.01)
+    assert chunks == []
+    assert sorted(queue.failed_chunks()) == ['chunk-00000', 'chunk-00001']
+    assert 'FileNotFoundError' in queue.failed_chunks()['chunk-00000']
+    with pytest.warns(UserWarning, match='2 chunks failed'):
+        entries = coordinator.wait(str(tmp_path), poll_interval=0.01)
+    assert entries == []
+
+
+class _SlowFactory():
+    """Factory which runs take longer than the lease timeout, without any
+    progress event."""
+    def __init__(self, duration, before=None):
+        self.duration = duration
+        self.before = before
+        self.runs = 0
+        self.cancelled = None
+
+    def make_bib_files(self, *args, **kwargs):
+        self.runs += 1
+        if self.before is not None:
+            self.before()
+        time.sleep(self.duration)
+        self.cancelled = kwargs['cancel'].is_set()
+
+
+def _requeue_while(queue, running):
+    while running.is_set():
+        queue.requeue_expired()
+        time.sleep(0.01)
+
+
+def test_lease_is_renewed_without_progress_events(tmp_path):
+    queue = race_bib_creator.DirectoryWorkQueue(str(tmp_path),
+                                                lease_timeout=0.2)
+    queue.publish([[1]])
+    running = threading.Event()
+    running.set()
+    coordinator = threading.Thread(target=_requeue_while,
+                                   args=(queue, running))
+    coordinator.start()
+    try:
+        chunks = run_worker(_SlowFactory(0.6), None, queue, str(tmp_path),
+                            renew_interval=0.05, wait=False)
+    finally:
+        running.clear()
+        coordinator.join()
+    assert chunks == ['chunk-00000']
+    assert queue.done_chunks() == ['chunk-00000']
+
+
+def test_worker_which_lost_its_lease_does_not_ack(tmp_path):
+    queue = race_bib_creator.DirectoryWorkQueue(str(tmp_path),
+                                                lease_timeout=0.0,
+                                                max_attempts=1)
+    queue.publish([[1]])
+
+    def expire():
+        # the coordinator publishes the chunk again during the run
+        time.sleep(0.01)
+        queue.requeue_expired()
+
+    factory = _SlowFactory(0.1, before=expire)
+    chunks = run_worker(factory, None, queue, str(tmp_path),
+                        renew_interval=0.02, wait=False)
+    assert factory.runs == 1
+    # the run was asked to stop
+    assert factory.cancelled
+    assert chunks == []
+    assert queue.done_chunks() == []
+    assert queue.failed_chunks() == {'chunk-00000': 'lease expired'}
+    assert not os.listdir(os.path.join(str(tmp_path), 'leased'))
+
+
+def test_chunks_have_their_own_state_files(factory, template, tmp_path):
+    queue = race_bib_creator.DirectoryWorkQueue(str(tmp_path / 'queue'))
+    coordinator = race_bib_creator.Coordinator(factory, queue, chunk_size=5)
+    coordinator.publish()
+    output_rep = tmp_path / 'bibs'
+    output_rep.mkdir()
+    chunks = run_worker(factory, template, queue, str(output_rep),
+                        wait=False, resume=True, conversion_cache=True)
+    assert chunks == ['chunk-00000', 'chunk-00001']
+    names = os.listdir(str(output_rep))
+    for chunk in chunks:
+        for name in ('bibs.{}.journal', 'conversions.{}.json',
+                     'make_pngs.{}.bat', 'manifest.{}.json'):
+            assert name.format(chunk) in names
+    assert 'bibs.journal' not in names
+    assert 'conversions.json' not in names